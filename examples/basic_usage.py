@@ -39,7 +39,9 @@ def main():
     # Print results
     print("Detected Errors:")
     for i, error in enumerate(results["errors"]):
-        print(f"{i+1}. {error['description']} (Confidence: {error['confidence']})")
+        # Severity and confidence are only present when the model provided them
+        print(f"{i+1}. [{error['error_type']}] \"{error['text_span']}\": {error['explanation']} "
+              f"(Confidence: {error.get('confidence', 'n/a')})")
     
     print("\nReasoning Trace (Step 4: Findings-Impression Alignment):")
     print(results["reasoning_trace"]["step_4"])
@@ -14,6 +14,11 @@ setup(
         "matplotlib>=3.5.0",
         "seaborn>=0.12.0",
     ],
+    entry_points={
+        "console_scripts": [
+            "radcot=radcot.cli:main",
+        ],
+    },
     author="currylee92",
     author_email="currylee92@163.com.com",
     description="Radiological Chain-of-Thought Framework for Enhanced Error Detection in Radiology Reports",
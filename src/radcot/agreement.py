@@ -0,0 +1,247 @@
+from collections import Counter
+
+import numpy as np
+
+from .spans import SpanMatcher
+from .taxonomy import CATEGORY_KEYS
+
+class AgreementAnalyzer:
+    """
+    Agreement between any number of error detection systems.
+    
+    Every error flagged by any system, plus every reference error, is an item;
+    each system either flagged it or did not. Items are identified by report,
+    location and type (or, with report texts, by report, normalized category
+    and sentence), so false positives count towards agreement as well. With
+    report texts, errors of the same report and category up to ``window``
+    sentences apart are the same item, as in ``SpanMatcher``.
+    
+    Each system's predictions are keyed once when added; the item-by-system
+    decision matrix is built once and reused by every statistic.
+    """
+    
+    def __init__(self, ground_truth=None, reports=None, modalities=None, window=1):
+        """
+        Initialize the analyzer.
+        
+        Args:
+            ground_truth (list or dict): Reference errors (optionally by report
+                ID); they add items no system may have flagged
+            reports (dict): Report text by report ID, enabling sentence-level
+                item identity
+            modalities (dict): Dictionary mapping report IDs to modalities,
+                enabling stratification by modality
+            window (int): Maximum sentence distance between errors aligned
+                into one item (with ``reports``)
+        """
+        self.reports = reports
+        self.modalities = modalities or {}
+        self.span_matcher = SpanMatcher(window=window)
+        self._systems = {}
+        self._reference = self._item_counts(ground_truth) if ground_truth is not None else Counter()
+        self._matrix = None
+    
+    @property
+    def systems(self):
+        """Names of the added systems, in insertion order."""
+        return list(self._systems)
+    
+    def add_system(self, name, predictions):
+        """
+        Key one system's predictions.
+        
+        Args:
+            name (str): System name, e.g. "gpt-4o/radcot"
+            predictions (list or dict): Predicted errors (optionally by report ID)
+        """
+        self._systems[name] = self._item_counts(predictions)
+        self._matrix = None
+    
+    def decision_matrix(self):
+        """
+        Item-by-system decisions.
+        
+        Returns:
+            tuple: List of item keys (report ID, type, position, occurrence)
+                and a boolean array of shape (n_items, n_systems)
+        """
+        if self._matrix is None:
+            keys, members = self._align_items([self._reference] + list(self._systems.values()))
+            decisions = np.zeros((len(keys), len(self._systems)), dtype=bool)
+            for row, sources in enumerate(members):
+                # Source 0 is the reference, which adds items but no decisions
+                decisions[row, [source - 1 for source in sources if source > 0]] = True
+            self._matrix = (keys, decisions)
+        return self._matrix
+    
+    def _align_items(self, sources):
+        """
+        Align the keyed errors of several sources into shared items.
+        
+        Each error joins an item of its report and type anchored at most
+        ``window`` sentences away that no other error of its source has
+        joined, in passes of increasing distance (same sentence first);
+        errors left over anchor new items. Positions that are not sentences
+        (unlocated spans, or locations without report texts) only align
+        exactly.
+        
+        Args:
+            sources (list): Error counts by (report ID, type, position), one
+                Counter per source
+                
+        Returns:
+            tuple: Item keys (report ID, type, anchor position, occurrence)
+                and the set of source indices in each item
+        """
+        distances = self.span_matcher._distances() if self.reports is not None else [0]
+        groups = {}
+        for source, counts in enumerate(sources):
+            for (report_id, label, position), n in counts.items():
+                groups.setdefault((report_id, label), {}).setdefault(source, []).extend([position] * n)
+        
+        keys = {}
+        members = []
+        for (report_id, label), by_source in groups.items():
+            anchored = {}
+            for source, positions in sorted(by_source.items()):
+                for distance in distances:
+                    unaligned = []
+                    for position in positions:
+                        if distance and not isinstance(position, int):
+                            unaligned.append(position)
+                            continue
+                        target = position + distance if distance else position
+                        item = next((item for item in anchored.get(target, ()) if source not in members[item]), None)
+                        if item is None:
+                            unaligned.append(position)
+                        else:
+                            members[item].add(source)
+                    positions = unaligned
+                for position in positions:
+                    anchored.setdefault(position, []).append(len(members))
+                    members.append({source})
+            for anchor, items in anchored.items():
+                for occurrence, item in enumerate(items):
+                    keys[item] = (report_id, label, anchor, occurrence)
+        
+        return [keys[item] for item in range(len(members))], members
+    
+    def cohen_kappa_matrix(self, stratify=None):
+        """
+        Cohen's kappa between every pair of systems.
+        
+        Args:
+            stratify (str): "modality" or "type" to compute one matrix per
+                stratum (None for the whole corpus)
+                
+        Returns:
+            pandas.DataFrame or dict: Symmetric kappa matrix indexed by system
+                name, or such matrices by stratum
+        """
+        import pandas as pd
+        
+        def kappa_frame(decisions):
+            return pd.DataFrame(cohen_kappa_matrix(decisions), index=self.systems, columns=self.systems)
+        
+        return self._per_stratum(kappa_frame, stratify)
+    
+    def fleiss_kappa(self, stratify=None):
+        """
+        Fleiss' kappa across all systems.
+        
+        Args:
+            stratify (str): "modality" or "type" to compute one value per
+                stratum (None for the whole corpus)
+                
+        Returns:
+            float or dict: Fleiss' kappa, or kappas by stratum
+        """
+        return self._per_stratum(fleiss_kappa, stratify)
+    
+    def _per_stratum(self, statistic, stratify):
+        """Apply a statistic to the decision matrix, optionally per stratum."""
+        keys, decisions = self.decision_matrix()
+        if stratify is None:
+            return statistic(decisions)
+        
+        if stratify == "modality":
+            labels = [self.modalities.get(key[0]) for key in keys]
+        elif stratify == "type":
+            labels = [key[1] for key in keys]
+        else:
+            raise ValueError(f"Unknown stratification: {stratify}")
+        
+        codes = {}
+        inverse = np.array([codes.setdefault(label, len(codes)) for label in labels], dtype=np.int64)
+        return {label: statistic(decisions[inverse == code]) for label, code in codes.items()}
+    
+    def _item_counts(self, errors):
+        """Count errors by item key (report ID, type, position)."""
+        if not isinstance(errors, dict):
+            errors = {None: errors}
+        
+        if self.reports is None:
+            return Counter(
+                (report_id, error.get("type"), error.get("location"))
+                for report_id, report_errors in errors.items()
+                for error in report_errors or ()
+            )
+        
+        resolved = self.span_matcher.resolve(errors, self.reports)
+        raw = [error for report_errors in errors.values() for error in report_errors or ()]
+        counts = Counter()
+        for report_id, category, sentence, error in zip(
+                resolved["report_id"], resolved["category"], resolved["sentence"], raw):
+            label = CATEGORY_KEYS[category] if category >= 0 else error.get("error_type", error.get("type"))
+            # Spans that do not occur in the report keep their text as position
+            position = int(sentence) if sentence >= 0 else error.get("text_span", error.get("location"))
+            counts[(report_id, label, position)] += 1
+        return counts
+
+def cohen_kappa_matrix(decisions):
+    """
+    Pairwise Cohen's kappa of binary decisions, all pairs at once.
+    
+    Args:
+        decisions (numpy.ndarray): Boolean array of shape (n_items, n_raters)
+        
+    Returns:
+        numpy.ndarray: (n_raters, n_raters) kappa matrix (NaN where undefined)
+    """
+    decisions = np.asarray(decisions, dtype=float)
+    n_items = len(decisions)
+    if n_items == 0:
+        return np.full((decisions.shape[1], decisions.shape[1]), np.nan)
+    
+    both_yes = decisions.T @ decisions
+    both_no = (1 - decisions).T @ (1 - decisions)
+    observed = (both_yes + both_no) / n_items
+    
+    rate = decisions.mean(axis=0)
+    expected = np.outer(rate, rate) + np.outer(1 - rate, 1 - rate)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected < 1, (observed - expected) / (1 - expected), np.nan)
+
+def fleiss_kappa(decisions):
+    """
+    Fleiss' kappa of binary decisions by several raters.
+    
+    Args:
+        decisions (numpy.ndarray): Boolean array of shape (n_items, n_raters)
+        
+    Returns:
+        float: Fleiss' kappa (NaN where undefined)
+    """
+    decisions = np.asarray(decisions, dtype=float)
+    n_items, n_raters = decisions.shape
+    if n_items == 0 or n_raters < 2:
+        return float("nan")
+    
+    yes = decisions.sum(axis=1)
+    no = n_raters - yes
+    per_item = (yes * (yes - 1) + no * (no - 1)) / (n_raters * (n_raters - 1))
+    p_yes = yes.sum() / (n_items * n_raters)
+    expected = p_yes ** 2 + (1 - p_yes) ** 2
+    if expected >= 1:
+        return float("nan")
+    return float((per_item.mean() - expected) / (1 - expected))
@@ -0,0 +1,222 @@
+import re
+
+from .spans import sentence_starts
+from .utils import tokenize_sections
+
+# Sections each step reads, in priority order (kept first under a token
+# budget); None gives the step the full report. Step 2 reads only the
+# sentences that contain numbers.
+STEP_SCOPES = {
+    "anatomical_validation": None,
+    "measurement_consistency": {
+        "sections": ("findings", "impression", "technique", "examination", "clinical_info"),
+        "numeric_only": True
+    },
+    "cross_sectional": {"sections": ("findings", "technique", "examination")},
+    "findings_impression": {"sections": ("findings", "impression")},
+    "clinical_completeness": {"sections": ("findings", "impression", "clinical_info")},
+    "terminology_accuracy": None
+}
+
+# Truncation priority of full-report inputs; sentences of other sections come last
+FULL_REPORT_PRIORITY = ("findings", "impression")
+
+# Marks where sentences were left out of a step's input
+OMISSION_MARKER = "[...]"
+
+_DIGIT_PATTERN = re.compile(r"\d")
+# List markers ("1. ") are not numbers worth checking
+_LIST_MARKER_PATTERN = re.compile(r"\s*\d{1,2}[.)]\s")
+_BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+def compact_template(template):
+    """
+    Strip the indentation and trailing spaces that triple-quoted literals carry.
+    
+    Every line is stripped and runs of blank lines collapse to one, so a
+    compacted step template still starts with the compacted report prefix.
+    
+    Args:
+        template (str): Prompt template
+        
+    Returns:
+        str: Compacted template
+    """
+    lines = [line.strip() for line in template.split("\n")]
+    return _BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines))
+
+def approximate_tokens(text):
+    """Approximate token count: one token per four characters."""
+    return (len(text) + 3) // 4
+
+class PromptAssembler:
+    """
+    Build each RadCoT step prompt from the parts of the report the step needs.
+    
+    Templates are compacted once. Each step's report input is limited to the
+    sections (and, for measurement checking, the sentences) in its scope and,
+    when a token budget is set, truncated deterministically: sentences are
+    kept in scope priority order, then report order, until the budget is
+    spent, and left-out stretches are marked with ``OMISSION_MARKER``.
+    """
+    
+    def __init__(self, prompts, scoped=True, token_budget=None, count_tokens=None, scopes=None):
+        """
+        Initialize the assembler.
+        
+        Args:
+            prompts (dict): RadCoT prompts from ``load_prompts(True)``
+            scoped (bool): Whether to restrict each step to its scope
+            token_budget (int): Maximum tokens of report input per step
+                (None for unlimited)
+            count_tokens (callable): Token counter (defaults to
+                ``approximate_tokens``)
+            scopes (dict): Step scopes (defaults to ``STEP_SCOPES``)
+        """
+        self.original = prompts
+        self.templates = {key: compact_template(prompts[key]) for key in STEP_SCOPES}
+        self.report_prefix = compact_template(prompts["report_prefix"])
+        self.scoped = scoped
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or approximate_tokens
+        self.scopes = STEP_SCOPES if scopes is None else scopes
+    
+    def prefix(self, report_input):
+        """Shared report prefix for a step input."""
+        return self.report_prefix.format(report=report_input)
+    
+    def assemble(self, key, report, note=""):
+        """
+        Assemble the prompt of one step.
+        
+        Args:
+            key (str): Prompt key of the step
+            report (str): Full text of the radiology report
+            note (str): Addendum placed between the report and the step question
+            
+        Returns:
+            dict: ``prompt``, its ``tokens``, the ``baseline_tokens`` of the
+                original full-report prompt, ``scoped`` (whether the input was
+                restricted) and ``truncated`` (whether the budget cut it)
+        """
+        scope = self.scopes.get(key) if self.scoped else None
+        report_input, scoped, truncated = self._step_input(report, scope)
+        
+        prompt = self.templates[key].format(report=report_input)
+        if note:
+            prefix = self.prefix(report_input)
+            prompt = prefix + note + "\n\n" + prompt[len(prefix):]
+        
+        return {
+            "prompt": prompt,
+            "tokens": self.count_tokens(prompt),
+            "baseline_tokens": self.count_tokens(self.original[key].format(report=report)),
+            "scoped": scoped,
+            "truncated": truncated
+        }
+    
+    def _step_input(self, report, scope):
+        """
+        Select the report input of a step.
+        
+        Returns:
+            tuple: Input text, whether it was scoped, whether it was truncated
+        """
+        if scope is None:
+            units = self._full_report_units(report) if self.token_budget is not None else []
+            scoped = False
+        else:
+            sections = {}
+            for section in tokenize_sections(report):
+                sections.setdefault(section["name"], section)
+            in_scope = [(rank, sections[name]) for rank, name in enumerate(scope["sections"]) if name in sections]
+            if not in_scope:
+                # No recognizable sections: fall back to the full report
+                return self._step_input(report, None)
+            units = []
+            for rank, section in in_scope:
+                for start, end in self._sentences(report, section["content_start"], section["end"]):
+                    if scope.get("numeric_only"):
+                        marker = _LIST_MARKER_PATTERN.match(report, start, end)
+                        if not _DIGIT_PATTERN.search(report, marker.end() if marker else start, end):
+                            continue
+                    units.append((rank, start, end, section))
+            scoped = True
+        
+        kept = units
+        truncated = False
+        if self.token_budget is not None:
+            kept, spent = [], 0
+            # Priority order: scope rank, then report order
+            for unit in sorted(units, key=lambda unit: (unit[0], unit[1])):
+                cost = self.count_tokens(report[unit[1]:unit[2]]) + 1
+                if spent + cost > self.token_budget:
+                    truncated = True
+                    break
+                kept.append(unit)
+                spent += cost
+            kept.sort(key=lambda unit: unit[1])
+        
+        if not scoped and not truncated:
+            return report, False, False
+        return self._render(report, units, kept), scoped, truncated
+    
+    def _full_report_units(self, report):
+        """Sentences of the whole report, ranked by ``FULL_REPORT_PRIORITY``."""
+        ranks = {name: rank for rank, name in enumerate(FULL_REPORT_PRIORITY)}
+        sections = tokenize_sections(report)
+        units = []
+        index = -1
+        for start, end in self._sentences(report, 0, len(report)):
+            while index + 1 < len(sections) and sections[index + 1]["start"] <= start:
+                index += 1
+            name = sections[index]["name"] if index >= 0 else None
+            units.append((ranks.get(name, len(ranks)), start, end, None))
+        return units
+    
+    def _sentences(self, text, start, end):
+        """Non-empty sentence spans of text[start:end], stripped."""
+        bounds = [start + offset for offset in sentence_starts(text[start:end])] + [end]
+        spans = []
+        for a, b in zip(bounds, bounds[1:]):
+            sentence = text[a:b]
+            stripped = sentence.strip()
+            if stripped:
+                lead = a + len(sentence) - len(sentence.lstrip())
+                spans.append((lead, lead + len(stripped)))
+        return spans
+    
+    def _render(self, report, units, kept):
+        """
+        Lay out the kept sentences under their section headers, in report order.
+        
+        Consecutive kept sentences are copied as one stretch of the report, so
+        their line breaks survive; each run of left-out sentences becomes one
+        ``OMISSION_MARKER``.
+        """
+        kept_starts = {unit[1] for unit in kept}
+        groups = []
+        for unit in sorted(units, key=lambda unit: unit[1]):
+            if not groups or groups[-1][0] is not unit[3]:
+                groups.append((unit[3], []))
+            groups[-1][1].append(unit)
+        
+        blocks = []
+        for section, group in groups:
+            pieces = []
+            run = None
+            for _, start, end, _ in group:
+                if start in kept_starts:
+                    run = (run[0], end) if run else (start, end)
+                    continue
+                if run:
+                    pieces.append(report[run[0]:run[1]])
+                    run = None
+                if not pieces or pieces[-1] != OMISSION_MARKER:
+                    pieces.append(OMISSION_MARKER)
+            if run:
+                pieces.append(report[run[0]:run[1]])
+            if section is not None:
+                pieces.insert(0, section["header"].strip())
+            blocks.append(" ".join(pieces))
+        return "\n".join(blocks)
@@ -0,0 +1,157 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import instrumentation
+from .models import LLMInterface
+
+class BatchingModel(LLMInterface):
+    """
+    Coalesce concurrent generation requests into shared ``generate_batch`` calls.
+    
+    Requests issued from different threads (the reasoning steps of one report
+    run with ``parallel_steps``, or many reports in ``detect_errors_batch``)
+    are collected for up to ``max_wait`` seconds and dispatched together, so a
+    local backend can serve them in a single padded forward pass. Each
+    request's time in the queue, and the backend's usage for it, are recorded
+    on the instrumentation span it was issued from.
+    """
+    
+    def __init__(self, model, max_batch_size=8, max_wait=0.01):
+        """
+        Initialize the batching wrapper.
+        
+        Args:
+            model (LLMInterface): Backend implementing ``generate_batch``
+            max_batch_size (int): Maximum number of prompts dispatched together
+            max_wait (float): Seconds to wait for more requests before dispatching
+        """
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="radcot-batcher", daemon=True)
+        self._worker.start()
+    
+    def generate(self, prompt, **kwargs):
+        """
+        Generate text for a single prompt via the shared batch queue.
+        
+        Args:
+            prompt (str): Input prompt
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Returns:
+            str: Generated text
+        """
+        return self.generate_batch([prompt], **kwargs)[0]
+    
+    def generate_batch(self, prompts, **kwargs):
+        """
+        Enqueue several prompts and wait for all of them.
+        
+        Args:
+            prompts (list): Input prompts
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Returns:
+            list: Generated text for each prompt, in input order
+        """
+        futures = []
+        for row, prompt in enumerate(prompts):
+            future = Future()
+            # The dispatcher thread attributes usage to the caller's span
+            self._queue.put((prompt, kwargs, future, instrumentation.target(row), time.perf_counter()))
+            futures.append(future)
+        return [future.result() for future in futures]
+    
+    def generate_with_prefix(self, prefix, suffixes, **kwargs):
+        """
+        Generate text for prompts sharing a prefix with the wrapped model's prefix cache.
+        
+        The prompts already form one batch, so they bypass the queue.
+        
+        Args:
+            prefix (str): Shared leading text of every prompt
+            suffixes (list): Prompt-specific trailing text
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Returns:
+            list: Generated text for each suffix, in input order
+        """
+        return self.model.generate_with_prefix(prefix, suffixes, **kwargs)
+    
+    def generate_stream(self, prompt, **kwargs):
+        """
+        Stream text from the wrapped model; streams are not batched.
+        
+        Args:
+            prompt (str): Input prompt
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Yields:
+            str: Successive chunks of generated text
+        """
+        stream = self.model.generate_stream(prompt, **kwargs)
+        try:
+            yield from stream
+        finally:
+            # Closing this generator stops the wrapped model's decoding too
+            stream.close()
+    
+    def close(self):
+        """Stop the dispatcher thread once queued requests are served."""
+        self._queue.put(None)
+        self._worker.join()
+    
+    def _run(self):
+        """Dispatcher loop: gather a batch, then serve it grouped by decoding parameters."""
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                return
+            
+            pending = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                pending.append(item)
+            
+            self._dispatch(pending)
+    
+    def _dispatch(self, pending):
+        """Run one ``generate_batch`` call per distinct set of decoding parameters."""
+        groups = {}
+        dispatched = time.perf_counter()
+        for prompt, kwargs, future, span, enqueued in pending:
+            if future.set_running_or_notify_cancel():
+                if span is not None:
+                    span.add(queue_wait=dispatched - enqueued)
+                key = json.dumps(kwargs, sort_keys=True, default=str)
+                groups.setdefault(key, (kwargs, []))[1].append((prompt, future, span))
+        
+        for kwargs, requests in groups.values():
+            spans = [span for _, _, span in requests]
+            try:
+                with instrumentation.rows(spans if any(spans) else None):
+                    responses = self.model.generate_batch([prompt for prompt, _, _ in requests], **kwargs)
+            except Exception as e:
+                for _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), response in zip(requests, responses):
+                future.set_result(response)
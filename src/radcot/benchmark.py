@@ -0,0 +1,683 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+from .models import LLMInterface
+from .utils import extract_measurements, extract_sections
+
+# Modules that make up the model stack; none of them should load on a plain import
+HEAVY_MODULES = ("torch", "transformers", "openai")
+
+# Step outputs per second the parsing layer must sustain (it runs on every step of every report)
+PARSING_TARGET = 2000
+
+_STARTUP_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules_loaded": sorted(m for m in json.loads(sys.argv[2]) if m in sys.modules)
+}))
+"""
+
+class TokenCountingModel(LLMInterface):
+    """
+    Wrap an LLMInterface and tally calls, prompt tokens and completion tokens.
+    
+    Tokens are counted with the backend's own tokenizer when it has one
+    (local Hugging Face models); otherwise they are approximated as one token
+    per four characters, the usual rule of thumb for OpenAI tokenizers.
+    """
+    
+    def __init__(self, model):
+        """
+        Initialize the counting wrapper.
+        
+        Args:
+            model (LLMInterface): Backend to delegate generation to
+        """
+        self.model = model
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Zero all counters."""
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+    
+    def generate(self, prompt, **kwargs):
+        """Generate text and record its token usage."""
+        response = self.model.generate(prompt, **kwargs)
+        self._record([prompt], [response])
+        return response
+    
+    def generate_batch(self, prompts, **kwargs):
+        """Generate text for several prompts and record their token usage."""
+        responses = self.model.generate_batch(prompts, **kwargs)
+        self._record(prompts, responses)
+        return responses
+    
+    def generate_with_prefix(self, prefix, suffixes, **kwargs):
+        """Generate text for prefix-sharing prompts and record their token usage."""
+        responses = self.model.generate_with_prefix(prefix, suffixes, **kwargs)
+        self._record([prefix + suffix for suffix in suffixes], responses)
+        return responses
+    
+    def count_tokens(self, text):
+        """
+        Count the tokens in a piece of text.
+        
+        Args:
+            text (str): Text to measure
+            
+        Returns:
+            int: Number of tokens (approximate for API backends)
+        """
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return (len(text) + 3) // 4
+    
+    def _record(self, prompts, responses):
+        prompt_tokens = sum(self.count_tokens(prompt) for prompt in prompts)
+        completion_tokens = sum(self.count_tokens(response) for response in responses)
+        with self._lock:
+            self.calls += len(prompts)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+def compare_strategies(detector, reports):
+    """
+    Compare the stepwise (six-call) and fused (single-call) RadCoT strategies.
+    
+    Both strategies run on the same reports and share the detector's loaded
+    model, so only the prompting strategy differs between the two runs.
+    
+    Args:
+        detector (RadCoT): Configured RadCoT detector (use_radcot=True)
+        reports (list): Report strings to run both strategies on
+        
+    Returns:
+        dict: Wall time, call and token counts per strategy, plus detection
+            agreement between the strategies
+    """
+    results = {}
+    detections = {}
+    
+    for strategy in ("stepwise", "fused"):
+        variant = copy.copy(detector)
+        variant.strategy = strategy
+        variant.model = TokenCountingModel(detector.model)
+        
+        start = time.perf_counter()
+        detections[strategy] = [variant.detect_errors(report) for report in reports]
+        wall_time = time.perf_counter() - start
+        
+        results[strategy] = {
+            "wall_time": wall_time,
+            "reports_per_second": len(reports) / wall_time if wall_time else 0.0,
+            "calls": variant.model.calls,
+            "prompt_tokens": variant.model.prompt_tokens,
+            "completion_tokens": variant.model.completion_tokens
+        }
+    
+    results["agreement"] = _detection_agreement(detections["stepwise"], detections["fused"])
+    return results
+
+def _detection_agreement(first, second):
+    """
+    Measure how closely two runs agree on the same reports.
+    
+    Args:
+        first (list): Detection results of the first run
+        second (list): Detection results of the second run
+        
+    Returns:
+        dict: Fraction of reports where both runs agree on whether any error
+            is present, and mean Jaccard overlap of the flagged errors
+    """
+    if not first:
+        return {"report_level": 0.0, "mean_jaccard": 0.0}
+    
+    flagged_agreement = 0
+    jaccard_total = 0.0
+    for a, b in zip(first, second):
+        keys_a = {_error_key(error) for error in a["errors"]}
+        keys_b = {_error_key(error) for error in b["errors"]}
+        flagged_agreement += bool(keys_a) == bool(keys_b)
+        union = keys_a | keys_b
+        jaccard_total += len(keys_a & keys_b) / len(union) if union else 1.0
+    
+    return {
+        "report_level": flagged_agreement / len(first),
+        "mean_jaccard": jaccard_total / len(first)
+    }
+
+def _error_key(error):
+    """Identity of an error for agreement purposes: where it is and what kind."""
+    if not isinstance(error, dict):
+        return str(error)
+    location = error.get("text_span", error.get("location"))
+    return (location, error.get("error_type", error.get("type")))
+
+def measure_startup(modules=("radcot", "radcot.evaluation", "radcot.utils", "radcot.visualization")):
+    """
+    Measure cold import time and memory of radcot modules.
+    
+    Each module is imported in a fresh interpreter so earlier imports cannot
+    warm the measurement. The peak RSS reported includes the interpreter itself.
+    
+    Args:
+        modules (iterable): Dotted module names to import
+        
+    Returns:
+        dict: Per module, import time in seconds, peak RSS in MB and which
+            model-stack modules (torch, transformers, openai) were loaded
+    """
+    results = {}
+    for module in modules:
+        completed = subprocess.run(
+            [sys.executable, "-c", _STARTUP_PROBE, module, json.dumps(HEAVY_MODULES)],
+            capture_output=True,
+            text=True
+        )
+        if completed.returncode != 0:
+            results[module] = {"error": completed.stderr.strip().splitlines()[-1]}
+        else:
+            results[module] = json.loads(completed.stdout)
+    return results
+
+_SYNTHETIC_SECTIONS = {
+    "EXAMINATION": ["CT abdomen and pelvis with contrast.", "Chest radiograph, PA and lateral.",
+                    "MRI brain without contrast.", "Ultrasound of the pelvis."],
+    "CLINICAL HISTORY": ["Abdominal pain.", "Shortness of breath.", "Headache.", "Pelvic pain, rule out mass."],
+    "COMPARISON": ["None.", "CT from 2021-03-04.", "Radiograph dated 01/02/2022."],
+    "TECHNIQUE": ["Axial images were acquired after IV contrast.", "Standard protocol."]
+}
+_SYNTHETIC_ORGANS = {
+    "LUNGS": ["Clear.", "Mild bibasilar atelectasis.", "A 4 mm nodule in the right upper lobe."],
+    "HEART": ["Normal size.", "Mild cardiomegaly."],
+    "LIVER": ["A 3.2 cm hypodense lesion in segment 7.", "Normal in size and attenuation."],
+    "KIDNEYS": ["No hydronephrosis.", "A 12 mm simple cyst in the left kidney."],
+    "BONES": ["No acute fracture.", "Degenerative changes of the lumbar spine."]
+}
+_SYNTHETIC_IMPRESSIONS = ["No acute abnormality.", "Right upper lobe nodule, follow-up recommended.",
+                          "Hepatic lesion, further characterization with MRI.", "Normal abdominal CT."]
+
+def synthetic_reports(n_reports, seed=0):
+    """
+    Generate a synthetic corpus of structured radiology reports.
+    
+    The reports mix the usual top-level sections, organ subheadings and
+    measurements, in upper and mixed case, so section parsing and
+    measurement extraction are exercised as on real reports.
+    
+    Args:
+        n_reports (int): Number of reports to generate
+        seed (int): Random seed
+        
+    Returns:
+        list: Report strings
+    """
+    rng = random.Random(seed)
+    reports = []
+    for _ in range(n_reports):
+        lines = [f"{header}: {rng.choice(options)}" for header, options in _SYNTHETIC_SECTIONS.items()
+                 if rng.random() < 0.8]
+        lines.append("FINDINGS:")
+        for organ in rng.sample(list(_SYNTHETIC_ORGANS), k=rng.randint(2, len(_SYNTHETIC_ORGANS))):
+            header = organ if rng.random() < 0.7 else organ.capitalize()
+            lines.append(f"{header}: {rng.choice(_SYNTHETIC_ORGANS[organ])}")
+        lines.append(f"IMPRESSION: {rng.choice(_SYNTHETIC_IMPRESSIONS)}")
+        reports.append("\n".join(lines))
+    return reports
+
+def benchmark_sections(n_reports=100000, seed=0, repeat=3):
+    """
+    Time section extraction on a synthetic corpus against the previous implementation.
+    
+    Args:
+        n_reports (int): Corpus size
+        seed (int): Corpus seed
+        repeat (int): Timed runs per implementation; the best one counts
+        
+    Returns:
+        dict: Best wall time and reports per second of ``extract_sections``
+            and of the previous per-section regex implementation
+    """
+    reports = synthetic_reports(n_reports, seed)
+    results = {}
+    for name, function in (("extract_sections", extract_sections), ("previous", _previous_extract_sections)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for report in reports:
+                function(report)
+            best = min(best, time.perf_counter() - start)
+        results[name] = {"wall_time": best, "reports_per_second": n_reports / best}
+    results["speedup"] = results["previous"]["wall_time"] / results["extract_sections"]["wall_time"]
+    return results
+
+def _previous_extract_sections(report):
+    """The per-section regex search that ``utils.tokenize_sections`` replaced, kept as the baseline."""
+    section_patterns = {
+        "clinical_info": r"(?:CLINICAL|INDICATION|HISTORY).*?:",
+        "technique": r"(?:TECHNIQUE|PROCEDURE).*?:",
+        "findings": r"(?:FINDINGS|RESULT).*?:",
+        "impression": r"(?:IMPRESSION|CONCLUSION|ASSESSMENT).*?:"
+    }
+    any_header = "|".join(section_patterns.values())
+    sections = {}
+    for section_name, pattern in section_patterns.items():
+        match = re.search(f"{pattern}(.*?)(?={any_header}|$)", report, re.DOTALL | re.IGNORECASE)
+        sections[section_name] = match.group(1).strip() if match else ""
+    return sections
+
+def benchmark_extraction(n_reports=100000, seed=0, repeat=3):
+    """
+    Time ``extract_sections`` and ``extract_measurements`` on a synthetic corpus.
+    
+    Args:
+        n_reports (int): Corpus size
+        seed (int): Corpus seed
+        repeat (int): Timed runs per function; the best one counts
+        
+    Returns:
+        dict: Best wall time and reports per second of each function
+    """
+    reports = synthetic_reports(n_reports, seed)
+    results = {}
+    for name, function in (("extract_sections", extract_sections), ("extract_measurements", extract_measurements)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for report in reports:
+                function(report)
+            best = min(best, time.perf_counter() - start)
+        results[name] = {"wall_time": best, "reports_per_second": n_reports / best}
+    return results
+
+def benchmark_throughput(n_reports=100, concurrency=(1, 2, 4, 8, 16), latency=0.02,
+                         distribution="lognormal", failure_rate=0.0, seed=0, **detector_options):
+    """
+    End-to-end ``detect_errors`` throughput against the number of reports in flight.
+    
+    Runs ``detect_errors_batch`` over a synthetic corpus on the mock backend,
+    so the numbers reflect framework overhead and concurrency scaling under a
+    simulated model latency rather than any real model.
+    
+    Args:
+        n_reports (int): Corpus size
+        concurrency (iterable): ``max_in_flight`` values to measure
+        latency (float): Mean simulated seconds per model call
+        distribution (str): Latency distribution (see ``mock.LATENCY_DISTRIBUTIONS``)
+        failure_rate (float): Probability that a model call fails
+        seed (int): Corpus and mock seed
+        **detector_options: Further ``RadCoT`` options, e.g. ``parallel_steps=True``
+        
+    Returns:
+        list: Per concurrency level, wall time, reports per second, per-report
+            latency percentiles (seconds) and the number of failed reports
+    """
+    from .framework import RadCoT
+    from .instrumentation import Instrumentation
+    
+    reports = synthetic_reports(n_reports, seed)
+    config = {"latency": latency, "distribution": distribution, "failure_rate": failure_rate, "seed": seed}
+    results = []
+    for level in concurrency:
+        recorder = Instrumentation()
+        with RadCoT("mock", model_config=config, instrumentation=recorder, **detector_options) as detector:
+            start = time.perf_counter()
+            statuses = Counter(result["status"] for result in detector.detect_errors_batch(reports, max_in_flight=level))
+            wall_time = time.perf_counter() - start
+        latencies = recorder.summary()["report"]
+        results.append({
+            "concurrency": level,
+            "wall_time": wall_time,
+            "reports_per_second": n_reports / wall_time,
+            "latency_p50": latencies["wall_p50"],
+            "latency_p95": latencies["wall_p95"],
+            "latency_p99": latencies["wall_p99"],
+            "failed": statuses["error"]
+        })
+    return results
+
+def benchmark_parsing(n_reports=2000, seed=0, repeat=3, target=PARSING_TARGET):
+    """
+    Time parsing of step outputs and deduplication of the parsed errors.
+    
+    Step outputs are the mock backend's canned answers to every step prompt
+    of a synthetic corpus; about half of the outputs carrying errors have their JSON
+    unfenced and wrapped in prose, as models often answer. Parsing extracts,
+    validates and span-checks the errors against the report. Each report's
+    errors are deduplicated after being reported twice, as overlapping steps
+    do.
+    
+    Args:
+        n_reports (int): Corpus size (six step outputs per report)
+        seed (int): Corpus and mock seed
+        repeat (int): Timed runs; the best one counts
+        target (float): Step outputs per second parsing must sustain
+        
+    Returns:
+        dict: Best wall time and items per second of parsing (per step
+            output, with the errors parsed and whether ``target`` is met) and
+            deduplication (per report)
+    """
+    from .framework import RADCOT_STEPS, RadCoT
+    from .mock import MockModel
+    
+    mock = MockModel(seed=seed)
+    reports = synthetic_reports(n_reports, seed)
+    with RadCoT("mock", model_config={"seed": seed}, preprocess=False) as detector:
+        outputs = []
+        for report in reports:
+            for step, key in enumerate(RADCOT_STEPS, 1):
+                output = mock.respond(detector._step_prompt(key, report))
+                if "```json" in output and len(outputs) % 2:
+                    reasoning, _, block = output.partition("```json")
+                    output = f"{reasoning}Here are the issues: {block.rstrip().rstrip('`')} Let me know if needed."
+                outputs.append((output, report, step))
+        duplicated = [(mock.canned_errors(report) * 2,) for report in reports]
+        
+        timings = {}
+        for name, items, function in (
+                ("parse_step_results", outputs, detector._parse_step_results),
+                ("deduplicate_errors", duplicated, detector._deduplicate_errors)):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for item in items:
+                    function(*item)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = {"wall_time": best, "items": len(items), "items_per_second": len(items) / best}
+        
+        parsed = timings["parse_step_results"]
+        parsed["errors"] = sum(len(detector._parse_step_results(*item)["errors"]) for item in outputs)
+        parsed["meets_target"] = parsed["items_per_second"] >= target
+    return timings
+
+def synthetic_annotations(n_reports, seed=0, recall=0.7, false_positive_rate=0.2):
+    """
+    Generate a synthetic evaluation corpus: reports, reference and predicted errors.
+    
+    Reference errors are the mock backend's canned errors; predictions keep
+    each with probability ``recall`` (one in ten with a wrong category) and
+    add false positives on other sentences.
+    
+    Args:
+        n_reports (int): Number of reports
+        seed (int): Random seed
+        recall (float): Probability that a reference error is predicted
+        false_positive_rate (float): Probability of a false positive per report
+        
+    Returns:
+        dict: ``reports``, ``ground_truth`` and ``predictions`` by report ID,
+            and ``modalities`` by report ID
+    """
+    from .mock import MockModel
+    from .taxonomy import CATEGORIES
+    
+    rng = random.Random(seed)
+    mock = MockModel(seed=seed)
+    labels = list(CATEGORIES.values())
+    corpus = {"reports": {}, "ground_truth": {}, "predictions": {}, "modalities": {}}
+    for index, report in enumerate(synthetic_reports(n_reports, seed)):
+        report_id = f"r{index}"
+        reference = [_annotation(error["text_span"], error["error_type"]) for error in mock.canned_errors(report)]
+        predicted = []
+        for error in reference:
+            if rng.random() < recall:
+                label = rng.choice(labels) if rng.random() < 0.1 else error["type"]
+                predicted.append(_annotation(error["location"], label))
+        if rng.random() < false_positive_rate:
+            line = rng.choice(report.splitlines())
+            predicted.append(_annotation(line.split(":", 1)[-1].strip() or line, rng.choice(labels)))
+        
+        corpus["reports"][report_id] = report
+        corpus["ground_truth"][report_id] = reference
+        corpus["predictions"][report_id] = predicted
+        corpus["modalities"][report_id] = rng.choice(("CT", "MRI", "Radiography", "Ultrasound"))
+    return corpus
+
+def _annotation(span, label):
+    """An error in both the legacy (type/location) and the output schema fields."""
+    return {"type": label, "location": span, "error_type": label, "text_span": span}
+
+def benchmark_evaluator(sizes=(10000, 100000), seed=0):
+    """
+    Time ``RadCoTEvaluator`` on synthetic corpora of increasing size.
+    
+    Args:
+        sizes (iterable): Corpus sizes in reports
+        seed (int): Corpus seed
+        
+    Returns:
+        list: Per corpus size, the wall time of exact matching, span matching,
+            per-modality and per-error-type evaluation
+    """
+    from .evaluation import RadCoTEvaluator
+    
+    evaluator = RadCoTEvaluator()
+    results = []
+    for size in sizes:
+        corpus = synthetic_annotations(size, seed)
+        flat_predictions = [error for errors in corpus["predictions"].values() for error in errors]
+        flat_ground_truth = [error for errors in corpus["ground_truth"].values() for error in errors]
+        
+        timings = {"reports": size, "errors": len(flat_ground_truth)}
+        for name, run in (
+                ("evaluate", lambda: evaluator.evaluate(flat_predictions, flat_ground_truth)),
+                ("evaluate_spans", lambda: evaluator.evaluate(
+                    corpus["predictions"], corpus["ground_truth"], reports=corpus["reports"])),
+                ("evaluate_by_modality", lambda: evaluator.evaluate_by_modality(
+                    corpus["predictions"], corpus["ground_truth"], corpus["modalities"])),
+                ("evaluate_by_error_type", lambda: evaluator.evaluate_by_error_type(
+                    flat_predictions, flat_ground_truth))):
+            start = time.perf_counter()
+            run()
+            timings[f"{name}_wall_time"] = time.perf_counter() - start
+        results.append(timings)
+    return results
+
+def benchmark_consolidation(sizes=(100, 1000, 10000), seed=0, repeat=3):
+    """
+    Time merging of duplicate errors on pathological candidate sets.
+    
+    Each candidate set stands for one report on which every step flags the
+    same sentences repeatedly: candidates quote overlapping random spans of
+    a long synthetic report, with random categories and steps, and half of
+    them repeat an earlier candidate verbatim.
+    
+    Args:
+        sizes (iterable): Candidate errors per set
+        seed (int): Random seed
+        repeat (int): Timed runs; the best one counts
+        
+    Returns:
+        list: Per set size, the best wall time, the merged error count and
+            the time per candidate in microseconds (flat if merging stays
+            near-linear)
+    """
+    from .consolidation import ErrorConsolidator
+    from .taxonomy import CATEGORIES
+    
+    rng = random.Random(seed)
+    consolidator = ErrorConsolidator()
+    labels = list(CATEGORIES.values())
+    results = []
+    for size in sizes:
+        report = "\n".join(synthetic_reports(max(1, size // 10), seed))
+        candidates = []
+        for _ in range(size):
+            if candidates and rng.random() < 0.5:
+                candidates.append(dict(rng.choice(candidates), originating_step=rng.randint(1, 6)))
+                continue
+            start = rng.randrange(len(report) - 40)
+            end = start + rng.randint(5, 40)
+            candidates.append({
+                "error_type": rng.choice(labels),
+                "text_span": report[start:end],
+                "originating_step": rng.randint(1, 6),
+                "severity": rng.choice(("minor", "moderate", "major")),
+                "confidence": rng.random(),
+                "span_start": start,
+                "span_end": end
+            })
+        
+        best = float("inf")
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            merged = consolidator.merge(candidates)
+            best = min(best, time.perf_counter() - begin)
+        results.append({"candidates": size, "wall_time": best, "merged": len(merged),
+                        "us_per_candidate": best / size * 1e6})
+    return results
+
+# Benchmark suites by name, with the arguments of a quick run
+SUITES = {
+    "extraction": (benchmark_extraction, {"n_reports": 10000, "repeat": 1}),
+    "throughput": (benchmark_throughput, {"n_reports": 24, "concurrency": (1, 4), "latency": 0.005}),
+    "parsing": (benchmark_parsing, {"n_reports": 200, "repeat": 1}),
+    "consolidation": (benchmark_consolidation, {"sizes": (100, 1000), "repeat": 1}),
+    "evaluator": (benchmark_evaluator, {"sizes": (1000,)}),
+    "startup": (measure_startup, {})
+}
+
+def run_benchmarks(path=None, suites=None, quick=False):
+    """
+    Run benchmark suites and write their results as JSON.
+    
+    Args:
+        path (str): Output file (None only returns the results)
+        suites (iterable): Names of the suites to run (defaults to all of ``SUITES``)
+        quick (bool): Use small corpora, e.g. for a smoke run
+        
+    Returns:
+        dict: ``environment`` (interpreter, platform, commit, time) and
+            ``results`` by suite
+    """
+    suites = list(SUITES) if suites is None else list(suites)
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark suites: {sorted(unknown)}")
+    
+    results = {}
+    for name in suites:
+        function, quick_arguments = SUITES[name]
+        results[name] = function(**quick_arguments) if quick else function()
+    
+    output = {"environment": _environment(), "quick": quick, "results": results}
+    if path is not None:
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        os.replace(temporary, path)
+    return output
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Compare two ``run_benchmarks`` outputs metric by metric.
+    
+    Wall times and latencies should not grow and rates should not shrink by
+    more than ``tolerance``; other numbers are not compared.
+    
+    Args:
+        baseline (dict): Earlier results
+        current (dict): New results
+        tolerance (float): Relative change tolerated before flagging
+        
+    Returns:
+        list: Per metric present in both, its path, both values, the ratio
+            current / baseline and whether it regressed
+    """
+    baseline_metrics = dict(_numeric_leaves(baseline.get("results", {})))
+    comparison = []
+    for path, value in _numeric_leaves(current.get("results", {})):
+        name = path.rsplit(".", 1)[-1]
+        higher_is_better = name.endswith("per_second") or name == "speedup"
+        lower_is_better = "wall_time" in name or name.startswith("latency") or name.endswith("seconds")
+        if path not in baseline_metrics or not (higher_is_better or lower_is_better) or not baseline_metrics[path]:
+            continue
+        ratio = value / baseline_metrics[path]
+        regressed = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+        comparison.append({
+            "metric": path, "baseline": baseline_metrics[path], "current": value,
+            "ratio": ratio, "regressed": regressed
+        })
+    return comparison
+
+def _numeric_leaves(value, path=""):
+    """(dotted path, number) pairs of a nested result; list items are keyed by their first field."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _numeric_leaves(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = f"{next(iter(item))}={next(iter(item.values()))}" if isinstance(item, dict) and item else index
+            yield from _numeric_leaves(item, f"{path}[{label}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, value
+
+def _environment():
+    """Where and when a benchmark ran, so results can be compared like for like."""
+    import numpy as np
+    
+    from . import __version__
+    
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "radcot": __version__,
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+def main(argv=None):
+    """Command line entry point: ``python -m radcot.benchmark``."""
+    parser = argparse.ArgumentParser(description="Run the offline RadCoT benchmark suites.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="Suite to run (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Use small corpora")
+    parser.add_argument("--compare", help="Earlier results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change tolerated")
+    args = parser.parse_args(argv)
+    
+    output = run_benchmarks(args.output, args.suite, args.quick)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = [entry for entry in compare_results(baseline, output, args.tolerance) if entry["regressed"]]
+        for entry in regressions:
+            print(f"REGRESSION {entry['metric']}: {entry['baseline']:.4g} -> {entry['current']:.4g}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
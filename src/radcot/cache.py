@@ -0,0 +1,383 @@
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from . import instrumentation
+from .models import LLMInterface
+
+class ResponseCache:
+    """
+    Content-addressed response store: an in-memory LRU in front of SQLite.
+    
+    Entries are keyed on a SHA-256 digest of the model name, the full prompt
+    and the decoding parameters, so a re-run of an unchanged report with the
+    same decoding settings is served without calling the model.
+    """
+    
+    def __init__(self, path, memory_entries=1024, max_bytes=None, max_age=None):
+        """
+        Initialize the response cache.
+        
+        Args:
+            path (str): Path of the SQLite database file (created if missing)
+            memory_entries (int): Capacity of the in-memory LRU
+            max_bytes (int): Upper bound on stored response bytes on disk
+                (None for unbounded)
+            max_age (float): Entries older than this many seconds are treated
+                as misses and evicted (None for no expiry)
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, "
+            "size INTEGER, created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+    
+    @staticmethod
+    def make_key(model_name, prompt, params):
+        """
+        Build the content address for a generation request.
+        
+        Args:
+            model_name (str): Name of the model producing the response
+            prompt (str): Full prompt text
+            params (dict): Decoding parameters
+            
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        payload = json.dumps([model_name, prompt, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key):
+        """
+        Look up a cached response.
+        
+        Args:
+            key (str): Content address from ``make_key``
+            
+        Returns:
+            str: Cached response, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+            
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            
+            response, created = row
+            if self._expired(created, now):
+                self._delete(key)
+                self._stats["misses"] += 1
+                return None
+            
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, response, created)
+            self._stats["disk_hits"] += 1
+            return response
+    
+    def put(self, key, model_name, response):
+        """
+        Store a response and enforce the size budget.
+        
+        Args:
+            key (str): Content address from ``make_key``
+            model_name (str): Name of the model that produced the response
+            response (str): Generated text
+        """
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response, size, now, now)
+            )
+            self._db.commit()
+            self._remember(key, response, now)
+            self._stats["writes"] += 1
+            if self.max_bytes is not None:
+                self._enforce_size()
+    
+    def evict(self):
+        """
+        Remove expired entries and enforce the size budget.
+        
+        Returns:
+            int: Number of entries evicted
+        """
+        with self._lock:
+            before = self._stats["evictions"]
+            if self.max_age is not None:
+                cutoff = time.time() - self.max_age
+                cursor = self._db.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+                self._stats["evictions"] += cursor.rowcount
+                for key in [k for k, (_, created) in self._memory.items() if created < cutoff]:
+                    del self._memory[key]
+                self._db.commit()
+            if self.max_bytes is not None:
+                self._enforce_size()
+            return self._stats["evictions"] - before
+    
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+    
+    def stats(self):
+        """
+        Report cache effectiveness.
+        
+        Returns:
+            dict: Hit/miss counters, hit rate and on-disk footprint
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats.update({
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size
+        })
+        return stats
+    
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._db.close()
+    
+    def _expired(self, created, now):
+        return self.max_age is not None and now - created > self.max_age
+    
+    def _remember(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _delete(self, key):
+        self._memory.pop(key, None)
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._db.commit()
+        self._stats["evictions"] += 1
+    
+    def _enforce_size(self):
+        """Drop least recently accessed entries until under ``max_bytes``."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._db.commit()
+        for (key,) in victims:
+            self._memory.pop(key, None)
+        self._stats["evictions"] += len(victims)
+
+class CachedModel(LLMInterface):
+    """
+    Wrap any LLMInterface so identical generation requests hit a ResponseCache.
+    
+    Caching assumes deterministic decoding, so requests that do not pass a
+    temperature are decoded at temperature 0, as fixed by the supplementary
+    protocol, rather than at the backend's sampling default. A caller that
+    passes a nonzero temperature gets one sample replayed on every re-run.
+    Hits are counted on the instrumentation span of each prompt.
+    """
+    
+    def __init__(self, model, cache):
+        """
+        Initialize the caching wrapper.
+        
+        Args:
+            model (LLMInterface): Backend to delegate cache misses to
+            cache (ResponseCache): Response store
+        """
+        self.model = model
+        self.cache = cache
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+        # Default decoding parameters come from the backend, not from wrappers
+        # such as BatchingModel whose ``generate`` only takes ``**kwargs``
+        backend = model
+        while isinstance(getattr(backend, "model", None), LLMInterface):
+            backend = backend.model
+        self._signature = inspect.signature(backend.generate)
+        self._greedy = {"temperature": 0.0} if "temperature" in self._signature.parameters else {}
+    
+    def generate(self, prompt, **kwargs):
+        """
+        Generate text, serving repeated requests from the cache.
+        
+        Args:
+            prompt (str): Input prompt
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Returns:
+            str: Generated text
+        """
+        kwargs = {**self._greedy, **kwargs}
+        key = ResponseCache.make_key(self.model_name, prompt, self._decoding_params(prompt, kwargs))
+        response = self.cache.get(key)
+        if response is None:
+            response = self.model.generate(prompt, **kwargs)
+            self.cache.put(key, self.model_name, response)
+        else:
+            instrumentation.record(cache_hits=1)
+        return response
+    
+    def generate_batch(self, prompts, **kwargs):
+        """
+        Generate text for several prompts, batching only the cache misses.
+        
+        Args:
+            prompts (list): Input prompts
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Returns:
+            list: Generated text for each prompt, in input order
+        """
+        kwargs = {**self._greedy, **kwargs}
+        keys = [
+            ResponseCache.make_key(self.model_name, prompt, self._decoding_params(prompt, kwargs))
+            for prompt in prompts
+        ]
+        responses = [self.cache.get(key) for key in keys]
+        misses = [i for i, response in enumerate(responses) if response is None]
+        
+        spans = None
+        if instrumentation.enabled():
+            for i, response in enumerate(responses):
+                if response is not None:
+                    instrumentation.record(row=i, cache_hits=1)
+            # The misses form a smaller batch; keep each attributed to its own span
+            spans = [instrumentation.target(i) for i in misses]
+        
+        if misses:
+            with instrumentation.rows(spans):
+                generated = self.model.generate_batch([prompts[i] for i in misses], **kwargs)
+            for i, response in zip(misses, generated):
+                self.cache.put(keys[i], self.model_name, response)
+                responses[i] = response
+        return responses
+    
+    def generate_with_prefix(self, prefix, suffixes, **kwargs):
+        """
+        Generate text for prompts sharing a prefix, prefilling it only for the cache misses.
+        
+        Entries are keyed by the full prompt, so they are shared with
+        ``generate`` and ``generate_batch``.
+        
+        Args:
+            prefix (str): Shared leading text of every prompt
+            suffixes (list): Prompt-specific trailing text
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Returns:
+            list: Generated text for each suffix, in input order
+        """
+        kwargs = {**self._greedy, **kwargs}
+        keys = [
+            ResponseCache.make_key(self.model_name, prefix + suffix, self._decoding_params(prefix + suffix, kwargs))
+            for suffix in suffixes
+        ]
+        responses = [self.cache.get(key) for key in keys]
+        misses = [i for i, response in enumerate(responses) if response is None]
+        
+        spans = None
+        if instrumentation.enabled():
+            for i, response in enumerate(responses):
+                if response is not None:
+                    instrumentation.record(row=i, cache_hits=1)
+            spans = [instrumentation.target(i) for i in misses]
+        
+        if misses:
+            with instrumentation.rows(spans):
+                generated = self.model.generate_with_prefix(prefix, [suffixes[i] for i in misses], **kwargs)
+            for i, response in zip(misses, generated):
+                self.cache.put(keys[i], self.model_name, response)
+                responses[i] = response
+        return responses
+    
+    def generate_stream(self, prompt, **kwargs):
+        """
+        Stream text, replaying a cached response as a single chunk.
+        
+        A streamed response is cached only if it is read to the end; one the
+        caller closes early is incomplete.
+        
+        Args:
+            prompt (str): Input prompt
+            **kwargs: Decoding parameters forwarded to the wrapped model
+            
+        Yields:
+            str: Successive chunks of generated text
+        """
+        kwargs = {**self._greedy, **kwargs}
+        key = ResponseCache.make_key(self.model_name, prompt, self._decoding_params(prompt, kwargs))
+        response = self.cache.get(key)
+        if response is not None:
+            instrumentation.record(cache_hits=1)
+            yield response
+            return
+        
+        chunks = []
+        stream = self.model.generate_stream(prompt, **kwargs)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            stream.close()
+        self.cache.put(key, self.model_name, "".join(chunks))
+    
+    def close(self):
+        """Close the response cache; the wrapped model is left open."""
+        self.cache.close()
+    
+    def _decoding_params(self, prompt, kwargs):
+        """Resolve explicit and default decoding parameters for the cache key."""
+        bound = self._signature.bind(prompt, **kwargs)
+        bound.apply_defaults()
+        # The first bound argument is the prompt itself, which is keyed separately
+        return dict(list(bound.arguments.items())[1:])
@@ -0,0 +1,87 @@
+import argparse
+import json
+import sys
+
+from .runner import CHECKPOINT_EVERY, merge_results, run_shard, run_sharded, shard_path
+
+def _detector_options(args):
+    """``RadCoT`` keyword arguments from the ``run`` options."""
+    return {
+        "model_name": args.model,
+        "use_radcot": not args.standard,
+        "strategy": args.strategy,
+        "parallel_steps": args.parallel_steps,
+        "batch_size": args.batch_size,
+        "prefix_cache": args.prefix_cache,
+        "cache_path": args.cache,
+        "prescreen": args.prescreen,
+        "scheduler": True if args.schedule else None,
+        "scoped_prompts": args.scoped_prompts,
+        "step_token_budget": args.step_token_budget,
+        "model_config": json.loads(args.model_config) if args.model_config else None
+    }
+
+def _run(args):
+    options = _detector_options(args)
+    if args.shard is not None:
+        # One shard of a run spread over machines or pods; merge once all are done
+        summary = run_shard(args.input, args.output, args.shard, args.num_shards or 1, options,
+                            args.max_in_flight, args.checkpoint_every)
+    elif (args.num_shards or args.workers) > 1:
+        summary = run_sharded(args.input, args.output, args.num_shards or args.workers, options,
+                              args.workers, args.max_in_flight, args.checkpoint_every, merge=not args.no_merge)
+    else:
+        summary = run_shard(args.input, args.output, 0, 1, options, args.max_in_flight, args.checkpoint_every)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+def _merge(args):
+    paths = [shard_path(args.output, shard, args.num_shards) for shard in range(args.num_shards)]
+    print(json.dumps(merge_results(paths, args.output), indent=2))
+    return 0
+
+def main(argv=None):
+    """Command line entry point: ``radcot run`` and ``radcot merge``."""
+    parser = argparse.ArgumentParser(prog="radcot", description="RadCoT error detection over report corpora.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run = commands.add_parser("run", help="Detect errors in a JSONL corpus, resuming an interrupted run")
+    run.add_argument("input", help="JSONL file of input-contract records (REPORT_TEXT, MODALITY, ...)")
+    run.add_argument("--output", "-o", required=True, help="JSONL results file")
+    run.add_argument("--model", required=True, help="Model name, e.g. gpt-4o, llama-3-70b or mock")
+    run.add_argument("--model-config", help="Backend configuration as a JSON object")
+    run.add_argument("--standard", action="store_true", help="Use standard prompting instead of RadCoT")
+    run.add_argument("--strategy", choices=("stepwise", "fused"), default="stepwise")
+    run.add_argument("--parallel-steps", action="store_true", help="Run the six steps concurrently")
+    run.add_argument("--batch-size", type=int, help="Coalesce prompts into batches of this size")
+    run.add_argument("--prefix-cache", action="store_true", help="Reuse the report prefix across steps")
+    run.add_argument("--cache", help="SQLite response cache")
+    run.add_argument("--prescreen", choices=("narrow", "skip"), help="Rule-based pre-screen mode")
+    run.add_argument("--schedule", action="store_true", help="Schedule steps per report")
+    run.add_argument("--scoped-prompts", action="store_true", help="Give each step only the sections it needs")
+    run.add_argument("--step-token-budget", type=int, help="Maximum report tokens per step")
+    run.add_argument("--max-in-flight", type=int, default=8, help="Reports processed concurrently per process")
+    run.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                     help="Results written between checkpoints")
+    run.add_argument("--workers", type=int, default=1, help="Worker processes, one RadCoT instance each")
+    run.add_argument("--num-shards", type=int, help="Static shards of the input (defaults to --workers)")
+    run.add_argument("--shard", type=int, help="Run only this shard (with --num-shards), e.g. one per pod")
+    run.add_argument("--no-merge", action="store_true", help="Leave the shard results unmerged")
+    run.set_defaults(handler=_run)
+    
+    merge = commands.add_parser("merge", help="Merge the shard results of a sharded run")
+    merge.add_argument("output", help="Results file the shards were written for")
+    merge.add_argument("--num-shards", type=int, required=True)
+    merge.set_defaults(handler=_merge)
+    
+    args = parser.parse_args(argv)
+    if getattr(args, "shard", None) is not None and not args.num_shards:
+        parser.error("--shard requires --num-shards")
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        print(f"radcot: error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
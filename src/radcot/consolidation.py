@@ -0,0 +1,165 @@
+import re
+
+from .taxonomy import CATEGORIES, DISAMBIGUATION_PRIORITY, normalize_category
+
+# Categories whose errors on overlapping spans describe the same problem:
+# a mistyped measurement is reported as typographical or numerical, a
+# misread finding as an interpretation error or a findings-impression
+# discrepancy. Every other category is compatible only with itself.
+COMPATIBLE_CATEGORIES = (
+    ("T1_Typographical", "T2_Numerical"),
+    ("T4_Interpretation", "T5_FindingsImpressionDiscrepancy")
+)
+
+_SEVERITY_RANKS = {"minor": 0, "moderate": 1, "major": 2}
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+class ErrorConsolidator:
+    """
+    Merge the errors raised by all reasoning steps into distinct problems.
+    
+    Errors quoting a located span (``span_start``/``span_end``) are placed on
+    an interval index of report offsets: sorted by compatibility class and
+    start offset, then swept once, merging every error whose span overlaps
+    or touches the span accumulated so far. Errors without offsets are
+    matched by a hash of their category class and whitespace- and
+    case-normalized text, against each other and against the located ones.
+    Merging is O(n log n) in the number of candidate errors.
+    
+    A merged error keeps its most confident member's fields, spans the union
+    of the member spans, takes the highest-priority category of the members
+    (``taxonomy.DISAMBIGUATION_PRIORITY``), the highest severity and
+    confidence, and lists the steps that raised it in ``steps``.
+    """
+    
+    def __init__(self, max_gap=0, compatible=COMPATIBLE_CATEGORIES):
+        """
+        Initialize the consolidator.
+        
+        Args:
+            max_gap (int): Characters allowed between two spans that are
+                still merged (0 merges overlapping and touching spans only)
+            compatible (tuple): Groups of category keys that may merge
+        """
+        self.max_gap = max_gap
+        self._classes = {}
+        for group in compatible:
+            for key in group:
+                self._classes[key] = group[0]
+    
+    def merge(self, errors):
+        """
+        Merge duplicate and overlapping errors.
+        
+        Args:
+            errors (list): Errors from all steps (structured dicts; other
+                values are only deduplicated exactly)
+                
+        Returns:
+            list: Merged errors, located ones in report order, then the
+                others in their original order
+        """
+        located = []
+        unlocated = []
+        others = {}
+        for position, error in enumerate(errors):
+            if not isinstance(error, dict):
+                others.setdefault(_normalize(error) if isinstance(error, str) else repr(error), error)
+                continue
+            category = normalize_category(error.get("error_type"))
+            entry = (self._classes.get(category, category or str(error.get("error_type"))), position, error, category)
+            if _is_located(error):
+                located.append(entry)
+            else:
+                unlocated.append(entry)
+        
+        # Interval sweep per compatibility class
+        clusters = []
+        current = None
+        end = None
+        for entry in sorted(located, key=lambda entry: (entry[0], entry[2]["span_start"], entry[1])):
+            error = entry[2]
+            if current is not None and entry[0] == current[0][0] and error["span_start"] <= end + self.max_gap:
+                current.append(entry)
+                end = max(end, error["span_end"])
+                continue
+            current = [entry]
+            end = error["span_end"]
+            clusters.append(current)
+        
+        # Exact duplicates by normalized text, within a compatibility class
+        by_text = {}
+        for cluster in clusters:
+            for entry in cluster:
+                by_text.setdefault((entry[0], _normalize(entry[2].get("text_span"))), cluster)
+        unlocated_clusters = []
+        for entry in unlocated:
+            key = (entry[0], _normalize(entry[2].get("text_span")))
+            cluster = by_text.get(key)
+            if cluster is None:
+                cluster = by_text[key] = []
+                unlocated_clusters.append(cluster)
+            cluster.append(entry)
+        
+        # A cluster's first entry has its lowest start offset
+        clusters.sort(key=lambda cluster: cluster[0][2]["span_start"])
+        merged = [self._combine(cluster) for cluster in clusters + unlocated_clusters]
+        return merged + list(others.values())
+    
+    def _combine(self, cluster):
+        """One error standing for a cluster of duplicates."""
+        steps = sorted({entry[2]["originating_step"] for entry in cluster
+                        if isinstance(entry[2].get("originating_step"), int)})
+        if len(cluster) == 1:
+            error = dict(cluster[0][2])
+            error["steps"] = steps
+            return error
+        
+        base = max(cluster, key=lambda entry: (_number(entry[2].get("confidence")), -entry[1]))[2]
+        error = dict(base)
+        error["steps"] = steps
+        
+        categories = {entry[3] for entry in cluster if entry[3] is not None}
+        if categories:
+            category = min(categories, key=DISAMBIGUATION_PRIORITY.index)
+            error["error_type"] = CATEGORIES[category]
+            if "category" in base:
+                error["category"] = category
+        
+        severities = [entry[2]["severity"] for entry in cluster if entry[2].get("severity") in _SEVERITY_RANKS]
+        if severities:
+            error["severity"] = max(severities, key=_SEVERITY_RANKS.get)
+        confidences = [entry[2]["confidence"] for entry in cluster
+                       if isinstance(entry[2].get("confidence"), (int, float))]
+        if confidences:
+            error["confidence"] = max(confidences)
+        if "uncertain" in base:
+            error["uncertain"] = all(entry[2].get("uncertain", False) for entry in cluster)
+        
+        members = sorted((entry[2] for entry in cluster if _is_located(entry[2])),
+                         key=lambda member: member["span_start"])
+        if members:
+            # Stitch the union of the member spans back together from their verbatim quotes
+            text = members[0]["text_span"]
+            start, end = members[0]["span_start"], members[0]["span_end"]
+            for member in members[1:]:
+                if member["span_start"] > end:
+                    # Spans merged across a gap: the text in between is unknown
+                    break
+                if member["span_end"] > end:
+                    text += member["text_span"][end - member["span_start"]:]
+                    end = member["span_end"]
+            else:
+                error.update(text_span=text, span_start=start, span_end=end)
+        return error
+
+def _is_located(error):
+    """Whether an error's offsets delimit its quoted text."""
+    start, end, text = error.get("span_start"), error.get("span_end"), error.get("text_span")
+    return isinstance(start, int) and isinstance(end, int) and isinstance(text, str) and end - start == len(text)
+
+def _normalize(text):
+    return _WHITESPACE_PATTERN.sub(" ", text).strip().casefold() if isinstance(text, str) else repr(text)
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else -1.0
@@ -1,38 +1,87 @@
+from collections import Counter
+
 import numpy as np
-from sklearn.metrics import precision_recall_fscore_support, cohen_kappa_score
+from sklearn.metrics import cohen_kappa_score
+
+from .spans import SpanMatcher
+from .taxonomy import CATEGORY_KEYS
 
 class RadCoTEvaluator:
     """Evaluator for RadCoT framework performance."""
     
-    def __init__(self):
-        """Initialize RadCoT evaluator."""
-        pass
+    def __init__(self, sentence_window=1):
+        """
+        Initialize RadCoT evaluator.
+        
+        Args:
+            sentence_window (int): Sentence distance within which a predicted
+                span may match a reference span under span matching
+        """
+        self.span_matcher = SpanMatcher(window=sentence_window)
     
-    def evaluate(self, predictions, ground_truth):
+    def evaluate(self, predictions, ground_truth, reports=None, abstained=None):
         """
         Evaluate error detection performance.
         
+        Without ``reports``, errors match on equal location and type. With
+        ``reports``, the published ``evaluation_alignment`` rule applies: a
+        prediction matches when its ``text_span`` falls in the same or an
+        adjacent sentence as the reference span and the normalized categories
+        agree.
+        
         Args:
-            predictions (list): List of predicted errors
-            ground_truth (list): List of ground truth errors
+            predictions (list or dict): List of predicted errors, or predicted
+                errors by report ID when ``reports`` is given
+            ground_truth (list or dict): List of ground truth errors, or ground
+                truth errors by report ID when ``reports`` is given
+            reports (dict): Report text by report ID, enabling span matching
+            abstained (iterable): Report IDs the model abstained on; excluded
+                from scoring and counted separately
             
         Returns:
             dict: Evaluation metrics
         """
-        # Match predictions to ground truth
-        matched_predictions, matched_ground_truth = self._match_errors(predictions, ground_truth)
+        if reports is not None:
+            return self._evaluate_spans(predictions, ground_truth, reports, abstained)
+        
+        # Match predictions to ground truth, one prediction per reference
+        matched, false_positives = self._assign_matches(predictions, ground_truth)
         
         # Calculate metrics
-        precision, recall, f1, _ = precision_recall_fscore_support(
-            matched_ground_truth, 
-            matched_predictions, 
-            average='binary'
-        )
+        true_positives = int(matched.sum())
+        false_negatives = len(ground_truth) - true_positives
+        precision, recall, f1 = self._precision_recall_f1(true_positives, false_positives, false_negatives)
         
         return {
             "precision": precision,
             "recall": recall,
-            "f1": f1
+            "f1": f1,
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "false_negatives": false_negatives
+        }
+    
+    def _evaluate_spans(self, predictions, ground_truth, reports, abstained=None):
+        """Score a corpus with sentence-level span matching."""
+        abstained = set(abstained or ())
+        if abstained:
+            predictions = {rid: errors for rid, errors in predictions.items() if rid not in abstained}
+            ground_truth = {rid: errors for rid, errors in ground_truth.items() if rid not in abstained}
+        
+        matches = self.span_matcher.match(predictions, ground_truth, reports)
+        true_positives = int(matches["references"]["matched"].sum())
+        false_positives = int((~matches["predictions"]["matched"]).sum())
+        false_negatives = len(matches["references"]["matched"]) - true_positives
+        precision, recall, f1 = self._precision_recall_f1(true_positives, false_positives, false_negatives)
+        
+        return {
+            "precision": precision,
+            "recall": recall,
+            "f1": f1,
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "false_negatives": false_negatives,
+            "abstained_n": len(abstained)
         }
     
     def evaluate_by_error_type(self, predictions, ground_truth):
@@ -46,19 +95,14 @@ class RadCoTEvaluator:
         Returns:
             dict: Evaluation metrics by error type
         """
-        error_types = set([error["type"] for error in ground_truth])
-        results = {}
+        error_types = set(error["type"] for error in ground_truth)
+        grouped = self.evaluate_grouped(self.build_table(predictions, ground_truth), by=["type"])
         
-        for error_type in error_types:
-            # Filter errors by type
-            type_predictions = [error for error in predictions if error["type"] == error_type]
-            type_ground_truth = [error for error in ground_truth if error["type"] == error_type]
-            
-            # Evaluate for this error type
-            type_results = self.evaluate(type_predictions, type_ground_truth)
-            results[error_type] = type_results
-        
-        return results
+        return {
+            row["type"]: self._metrics_of(row)
+            for row in grouped.to_dict("records")
+            if row["type"] in error_types
+        }
     
     def evaluate_by_modality(self, predictions, ground_truth, modalities):
         """
@@ -72,26 +116,128 @@ class RadCoTEvaluator:
         Returns:
             dict: Evaluation metrics by modality
         """
-        modality_types = set(modalities.values())
-        results = {}
+        predictions = {rid: errors for rid, errors in predictions.items() if rid in modalities}
+        ground_truth = {rid: errors for rid, errors in ground_truth.items() if rid in modalities}
+        table = self.build_table(predictions, ground_truth, modalities=modalities)
+        grouped = {row["modality"]: row for row in self.evaluate_grouped(table, by=["modality"]).to_dict("records")}
         
-        for modality in modality_types:
-            # Filter reports by modality
-            modality_report_ids = [report_id for report_id, mod in modalities.items() if mod == modality]
-            
-            # Filter errors by modality
-            modality_predictions = {report_id: predictions[report_id] for report_id in modality_report_ids if report_id in predictions}
-            modality_ground_truth = {report_id: ground_truth[report_id] for report_id in modality_report_ids if report_id in ground_truth}
+        empty = {"true_positives": 0, "false_positives": 0, "false_negatives": 0}
+        return {
+            modality: self._metrics_of(grouped.get(modality, empty))
+            for modality in set(modalities.values())
+        }
+    
+    def build_table(self, predictions, ground_truth, modalities=None, reports=None):
+        """
+        Match a corpus once and lay the outcome out as a columnar table.
+        
+        Each predicted and each reference error becomes one row with columns
+        ``report_id``, ``modality``, ``type``, ``severity``, ``source``
+        ("prediction" or "reference") and ``matched``. The table can then be
+        scored under any grouping with ``evaluate_grouped`` without matching
+        again.
+        
+        Args:
+            predictions (list or dict): List of predicted errors, or predicted
+                errors by report ID
+            ground_truth (list or dict): List of ground truth errors, or ground
+                truth errors by report ID
+            modalities (dict): Dictionary mapping report IDs to modalities
+            reports (dict): Report text by report ID, enabling span matching
+                (types are then normalized to taxonomy keys)
             
-            # Flatten for evaluation
-            flat_predictions = [error for report in modality_predictions.values() for error in report]
-            flat_ground_truth = [error for report in modality_ground_truth.values() for error in report]
+        Returns:
+            pandas.DataFrame: One row per error
+        """
+        import pandas as pd
+        
+        if not isinstance(predictions, dict):
+            predictions = {None: predictions}
+        if not isinstance(ground_truth, dict):
+            ground_truth = {None: ground_truth}
+        
+        if reports is not None:
+            matches = self.span_matcher.match(predictions, ground_truth, reports)
+            pred_matched = matches["predictions"]["matched"]
+            gt_matched = matches["references"]["matched"]
+            pred_types = self._category_column(predictions, matches["predictions"]["category"])
+            gt_types = self._category_column(ground_truth, matches["references"]["category"])
+        else:
+            pred_keys = [(rid,) + self._match_key(e) for rid, errors in predictions.items() for e in errors or ()]
+            gt_keys = [(rid,) + self._match_key(e) for rid, errors in ground_truth.items() for e in errors or ()]
+            pred_matched, gt_matched = self._match_flags(pred_keys, gt_keys)
+            pred_types = [key[2] for key in pred_keys]
+            gt_types = [key[2] for key in gt_keys]
+        
+        report_ids, severities = [], []
+        for errors_by_report in (predictions, ground_truth):
+            for rid, errors in errors_by_report.items():
+                for error in errors or ():
+                    report_ids.append(rid)
+                    severities.append(error.get("severity"))
+        
+        modalities = modalities or {}
+        n_predictions = len(pred_types)
+        return pd.DataFrame({
+            "report_id": report_ids,
+            "modality": [modalities.get(rid) for rid in report_ids],
+            "type": list(pred_types) + list(gt_types),
+            "severity": severities,
+            "source": pd.Categorical(
+                ["prediction"] * n_predictions + ["reference"] * len(gt_types),
+                categories=["prediction", "reference"]
+            ),
+            "matched": np.concatenate([
+                np.asarray(pred_matched, dtype=bool),
+                np.asarray(gt_matched, dtype=bool)
+            ])
+        })
+    
+    def evaluate_grouped(self, table, by=("modality", "type")):
+        """
+        Compute precision, recall and F1 for every group in one pass.
+        
+        Matched references are true positives, unmatched references false
+        negatives and unmatched predictions false positives; all three are
+        summed per group with a single groupby, so a cross-tab such as
+        modality x type x severity costs the same as one overall score.
+        Predictions are grouped by their own attributes and references by
+        theirs.
+        
+        Args:
+            table (pandas.DataFrame): Table from ``build_table``
+            by (list): Grouping columns (empty for a single overall row)
             
-            # Evaluate for this modality
-            modality_results = self.evaluate(flat_predictions, flat_ground_truth)
-            results[modality] = modality_results
+        Returns:
+            pandas.DataFrame: One row per group with the grouping columns,
+                ``true_positives``, ``false_positives``, ``false_negatives``,
+                ``precision``, ``recall`` and ``f1``
+        """
+        by = list(by)
+        reference = (table["source"] == "reference").to_numpy()
+        matched = table["matched"].to_numpy()
+        counts = table[by].assign(
+            true_positives=reference & matched,
+            false_positives=~reference & ~matched,
+            false_negatives=reference & ~matched
+        )
         
-        return results
+        columns = ["true_positives", "false_positives", "false_negatives"]
+        if by:
+            grouped = counts.groupby(by, dropna=False, sort=True)[columns].sum().reset_index()
+        else:
+            grouped = counts[columns].sum().to_frame().T
+        grouped[columns] = grouped[columns].astype(int)
+        
+        tp = grouped["true_positives"].to_numpy(dtype=float)
+        predicted = tp + grouped["false_positives"].to_numpy()
+        actual = tp + grouped["false_negatives"].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(predicted > 0, tp / predicted, 0.0)
+            recall = np.where(actual > 0, tp / actual, 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        
+        return grouped.assign(precision=precision, recall=recall, f1=f1)
     
     def calculate_intermodel_agreement(self, model1_predictions, model2_predictions, ground_truth):
         """
@@ -125,19 +271,105 @@ class RadCoTEvaluator:
         Returns:
             tuple: Binary arrays of matched predictions and ground truth
         """
-        # Implementation of error matching logic
-        # This is a simplified version - real implementation would need more sophisticated matching
-        
-        matched_predictions = np.zeros(len(ground_truth), dtype=int)
+        matched_predictions, _ = self._assign_matches(predictions, ground_truth)
         matched_ground_truth = np.ones(len(ground_truth), dtype=int)
         
+        return matched_predictions, matched_ground_truth
+    
+    def _assign_matches(self, predictions, ground_truth):
+        """
+        Assign predictions to ground truth errors one-to-one in linear time.
+        
+        Predictions are bucketed by their match key, so each reference is
+        resolved with a single hash lookup; a matched prediction is consumed
+        and cannot satisfy a second reference.
+        
+        Args:
+            predictions (list): List of predicted errors
+            ground_truth (list): List of ground truth errors
+            
+        Returns:
+            tuple: Binary array marking matched ground truth errors, and the
+                number of predictions left unmatched (false positives)
+        """
+        available = Counter(self._match_key(error) for error in predictions)
+        matched = np.zeros(len(ground_truth), dtype=int)
+        
         for i, gt_error in enumerate(ground_truth):
-            for pred_error in predictions:
-                if self._errors_match(gt_error, pred_error):
-                    matched_predictions[i] = 1
-                    break
+            key = self._match_key(gt_error)
+            if available[key] > 0:
+                available[key] -= 1
+                matched[i] = 1
         
-        return matched_predictions, matched_ground_truth
+        false_positives = len(predictions) - int(matched.sum())
+        return matched, false_positives
+    
+    def _match_flags(self, pred_keys, gt_keys):
+        """
+        One-to-one matching on hashable keys, flagging both sides.
+        
+        Args:
+            pred_keys (list): Match key per predicted error
+            gt_keys (list): Match key per ground truth error
+            
+        Returns:
+            tuple: Boolean arrays marking matched predictions and matched
+                ground truth errors
+        """
+        available = {}
+        for i, key in enumerate(pred_keys):
+            available.setdefault(key, []).append(i)
+        
+        pred_matched = np.zeros(len(pred_keys), dtype=bool)
+        gt_matched = np.zeros(len(gt_keys), dtype=bool)
+        for i, key in enumerate(gt_keys):
+            candidates = available.get(key)
+            if candidates:
+                pred_matched[candidates.pop()] = True
+                gt_matched[i] = True
+        
+        return pred_matched, gt_matched
+    
+    def _category_column(self, errors_by_report, codes):
+        """Taxonomy key per error, or its raw label when it is unrecognized."""
+        raw = [e.get("error_type", e.get("type")) for errors in errors_by_report.values() for e in errors or ()]
+        return [CATEGORY_KEYS[code] if code >= 0 else label for code, label in zip(codes, raw)]
+    
+    def _metrics_of(self, counts):
+        """Metrics dict, as returned by ``evaluate``, from a row of match counts."""
+        true_positives = int(counts["true_positives"])
+        false_positives = int(counts["false_positives"])
+        false_negatives = int(counts["false_negatives"])
+        precision, recall, f1 = self._precision_recall_f1(true_positives, false_positives, false_negatives)
+        return {
+            "precision": precision,
+            "recall": recall,
+            "f1": f1,
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "false_negatives": false_negatives
+        }
+    
+    def _match_key(self, error):
+        """
+        Key under which two errors match (see ``_errors_match``).
+        
+        Args:
+            error (dict): Error with location and type information
+            
+        Returns:
+            tuple: Hashable (location, type) key
+        """
+        return (error.get("location"), error.get("type"))
+    
+    def _precision_recall_f1(self, true_positives, false_positives, false_negatives):
+        """Compute precision, recall and F1 from match counts (0.0 when undefined)."""
+        predicted = true_positives + false_positives
+        actual = true_positives + false_negatives
+        precision = true_positives / predicted if predicted else 0.0
+        recall = true_positives / actual if actual else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return precision, recall, f1
     
     def _errors_match(self, error1, error2):
         """
@@ -150,9 +382,5 @@ class RadCoTEvaluator:
         Returns:
             bool: True if errors match, False otherwise
         """
-        # Implementation of error matching criteria
-        # This is a simplified version - real implementation would need more sophisticated matching
-        
         # Example: Match if location and type are the same
-        return (error1.get("location") == error2.get("location") and 
-                error1.get("type") == error2.get("type"))
\ No newline at end of file
+        return self._match_key(error1) == self._match_key(error2)
\ No newline at end of file
@@ -1,136 +1,942 @@
+import contextlib
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Prompt keys of the six RadCoT reasoning steps, in reasoning trace order
+RADCOT_STEPS = [
+    "anatomical_validation",
+    "measurement_consistency",
+    "cross_sectional",
+    "findings_impression",
+    "clinical_completeness",
+    "terminology_accuracy"
+]
+
+# Execution strategies: six separate step calls, or the single S1.2 fused prompt
+STRATEGIES = ("stepwise", "fused")
+
+# Rule-based pre-screen modes: tell the steps about rule hits so they are not
+# re-derived, or additionally skip the steps whose checks the rules fully cover
+PRESCREEN_MODES = ("narrow", "skip")
+
+_FUSED_STEP_PATTERN = re.compile(r"^\s*Reasoning Step ([1-6])\s*:", re.IGNORECASE | re.MULTILINE)
+_FUSED_FINAL_PATTERN = re.compile(r"^\s*(?:FINAL OUTPUT|```|[\[{])", re.MULTILINE)
+
+# Streamed step output is complete once the model states there is nothing to report,
+# once its fenced JSON block closes, or once its issue list is followed by a blank
+# line and an unindented line that is neither a list item nor the start of JSON
+_NO_ISSUE_PATTERN = re.compile(r"no issues? identified in this step", re.IGNORECASE)
+_LIST_ITEM_PATTERN = re.compile(r"^[ \t]*(?:[-*\u2022]|\d+[.)])[ \t]+\S", re.MULTILINE)
+_LIST_END_PATTERN = re.compile(r"\n[ \t]*\n(?=[^\s\-*\u2022\d`{\[])")
+_FENCE_PATTERN = re.compile(r"^[ \t]*```", re.MULTILINE)
+
+# How often concurrent steps still queued for a worker are checked for having started
+_STEP_POLL_INTERVAL = 0.05
+
 class RadCoT:
     """
     Radiological Chain-of-Thought Framework for error detection in radiology reports.
     Implements the six-step reasoning process described in the paper.
     """
     
-    def __init__(self, model_name, use_radcot=True):
+    def __init__(self, model_name, use_radcot=True, parallel_steps=False,
+                 max_workers=None, step_timeout=None, cache_path=None, batch_size=None,
+                 prefix_cache=False, strategy="stepwise", stream_steps=False,
+                 preprocess=True, expand_abbreviations=False, prescreen=None, scheduler=None,
+                 scoped_prompts=False, step_token_budget=None, instrumentation=None, model_config=None,
+                 verify_spans=True):
         """
         Initialize RadCoT framework.
         
         Args:
             model_name (str): Name of the LLM to use (gpt-4o, llama-3-70b, mixtral-8x22b)
             use_radcot (bool): Whether to use RadCoT prompting or standard prompting
+            parallel_steps (bool): Whether to run the six reasoning steps concurrently
+            max_workers (int): Maximum number of steps in flight per report
+                (defaults to one worker per step)
+            step_timeout (float): Seconds each concurrent step may run, counted
+                from when a worker starts it, before it is abandoned (None
+                waits indefinitely)
+            cache_path (str): SQLite file for caching model responses across runs
+                (None disables caching)
+            batch_size (int): Maximum prompts per shared forward pass; when set,
+                step prompts of one report and of concurrent reports are
+                coalesced into ``generate_batch`` calls (None disables batching)
+            prefix_cache (bool): Whether to prefill the shared system-plus-report
+                prefix once per report and reuse it for every step (local models)
+            strategy (str): "stepwise" issues one call per reasoning step;
+                "fused" sends the single S1.2 prompt covering all six steps
+            stream_steps (bool): Whether to stream each step's output and stop
+                generation as soon as its issue list is complete
+            preprocess (bool): Whether to apply the input contract normalization
+                (NFKC, whitespace collapse) before prompting; error spans are
+                mapped back to the original report
+            expand_abbreviations (bool): Whether preprocessing also expands
+                anatomical abbreviations (the input contract forbids it, so
+                off by default)
+            prescreen (str): Run deterministic rule checks before the model;
+                "narrow" lists their hits in the step prompts so the model
+                does not repeat them, "skip" also skips the steps whose checks
+                the rules fully cover (see ``rules.STEP_COVERAGE``) (None
+                disables the pre-screen)
+            scheduler (StepScheduler): Decides per report which steps to run
+                from its modality, body region and features; True uses the
+                default policy (None always runs all six steps)
+            scoped_prompts (bool): Whether to give each step only the report
+                sections and sentences it needs, in compacted templates
+            step_token_budget (int): Maximum tokens of report input per step;
+                longer inputs are truncated deterministically and flagged
+                (None for unlimited)
+            instrumentation (Instrumentation): Collector of per-report and
+                per-step spans (wall time, queue wait, tokens, cache hits,
+                model); True creates one (None disables instrumentation)
+            model_config (dict): Backend configuration for the shared registry,
+                e.g. rate limits for gpt-4o or latency for the mock backend
+            verify_spans (bool): Whether to reject parsed errors whose
+                ``text_span`` does not occur in the report
         """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unsupported strategy: {strategy}")
+        if prescreen is not None and prescreen not in PRESCREEN_MODES:
+            raise ValueError(f"Unsupported prescreen mode: {prescreen}")
+        if strategy == "fused" and not use_radcot:
+            raise ValueError("The fused strategy requires use_radcot=True")
+        
         self.model_name = model_name
+        self.model_config = dict(model_config or {})
         self.use_radcot = use_radcot
-        self.model = self._load_model(model_name)
+        self.parallel_steps = parallel_steps
+        self.max_workers = max_workers
+        self.step_timeout = step_timeout
+        # Cancel flag of the step running on the current worker thread
+        self._step_state = threading.local()
+        self.batch_size = batch_size
+        self.prefix_cache = prefix_cache
+        self.strategy = strategy
+        self.stream_steps = stream_steps
+        self.preprocessor = self._make_preprocessor(expand_abbreviations) if preprocess else None
+        self.prescreen = prescreen
+        self.rule_checker = self._make_rule_checker() if prescreen is not None else None
+        self.scheduler = self._make_scheduler() if scheduler is True else scheduler or None
+        self.instrumentation = self._make_instrumentation() if instrumentation is True else instrumentation
         self.prompts = self._load_prompts(use_radcot)
+        self.parser = self._make_parser(use_radcot, verify_spans)
+        self.consolidator = self._make_consolidator()
+        self.model = self._load_model(model_name)
+        try:
+            if batch_size is not None:
+                self.model = self._wrap_with_batching(self.model, batch_size)
+            if cache_path is not None:
+                self.model = self._wrap_with_cache(self.model, cache_path)
+            self.assembler = None
+            if use_radcot and (scoped_prompts or step_token_budget is not None):
+                self.assembler = self._make_assembler(scoped_prompts, step_token_budget)
+        except Exception:
+            # Do not leak the shared model reference of a detector that failed to build
+            self.close()
+            raise
         
     def _load_model(self, model_name):
-        """Load the specified LLM."""
-        from .models import load_model
-        return load_model(model_name)
+        """Acquire the specified LLM from the process-wide shared registry."""
+        from .registry import shared_registry
+        return shared_registry.acquire(model_name, **self.model_config)
+    
+    def close(self):
+        """Close this detector's model wrappers and release its reference to the shared model."""
+        if getattr(self, "_closed", False):
+            return
+        self._closed = True
+        self._close_wrappers()
+        from .registry import shared_registry
+        shared_registry.release(self.model_name, **self.model_config)
+    
+    def _close_wrappers(self):
+        """Close the resources (response cache, batch dispatcher thread) of the wrappers around the shared model."""
+        from .batching import BatchingModel
+        from .cache import CachedModel
+        model = getattr(self, "model", None)
+        while isinstance(model, (BatchingModel, CachedModel)):
+            model.close()
+            model = model.model
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _wrap_with_batching(self, model, batch_size):
+        """Coalesce concurrent generation requests into shared batches."""
+        from .batching import BatchingModel
+        return BatchingModel(model, max_batch_size=batch_size)
+    
+    def _wrap_with_cache(self, model, cache_path):
+        """Serve repeated generation requests from a persistent response cache."""
+        from .cache import CachedModel, ResponseCache
+        return CachedModel(model, ResponseCache(cache_path))
+    
+    def _make_preprocessor(self, expand_abbreviations):
+        """Create the memoizing report preprocessor."""
+        from .preprocessing import ReportPreprocessor
+        return ReportPreprocessor(expand_abbreviations=expand_abbreviations)
+    
+    def _make_rule_checker(self):
+        """Create the rule-based pre-screen."""
+        from .rules import RuleChecker
+        return RuleChecker()
+    
+    def _make_scheduler(self):
+        """Create a step scheduler with the default policy."""
+        from .scheduler import StepScheduler
+        return StepScheduler()
+    
+    def _make_instrumentation(self):
+        """Create a span collector."""
+        from .instrumentation import Instrumentation
+        return Instrumentation()
+    
+    def _make_parser(self, use_radcot, verify_spans):
+        """Create the schema-validating output parser."""
+        from .parsing import OutputParser
+        return OutputParser("radcot" if use_radcot else "standard", verify_spans=verify_spans)
+    
+    def _make_consolidator(self):
+        """Create the engine merging duplicate errors across steps."""
+        from .consolidation import ErrorConsolidator
+        return ErrorConsolidator()
+    
+    def _make_assembler(self, scoped, token_budget):
+        """Create the section-scoped prompt assembler, counting tokens with the model's tokenizer if it has one."""
+        from .assembly import PromptAssembler
+        tokenizer = getattr(self.model, "tokenizer", None)
+        count_tokens = None
+        if tokenizer is not None:
+            count_tokens = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        return PromptAssembler(self.prompts, scoped=scoped, token_budget=token_budget, count_tokens=count_tokens)
     
     def _load_prompts(self, use_radcot):
         """Load appropriate prompts based on prompting strategy."""
         from .prompts import load_prompts
         return load_prompts(use_radcot)
     
-    def detect_errors(self, report):
+    def detect_errors(self, report, metadata=None):
         """
         Detect errors in a radiology report using the selected prompting strategy.
         
         Args:
             report (str): Full text of the radiology report
+            metadata (dict): Input contract fields of the report (MODALITY,
+                BODY_REGION, INDICATION, PRIOR_STUDIES), used by the scheduler
             
         Returns:
             dict: Detected errors with explanations and confidence scores
         """
+        if self.instrumentation is None:
+            return self._detect_errors(report, metadata)
+        return self._detect_errors_in_span(report, metadata)
+    
+    def _detect_errors_in_span(self, report, metadata, submitted=None):
+        """
+        Run ``detect_errors`` inside a report span.
+        
+        Args:
+            report (str): Full text of the radiology report
+            metadata (dict): Input contract fields of the report
+            submitted (float): ``time.perf_counter()`` when the report was
+                queued, to record its queue wait
+            
+        Returns:
+            dict: Detection result
+        """
+        span = self.instrumentation.span(
+            "report", "report",
+            report_id=(metadata or {}).get("REPORT_ID"),
+            model=self.model_name,
+            strategy=self.strategy if self.use_radcot else "standard"
+        )
+        with span:
+            if submitted is not None:
+                span.add(queue_wait=time.perf_counter() - submitted)
+            result = self._detect_errors(report, metadata)
+            span.annotate(error_count=len(result["errors"]))
+        return result
+    
+    def _detect_errors(self, report, metadata):
+        """Preprocess, plan and run the selected strategy (see ``detect_errors``)."""
+        normalized = self.preprocessor(report) if self.preprocessor is not None else None
+        if normalized is not None:
+            report = normalized.text
+        
+        plan = None
+        if self.use_radcot and self.strategy == "stepwise" and self.scheduler is not None:
+            plan = self.scheduler.plan(report, metadata)
+        
         if not self.use_radcot:
             # Standard prompting approach
-            return self._standard_error_detection(report)
+            result = self._standard_error_detection(report)
+        elif self.strategy == "fused" or plan is not None and plan["fuse"]:
+            # RadCoT approach with all six steps in a single call
+            result = self._fused_error_detection(report, plan["skip"] if plan is not None else None)
         else:
             # RadCoT approach with six reasoning steps
-            return self._radcot_error_detection(report)
+            result = self._radcot_error_detection(report, plan["skip"] if plan is not None else None)
+        
+        if normalized is not None:
+            result["errors"] = self._map_spans_to_original(result["errors"], normalized)
+        return result
+    
+    def _map_spans_to_original(self, errors, normalized):
+        """
+        Report error spans against the original report instead of the normalized one.
+        
+        Args:
+            errors (list): Detected errors
+            normalized (NormalizedReport): Preprocessed report the model saw
+            
+        Returns:
+            list: Errors whose ``text_span`` is quoted from the original report,
+                with its ``span_start`` and ``span_end`` offsets when found
+        """
+        mapped = []
+        for error in errors:
+            if isinstance(error, dict) and "span_start" in error:
+                # Offsets verified by the parser against the normalized report
+                located = normalized.to_original(error["span_start"], error["span_end"])
+            else:
+                located = normalized.locate(error.get("text_span")) if isinstance(error, dict) else None
+            if located is not None:
+                start, end = located
+                error = dict(error, text_span=normalized.original[start:end], span_start=start, span_end=end)
+            mapped.append(error)
+        return mapped
+    
+    def detect_errors_batch(self, reports, max_in_flight=8):
+        """
+        Detect errors in many reports, yielding results as they complete.
+        
+        The input is consumed lazily and at most ``max_in_flight`` reports are
+        being processed at any time, so memory stays flat regardless of the
+        corpus size. Results are yielded in completion order, not input order.
+        
+        Args:
+            reports (iterable): Report strings, or records shaped like the
+                input contract (REPORT_TEXT, MODALITY, BODY_REGION, INDICATION,
+                PRIOR_STUDIES) with an optional REPORT_ID
+            max_in_flight (int): Maximum number of reports processed concurrently
+            
+        Yields:
+            dict: Detection result tagged with ``report_id`` and ``status``;
+                failed reports and malformed items yield ``status="error"``
+                and the exception message
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        
+        executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="radcot-report")
+        in_flight = {}
+        
+        try:
+            for index, item in enumerate(reports):
+                try:
+                    record = self._normalize_record(item, index)
+                except (TypeError, ValueError) as e:
+                    # One malformed item fails alone instead of aborting the batch
+                    report_id = item.get("REPORT_ID", item.get("report_id", index)) if isinstance(item, dict) else index
+                    yield {"report_id": report_id, "status": "error", "error": f"{type(e).__name__}: {e}"}
+                    continue
+                metadata = {key: value for key, value in record.items() if key != "REPORT_TEXT"}
+                if self.instrumentation is None:
+                    future = executor.submit(self._detect_errors, record["REPORT_TEXT"], metadata)
+                else:
+                    future = executor.submit(
+                        self._detect_errors_in_span, record["REPORT_TEXT"], metadata, time.perf_counter()
+                    )
+                in_flight[future] = record
+                if len(in_flight) >= max_in_flight:
+                    yield from self._drain_completed(in_flight)
+            while in_flight:
+                yield from self._drain_completed(in_flight)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _drain_completed(self, in_flight):
+        """Wait for at least one in-flight report and yield its tagged result."""
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            record = in_flight.pop(future)
+            tagged = {
+                "report_id": record["REPORT_ID"],
+                "modality": record.get("MODALITY"),
+                "body_region": record.get("BODY_REGION")
+            }
+            try:
+                tagged.update(future.result())
+                tagged["status"] = "ok"
+            except Exception as e:
+                tagged.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+            yield tagged
+    
+    def _normalize_record(self, item, index):
+        """
+        Coerce a batch input item into an input-contract record.
+        
+        Args:
+            item (str or dict): Report text or input-contract record
+            index (int): Position of the item in the input, used as fallback ID
+            
+        Returns:
+            dict: Record with at least REPORT_ID and REPORT_TEXT (TypeError
+                or ValueError if the item is neither)
+        """
+        if isinstance(item, str):
+            return {"REPORT_ID": index, "REPORT_TEXT": item}
+        if not isinstance(item, dict):
+            raise TypeError(f"Item {index} is a {type(item).__name__}, not a report string or record")
+        
+        record = dict(item)
+        if not isinstance(record.get("REPORT_TEXT"), str):
+            raise ValueError(f"Record {index} is missing REPORT_TEXT")
+        record.setdefault("REPORT_ID", record.get("report_id", index))
+        return record
     
     def _standard_error_detection(self, report):
         """Implement standard prompting for error detection."""
+        rule_errors = self._prescreen(report)
         prompt = self.prompts["standard"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_errors(response)
+        note = self._prescreen_note(rule_errors)
+        if note:
+            prompt += "\n\n" + note
+        with self._step_span("standard"):
+            response = self.model.generate(prompt)
+        result = self._parse_errors(response, report)
+        result["errors"] = self._deduplicate_errors(rule_errors + result["errors"])
+        return result
     
-    def _radcot_error_detection(self, report):
-        """Implement the full RadCoT reasoning process."""
-        # Step 1: Anatomical Structure Validation
-        anatomical_validation = self._validate_anatomical_structures(report)
-        
-        # Step 2: Measurement Consistency Checking
-        measurement_check = self._check_measurement_consistency(report)
+    def _radcot_error_detection(self, report, skip=None):
+        """
+        Implement the full RadCoT reasoning process.
         
-        # Step 3: Cross-sectional Correlation
-        cross_sectional = self._perform_cross_sectional_correlation(report)
+        Args:
+            report (str): Full text of the radiology report
+            skip (dict): Reasons by step index for steps not to run
+            
+        Returns:
+            dict: Consolidated errors and reasoning trace
+        """
+        rule_errors = self._prescreen(report)
+        skipped = dict(skip or {})
+        if self.prescreen == "skip":
+            # Steps with hits but checks beyond the rules' are narrowed by the note instead
+            for step in self.rule_checker.covered_steps():
+                skipped.setdefault(step - 1, "covered by the rule-based pre-screen")
+        note = self._prescreen_note(rule_errors)
         
-        # Step 4: Findings-Impression Alignment
-        findings_impression = self._check_findings_impression_alignment(report)
+        active = [index for index in range(len(RADCOT_STEPS)) if index not in skipped]
+        steps = [self._reasoning_steps()[index] for index in active]
+        if self.instrumentation is not None:
+            steps = [self._traced_step(index, step) for index, step in zip(active, steps)]
+        prompts, prompt_stats = self._assemble_step_prompts(active, report, note)
         
-        # Step 5: Clinical Completeness Assessment
-        clinical_completeness = self._assess_clinical_completeness(report)
+        if not active:
+            results = []
+        elif self.parallel_steps:
+            results = self._run_steps_concurrently(steps, report, prompts)
+        elif self.batch_size is not None:
+            results = self._run_steps_batched(report, prompts, active)
+        elif self.prefix_cache:
+            results = self._run_steps_with_shared_prefix(report, prompts, active)
+        else:
+            results = [step(report, prompt) for step, prompt in zip(steps, prompts)]
         
-        # Step 6: Radiological Terminology Accuracy
-        terminology_accuracy = self._check_terminology_accuracy(report)
+        step_results = [None] * len(RADCOT_STEPS)
+        for index, result in zip(active, results):
+            step_results[index] = result
+        for index, reason in skipped.items():
+            step_results[index] = self._skipped_step_result(reason)
+        for error in rule_errors:
+            step_results[error["originating_step"] - 1]["errors"].append(error)
         
         # Consolidate findings from all steps
-        consolidated_errors = self._consolidate_errors([
-            anatomical_validation,
-            measurement_check,
-            cross_sectional,
-            findings_impression,
-            clinical_completeness,
-            terminology_accuracy
-        ])
+        consolidated_errors = self._consolidate_errors(step_results)
+        if prompt_stats is not None:
+            consolidated_errors["prompt_stats"] = prompt_stats
         
         return consolidated_errors
     
-    def _validate_anatomical_structures(self, report):
+    def _assemble_step_prompts(self, indices, report, note=""):
+        """
+        Build the prompts of the steps about to run.
+        
+        Args:
+            indices (list): Indices of the steps to run
+            report (str): Full text of the radiology report
+            note (str): Addendum placed between the report and each step question
+            
+        Returns:
+            tuple: Prompts in step order, and per-step token statistics
+                (tokens, baseline and saved tokens, scoped and truncated
+                flags) when the prompt assembler is enabled, else None
+        """
+        if self.assembler is None:
+            return [self._step_prompt(RADCOT_STEPS[index], report, note) for index in indices], None
+        
+        prompts = []
+        prompt_stats = {}
+        for index in indices:
+            assembled = self.assembler.assemble(RADCOT_STEPS[index], report, note)
+            prompts.append(assembled.pop("prompt"))
+            assembled["saved_tokens"] = assembled["baseline_tokens"] - assembled["tokens"]
+            prompt_stats[f"step_{index+1}"] = assembled
+        return prompts, prompt_stats
+    
+    def _prescreen(self, report):
+        """Run the rule-based pre-screen, if enabled."""
+        if self.rule_checker is None:
+            return []
+        return self.rule_checker.check(report)
+    
+    def _prescreen_note(self, rule_errors):
+        """Prompt note listing the pre-screen hits the model should not repeat."""
+        if not rule_errors or self.prescreen is None:
+            return ""
+        from .prompts import PRESCREEN_NOTE
+        hits = "\n".join(f'- {error["error_type"]}: "{error["text_span"]}"' for error in rule_errors)
+        return PRESCREEN_NOTE.format(hits=hits)
+    
+    def _fused_error_detection(self, report, skip=None):
+        """
+        Run the six RadCoT steps through the single S1.2 prompt.
+        
+        Args:
+            report (str): Full text of the radiology report
+            skip (dict): Reasons by step index for steps the model is told
+                not to perform; they are recorded as skipped in the trace
+            
+        Returns:
+            dict: Consolidated errors and reasoning trace
+        """
+        rule_errors = self._prescreen(report)
+        skipped = dict(skip or {})
+        prompt = self.prompts["fused"].format(report=report)
+        notes = [self._prescreen_note(rule_errors), self._fused_skip_note(skipped)]
+        note = "\n\n".join(part for part in notes if part)
+        if note:
+            # Place the note between the report and the closing "Output:" cue
+            head, cue, tail = prompt.rpartition("Output:")
+            prompt = head + note + "\n\n" + cue + tail
+        with self._step_span("fused"):
+            response = self.model.generate(prompt)
+        
+        step_texts, final_output = self._split_fused_response(response)
+        step_results = [
+            self._parse_step_results(text, report, step) for step, text in enumerate(step_texts, 1)
+        ]
+        for index, reason in skipped.items():
+            step_results[index] = self._skipped_step_result(reason)
+        for error in rule_errors:
+            step_results[error["originating_step"] - 1]["errors"].append(error)
+        
+        # Errors in the consolidated final output are attributed to their originating step
+        final = self._parse_errors(final_output, report)
+        for error in final["errors"]:
+            step = error.get("originating_step") if isinstance(error, dict) else None
+            index = step - 1 if isinstance(step, int) and 1 <= step <= len(step_results) else 0
+            step_results[index]["errors"].append(error)
+        
+        consolidated = self._consolidate_errors(step_results)
+        consolidated["rejected_errors"] += final["rejected_errors"]
+        if final["abstain"]:
+            consolidated["abstain"] = True
+            consolidated["abstain_reason"] = final["abstain_reason"]
+        return consolidated
+    
+    def _fused_skip_note(self, skipped):
+        """Fused prompt note listing the steps the model should not perform."""
+        if not skipped:
+            return ""
+        from .prompts import FUSED_SKIP_NOTE
+        steps = "\n".join(f"- Step {index + 1}: {reason}" for index, reason in sorted(skipped.items()))
+        return FUSED_SKIP_NOTE.format(steps=steps)
+    
+    def _split_fused_response(self, response):
+        """
+        Split a fused response into per-step reasoning and the final output.
+        
+        Args:
+            response (str): Model output for the fused prompt
+            
+        Returns:
+            tuple: List of six step texts (empty for steps the model skipped)
+                and the text following the last step
+        """
+        step_texts = [""] * len(RADCOT_STEPS)
+        markers = list(_FUSED_STEP_PATTERN.finditer(response))
+        if not markers:
+            return step_texts, response
+        
+        for marker, following in zip(markers, markers[1:] + [None]):
+            end = following.start() if following else len(response)
+            step_texts[int(marker.group(1)) - 1] = response[marker.start():end].strip()
+        
+        # The final output starts after the last step's "Issues found" block
+        last = markers[-1]
+        final = _FUSED_FINAL_PATTERN.search(response, last.end())
+        if final is None:
+            return step_texts, ""
+        step_texts[int(last.group(1)) - 1] = response[last.start():final.start()].strip()
+        return step_texts, response[final.start():]
+    
+    def _reasoning_steps(self):
+        """Return the six RadCoT reasoning steps in trace order."""
+        return [
+            # Step 1: Anatomical Structure Validation
+            self._validate_anatomical_structures,
+            # Step 2: Measurement Consistency Checking
+            self._check_measurement_consistency,
+            # Step 3: Cross-sectional Correlation
+            self._perform_cross_sectional_correlation,
+            # Step 4: Findings-Impression Alignment
+            self._check_findings_impression_alignment,
+            # Step 5: Clinical Completeness Assessment
+            self._assess_clinical_completeness,
+            # Step 6: Radiological Terminology Accuracy
+            self._check_terminology_accuracy
+        ]
+    
+    def _step_span(self, name, parent=None, **attributes):
+        """
+        Span timing one model call of a report (a no-op when instrumentation is disabled).
+        
+        Args:
+            name (str): Step prompt key, or "fused" or "standard"
+            parent (Span): Report span, when the step runs on another thread
+            **attributes: Extra span attributes, e.g. the step number
+            
+        Returns:
+            context manager
+        """
+        if self.instrumentation is None:
+            return contextlib.nullcontext()
+        return self.instrumentation.span("step", name, parent=parent, model=self.model_name, **attributes)
+    
+    def _step_group(self, indices):
+        """Spans of steps served by one batched call, attributed by batch row."""
+        if self.instrumentation is None:
+            return contextlib.nullcontext()
+        return self.instrumentation.group([self._step_span(RADCOT_STEPS[i], step=i + 1) for i in indices])
+    
+    def _traced_step(self, index, step):
+        """
+        Wrap a step callable so each call runs inside its own span.
+        
+        The span's parent is the span current where the wrapper is made, so
+        steps fanned out to worker threads still belong to their report.
+        The wrapper takes an optional third argument, the
+        ``time.perf_counter()`` at which the step was queued.
+        """
+        from .instrumentation import current_span
+        parent = current_span()
+        
+        def traced(report, prompt, submitted=None):
+            with self._step_span(RADCOT_STEPS[index], parent, step=index + 1) as span:
+                if submitted is not None:
+                    span.add(queue_wait=time.perf_counter() - submitted)
+                return step(report, prompt)
+        return traced
+    
+    def _run_steps_batched(self, report, prompts, indices):
+        """Submit the step prompts together so they can share a forward pass."""
+        with self._step_group(indices):
+            responses = self.model.generate_batch(prompts)
+        return [
+            self._parse_step_results(response, report, index + 1) for response, index in zip(responses, indices)
+        ]
+    
+    def _run_steps_with_shared_prefix(self, report, prompts, indices):
+        """
+        Run the steps as suffixes of the shared report prefix.
+        
+        Steps whose prompt does not start with the full-report prefix (their
+        input was scoped to some sections) are generated as one batch instead.
+        """
+        if self.assembler is not None:
+            prefix = self.assembler.prefix(report)
+        else:
+            prefix = self.prompts["report_prefix"].format(report=report)
+        shared = [i for i, prompt in enumerate(prompts) if prompt.startswith(prefix)]
+        others = [i for i, prompt in enumerate(prompts) if not prompt.startswith(prefix)]
+        
+        responses = [None] * len(prompts)
+        if shared:
+            suffixes = [prompts[i][len(prefix):] for i in shared]
+            with self._step_group([indices[i] for i in shared]):
+                generated = self.model.generate_with_prefix(prefix, suffixes)
+            for i, response in zip(shared, generated):
+                responses[i] = response
+        if others:
+            with self._step_group([indices[i] for i in others]):
+                generated = self.model.generate_batch([prompts[i] for i in others])
+            for i, response in zip(others, generated):
+                responses[i] = response
+        return [
+            self._parse_step_results(response, report, index + 1) for response, index in zip(responses, indices)
+        ]
+    
+    def _run_steps_concurrently(self, steps, report, prompts):
+        """
+        Fan the reasoning steps out over a thread pool and gather them in order.
+        
+        Each step has its own deadline, ``step_timeout`` seconds after a worker
+        starts it, so time spent queued for a worker does not count against
+        it. A step still running past its deadline is abandoned and recorded
+        as timed out, so that a single slow model call cannot stall the whole
+        report. Its cancel flag is set, which stops a streamed step at its next
+        chunk; a blocking model call runs on until the backend returns.
+        
+        Args:
+            steps (list): Step callables taking the report text and a prompt
+            report (str): Full text of the radiology report
+            prompts (list): Prompt per step
+            
+        Returns:
+            list: Step results in the same order as ``steps``
+        """
+        started = [None] * len(steps)
+        cancelled = [threading.Event() for _ in steps]
+        
+        def run(index, *args):
+            started[index] = time.monotonic()
+            self._step_state.cancelled = cancelled[index]
+            try:
+                return steps[index](*args)
+            finally:
+                self._step_state.cancelled = None
+        
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers or len(steps),
+            thread_name_prefix="radcot-step"
+        )
+        try:
+            if self.instrumentation is None:
+                futures = [executor.submit(run, index, report, prompt) for index, prompt in enumerate(prompts)]
+            else:
+                # Traced steps record how long they waited for a worker
+                futures = [
+                    executor.submit(run, index, report, prompt, time.perf_counter())
+                    for index, prompt in enumerate(prompts)
+                ]
+            
+            pending = set(range(len(futures)))
+            while pending:
+                timeout = None
+                if self.step_timeout is not None:
+                    now = time.monotonic()
+                    for index in [index for index in pending if started[index] is not None]:
+                        remaining = started[index] + self.step_timeout - now
+                        if remaining <= 0 and not futures[index].done():
+                            cancelled[index].set()
+                            pending.discard(index)
+                        elif timeout is None or remaining < timeout:
+                            timeout = max(remaining, 0)
+                    if any(started[index] is None for index in pending):
+                        timeout = _STEP_POLL_INTERVAL if timeout is None else min(timeout, _STEP_POLL_INTERVAL)
+                # Any step finishing, abandoned ones included, frees a worker for a queued step
+                wait([future for future in futures if not future.done()] or futures,
+                     timeout=timeout, return_when=FIRST_COMPLETED)
+                pending -= {index for index in pending if futures[index].done()}
+            
+            step_results = []
+            for index, future in enumerate(futures):
+                if cancelled[index].is_set():
+                    step_results.append(self._timed_out_step_result())
+                else:
+                    # Re-raises the step's exception, as the sequential path would
+                    step_results.append(future.result())
+            return step_results
+        finally:
+            # Do not block on abandoned steps
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _skipped_step_result(self, reason):
+        """Placeholder result for a step that was deliberately not run."""
+        return {
+            "errors": [],
+            "reasoning": f"Step skipped: {reason}",
+            "status": "skipped"
+        }
+    
+    def _timed_out_step_result(self):
+        """Placeholder result for a step that did not finish within ``step_timeout``."""
+        return {
+            "errors": [],
+            "reasoning": f"Step did not complete within {self.step_timeout}s of starting",
+            "status": "timeout"
+        }
+    
+    def _validate_anatomical_structures(self, report, prompt=None):
         """Step 1: Validate anatomical structures, laterality, and spatial relationships."""
-        prompt = self.prompts["anatomical_validation"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_step_results(response)
+        if prompt is None:
+            prompt = self._step_prompt("anatomical_validation", report)
+        response = self._generate_step(prompt)
+        return self._parse_step_results(response, report, 1)
     
-    def _check_measurement_consistency(self, report):
+    def _check_measurement_consistency(self, report, prompt=None):
         """Step 2: Check consistency of measurements and units."""
-        prompt = self.prompts["measurement_consistency"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_step_results(response)
+        if prompt is None:
+            prompt = self._step_prompt("measurement_consistency", report)
+        response = self._generate_step(prompt)
+        return self._parse_step_results(response, report, 2)
     
-    def _perform_cross_sectional_correlation(self, report):
+    def _perform_cross_sectional_correlation(self, report, prompt=None):
         """Step 3: Analyze relationships between different imaging planes or sequences."""
-        prompt = self.prompts["cross_sectional"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_step_results(response)
+        if prompt is None:
+            prompt = self._step_prompt("cross_sectional", report)
+        response = self._generate_step(prompt)
+        return self._parse_step_results(response, report, 3)
     
-    def _check_findings_impression_alignment(self, report):
+    def _check_findings_impression_alignment(self, report, prompt=None):
         """Step 4: Ensure consistency between findings and impression sections."""
-        prompt = self.prompts["findings_impression"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_step_results(response)
+        if prompt is None:
+            prompt = self._step_prompt("findings_impression", report)
+        response = self._generate_step(prompt)
+        return self._parse_step_results(response, report, 4)
     
-    def _assess_clinical_completeness(self, report):
+    def _assess_clinical_completeness(self, report, prompt=None):
         """Step 5: Identify missing critical findings or follow-up recommendations."""
-        prompt = self.prompts["clinical_completeness"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_step_results(response)
+        if prompt is None:
+            prompt = self._step_prompt("clinical_completeness", report)
+        response = self._generate_step(prompt)
+        return self._parse_step_results(response, report, 5)
     
-    def _check_terminology_accuracy(self, report):
+    def _check_terminology_accuracy(self, report, prompt=None):
         """Step 6: Validate proper use of standardized radiological lexicon."""
-        prompt = self.prompts["terminology_accuracy"].format(report=report)
-        response = self.model.generate(prompt)
-        return self._parse_step_results(response)
+        if prompt is None:
+            prompt = self._step_prompt("terminology_accuracy", report)
+        response = self._generate_step(prompt)
+        return self._parse_step_results(response, report, 6)
+    
+    def _step_prompt(self, key, report, note=""):
+        """
+        Assemble the prompt of one reasoning step.
+        
+        Args:
+            key (str): Prompt key of the step (see ``RADCOT_STEPS``)
+            report (str): Full text of the radiology report
+            note (str): Addendum placed between the report and the step question
+            
+        Returns:
+            str: Step prompt
+        """
+        if self.assembler is not None:
+            return self.assembler.assemble(key, report, note)["prompt"]
+        prompt = self.prompts[key].format(report=report)
+        if not note:
+            return prompt
+        prefix = self.prompts["report_prefix"].format(report=report)
+        if prompt.startswith(prefix):
+            return prefix + note + "\n\n" + prompt[len(prefix):]
+        return prompt + "\n\n" + note
     
-    def _parse_step_results(self, response):
-        """Parse results from individual reasoning steps."""
-        # Implementation of parsing logic
-        return {"errors": [], "reasoning": response}
+    def _generate_step(self, prompt):
+        """Generate a step response, streaming with early termination if enabled."""
+        if not self.stream_steps:
+            return self.model.generate(prompt)
+        
+        stream = self.model.generate_stream(prompt)
+        cancelled = getattr(self._step_state, "cancelled", None)
+        text = ""
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    # Abandoned by its step deadline; nobody will read the rest
+                    break
+                text += chunk
+                complete = self._complete_step_output(text)
+                if complete is not None:
+                    return complete
+        finally:
+            # Stops the backend from decoding tokens nobody will read
+            stream.close()
+        return text
+    
+    def _complete_step_output(self, text):
+        """
+        Decide whether a partially streamed step output is already complete.
+        
+        Args:
+            text (str): Output streamed so far
+            
+        Returns:
+            str: The complete step output, or None if more output is needed
+        """
+        marker = _NO_ISSUE_PATTERN.search(text)
+        if marker:
+            return text[:marker.end()]
+        
+        fences = list(_FENCE_PATTERN.finditer(text))
+        if fences:
+            if len(fences) < 2:
+                # Inside the JSON block: wait for it to close
+                return None
+            end = text.find("\n", fences[1].end())
+            return text if end < 0 else text[:end]
+        
+        last_item = None
+        for last_item in _LIST_ITEM_PATTERN.finditer(text):
+            pass
+        if last_item is None:
+            return None
+        
+        end = _LIST_END_PATTERN.search(text, last_item.end())
+        if end is None:
+            return None
+        return text[:end.start()]
+    
+    def _parse_step_results(self, response, report=None, step=None):
+        """
+        Parse results from individual reasoning steps.
+        
+        Args:
+            response (str): Step output
+            report (str): Report the step examined, to verify quoted spans against
+            step (int): Step number (1-6), for errors that do not state their originating step
+            
+        Returns:
+            dict: Schema-valid ``errors``, the raw ``reasoning``, the
+                ``rejected_errors`` with their reasons, and the abstention
+        """
+        parsed = self.parser.parse(response, report, step)
+        return {
+            "errors": parsed["errors"],
+            "reasoning": response,
+            "rejected_errors": parsed["rejected"],
+            "abstain": parsed["abstain"],
+            "abstain_reason": parsed["abstain_reason"]
+        }
     
     def _consolidate_errors(self, step_results):
         """Consolidate and deduplicate errors from all reasoning steps."""
         all_errors = []
         reasoning_trace = {}
+        incomplete_steps = []
+        
+        skipped_steps = []
+        rejected_errors = []
+        abstain_reasons = []
         
         for i, result in enumerate(step_results):
             all_errors.extend(result["errors"])
+            rejected_errors.extend(result.get("rejected_errors", []))
+            if result.get("abstain"):
+                abstain_reasons.append(result.get("abstain_reason"))
             reasoning_trace[f"step_{i+1}"] = result["reasoning"]
+            status = result.get("status", "ok")
+            if status == "skipped":
+                skipped_steps.append(f"step_{i+1}")
+            elif status != "ok":
+                incomplete_steps.append(f"step_{i+1}")
         
         # Deduplicate errors
         unique_errors = self._deduplicate_errors(all_errors)
@@ -138,15 +944,33 @@ class RadCoT:
         return {
             "errors": unique_errors,
             "reasoning_trace": reasoning_trace,
-            "error_count": len(unique_errors)
+            "error_count": len(unique_errors),
+            "incomplete_steps": incomplete_steps,
+            "skipped_steps": skipped_steps,
+            "rejected_errors": rejected_errors,
+            "abstain": bool(abstain_reasons),
+            "abstain_reason": next((reason for reason in abstain_reasons if reason), None)
         }
     
     def _deduplicate_errors(self, errors):
-        """Remove duplicate errors based on similarity."""
-        # Implementation of deduplication logic
-        return list(set(errors))
-    
-    def _parse_errors(self, response):
-        """Parse errors from model response."""
-        # Implementation of error parsing logic
-        return {"errors": [], "reasoning": response}
\ No newline at end of file
+        """
+        Merge duplicate errors raised by several steps.
+        
+        Errors with overlapping or touching spans and compatible categories
+        become one error listing the ``steps`` that raised it (see
+        ``ErrorConsolidator``).
+        """
+        return self.consolidator.merge(errors)
+    
+    def _parse_errors(self, response, report=None):
+        """
+        Parse errors from model response.
+        
+        Args:
+            response (str): Model output (standard prompting, or the fused final output)
+            report (str): Report the model examined, to verify quoted spans against
+            
+        Returns:
+            dict: Same fields as ``_parse_step_results``
+        """
+        return self._parse_step_results(response, report)
\ No newline at end of file
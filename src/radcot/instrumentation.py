@@ -0,0 +1,435 @@
+import contextvars
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Innermost open span of the running thread or task; model backends add their
+# token usage to it. None whenever instrumentation is disabled.
+_CURRENT = contextvars.ContextVar("radcot_span", default=None)
+# Spans owning the rows of the batch being generated, when a caller
+# attributes one batch to several spans (one per step or per request)
+_ROWS = contextvars.ContextVar("radcot_rows", default=None)
+
+# Percentiles reported by ``Instrumentation.summary``
+SUMMARY_PERCENTILES = (50, 95, 99)
+
+# Counters summed into ``Instrumentation.summary`` and the Prometheus export
+COUNTERS = ("prompt_tokens", "completion_tokens", "cached_prompt_tokens", "cache_hits")
+
+# Relative width of the histogram buckets wall times and queue waits are counted
+# in; summary percentiles are accurate to within half of it
+HISTOGRAM_RESOLUTION = 0.05
+
+class Span:
+    """
+    One timed unit of work: a report or a reasoning step.
+    
+    A span is opened with ``with`` (which also makes it the target of
+    ``record`` in the current thread or task) or with ``begin``/``end`` when
+    it only receives batch rows. Counters added to a span are rolled up into
+    its parent when it ends, so a report span totals its steps.
+    """
+    
+    __slots__ = ("recorder", "span_id", "parent", "kind", "name", "attributes", "counters",
+                 "timestamp", "start", "duration", "status", "_token")
+    
+    def __init__(self, recorder, kind, name, parent, attributes):
+        self.recorder = recorder
+        self.span_id = next(recorder._ids)
+        self.parent = parent
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.counters = {}
+        self.timestamp = None
+        self.start = None
+        self.duration = None
+        self.status = "ok"
+        self._token = None
+    
+    def begin(self):
+        """Start the clock."""
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        return self
+    
+    def end(self, status=None):
+        """Stop the clock and hand the span to its recorder."""
+        self.duration = time.perf_counter() - self.start
+        if status is not None:
+            self.status = status
+        self.recorder._finish(self)
+    
+    def add(self, **values):
+        """Add to the span's numeric counters (tokens, queue wait in seconds, cache hits)."""
+        with self.recorder._lock:
+            for key, value in values.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+    
+    def annotate(self, **attributes):
+        """Set descriptive attributes, e.g. the exact model version that answered."""
+        self.attributes.update(attributes)
+    
+    def to_dict(self):
+        """JSON-serializable record of the finished span."""
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "kind": self.kind,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "wall_time": self.duration,
+            "status": self.status,
+            **self.attributes,
+            **self.counters
+        }
+    
+    def __enter__(self):
+        self.begin()
+        self._token = _CURRENT.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        _CURRENT.reset(self._token)
+        self.end("error" if exc_type is not None else None)
+
+class Instrumentation:
+    """
+    Collector of report and step spans with JSONL and Prometheus exporters.
+    
+    Finished spans are kept (up to ``max_spans``, oldest dropped) for export,
+    and their wall times, queue waits and counters are also aggregated by span
+    name as they finish, so ``summary`` needs no pass over the spans. Wall
+    times and queue waits are aggregated into bounded histograms, so the
+    aggregates do not grow with the number of spans.
+    """
+    
+    def __init__(self, max_spans=100000):
+        """
+        Initialize the collector.
+        
+        Args:
+            max_spans (int): Finished spans kept for ``export_jsonl``
+                (None keeps all; 0 keeps only the aggregates)
+        """
+        self.spans = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._aggregates = {}
+    
+    def span(self, kind, name, parent=None, **attributes):
+        """
+        Create a span; use it with ``with`` to time a block.
+        
+        Args:
+            kind (str): "report" or "step"
+            name (str): Aggregation key, e.g. the step's prompt key
+            parent (Span): Enclosing span (defaults to the current span)
+            **attributes: Descriptive attributes such as ``model`` or ``report_id``
+            
+        Returns:
+            Span: Unstarted span
+        """
+        if parent is None:
+            parent = _CURRENT.get()
+        return Span(self, kind, name, parent, attributes)
+    
+    def group(self, spans):
+        """
+        Time several spans over one block, e.g. steps served by one batched call.
+        
+        Inside the block, batch row ``i`` is attributed to ``spans[i]``.
+        
+        Args:
+            spans (list): Unstarted spans, one per batch row
+            
+        Returns:
+            context manager
+        """
+        return _Group(spans)
+    
+    def summary(self, percentiles=SUMMARY_PERCENTILES):
+        """
+        Aggregate statistics per span name.
+        
+        Args:
+            percentiles (tuple): Percentiles of wall time and queue wait to report
+            
+        Returns:
+            dict: By span name, its ``kind``, ``count``, ``errors``, wall time
+                and queue wait percentiles, totals and extremes in seconds
+                (``wall_p50``, ``queue_wait_p95``, ``wall_total``,
+                ``wall_max``, ...) and token and cache-hit totals
+        """
+        summary = {}
+        with self._lock:
+            for name, aggregate in self._aggregates.items():
+                entry = {"kind": aggregate["kind"], "count": aggregate["wall"].count, "errors": aggregate["errors"]}
+                for metric in ("wall", "queue_wait"):
+                    distribution = aggregate[metric]
+                    entry.update({f"{metric}_p{p}": distribution.percentile(p) for p in percentiles})
+                    entry.update({f"{metric}_total": distribution.total, f"{metric}_min": distribution.min,
+                                  f"{metric}_max": distribution.max})
+                entry.update({counter: aggregate[counter] for counter in COUNTERS})
+                summary[name] = entry
+        return summary
+    
+    def export_jsonl(self, path):
+        """
+        Write the kept spans, one JSON object per line.
+        
+        Args:
+            path (str): Output file (overwritten)
+        """
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+    
+    def export_prometheus(self, path=None):
+        """
+        Render the aggregates in the Prometheus text exposition format.
+        
+        Wall time and queue wait become summaries with quantiles, token and
+        cache-hit totals become counters, all labelled by span kind and name.
+        
+        Args:
+            path (str): File to write atomically, e.g. for the node exporter's
+                textfile collector (None only returns the text)
+                
+        Returns:
+            str: Exposition text
+        """
+        summary = self.summary()
+        lines = []
+        for metric, description in (("wall", "Wall time"), ("queue_wait", "Time spent queued")):
+            name = f"radcot_{metric}_seconds"
+            lines += [f"# HELP {name} {description} per RadCoT report or step.", f"# TYPE {name} summary"]
+            for span_name, entry in summary.items():
+                labels = _labels(kind=entry["kind"], name=span_name)
+                for p in SUMMARY_PERCENTILES:
+                    lines.append(f"{name}{{{labels},quantile=\"{p / 100}\"}} {entry[f'{metric}_p{p}']:.6g}")
+                lines.append(f"{name}_sum{{{labels}}} {entry[f'{metric}_total']:.6g}")
+                lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+        for counter in COUNTERS:
+            name = f"radcot_{counter}_total"
+            lines += [f"# HELP {name} Total {counter.replace('_', ' ')} per RadCoT report or step.",
+                      f"# TYPE {name} counter"]
+            for span_name, entry in summary.items():
+                lines.append(f"{name}{{{_labels(kind=entry['kind'], name=span_name)}}} {entry[counter]}")
+        text = "\n".join(lines) + "\n"
+        
+        if path is not None:
+            temporary = f"{path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temporary, path)
+        return text
+    
+    def clear(self):
+        """Drop the kept spans and the aggregates."""
+        with self._lock:
+            self.spans.clear()
+            self._aggregates.clear()
+    
+    def _finish(self, span):
+        """Keep a finished span, fold it into the aggregates and roll its counters up."""
+        with self._lock:
+            self.spans.append(span)
+            aggregate = self._aggregates.get(span.name)
+            if aggregate is None:
+                aggregate = dict.fromkeys(COUNTERS, 0)
+                aggregate.update({"kind": span.kind, "wall": _Histogram(), "queue_wait": _Histogram(), "errors": 0})
+                self._aggregates[span.name] = aggregate
+            aggregate["wall"].add(span.duration)
+            aggregate["queue_wait"].add(span.counters.get("queue_wait", 0.0))
+            aggregate["errors"] += span.status != "ok"
+            for counter in COUNTERS:
+                aggregate[counter] += span.counters.get(counter, 0)
+            
+            parent = span.parent
+            if parent is not None and parent.recorder is self:
+                for key, value in span.counters.items():
+                    if key != "queue_wait":
+                        parent.counters[key] = parent.counters.get(key, 0) + value
+
+class _Histogram:
+    """
+    Count, sum, extremes and log-spaced bucket counts of a stream of durations.
+    
+    Bucket edges grow by ``HISTOGRAM_RESOLUTION`` from one microsecond, so
+    memory is bounded by the range of durations seen (about 50 buckets per
+    tenfold range), not by how many there were.
+    """
+    
+    SMALLEST = 1e-6
+    _LOG_GROWTH = math.log1p(HISTOGRAM_RESOLUTION)
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self.buckets = {}
+    
+    def add(self, value):
+        """Count one duration in seconds."""
+        self.min = value if self.count == 0 else min(self.min, value)
+        self.max = value if self.count == 0 else max(self.max, value)
+        self.count += 1
+        self.total += value
+        # Durations below a microsecond share bucket -1
+        bucket = int(math.log(value / self.SMALLEST) / self._LOG_GROWTH) if value >= self.SMALLEST else -1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+    
+    def percentile(self, p):
+        """Approximate ``p``-th percentile: the geometric middle of the bucket holding it."""
+        if self.count == 0:
+            return 0.0
+        rank = p / 100 * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                break
+        if bucket < 0:
+            return self.min
+        value = self.SMALLEST * math.exp((bucket + 0.5) * self._LOG_GROWTH)
+        return min(max(value, self.min), self.max)
+
+class _Group:
+    __slots__ = ("spans", "_rows")
+    
+    def __init__(self, spans):
+        self.spans = spans
+        self._rows = _Rows(spans)
+    
+    def __enter__(self):
+        for span in self.spans:
+            span.begin()
+        self._rows.__enter__()
+        return self.spans
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._rows.__exit__(exc_type, exc_value, traceback)
+        for span in self.spans:
+            span.end("error" if exc_type is not None else None)
+
+def _labels(**labels):
+    """Prometheus label set with escaped values."""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return ",".join(pairs)
+
+def current_span():
+    """The innermost open span of the running thread or task, or None."""
+    return _CURRENT.get()
+
+def enabled():
+    """Whether a model call made now would be recorded anywhere."""
+    return _CURRENT.get() is not None or _ROWS.get() is not None
+
+def target(row=None):
+    """
+    The span a model call's usage belongs to.
+    
+    Args:
+        row (int): Position of the prompt in the batch being generated
+        
+    Returns:
+        Span: The span owning that row, else the current span (None when
+            instrumentation is disabled)
+    """
+    if row is not None:
+        rows = _ROWS.get()
+        if rows is not None:
+            return rows[row]
+    return _CURRENT.get()
+
+def record(row=None, **values):
+    """
+    Add counters to the span a model call belongs to; a no-op without one.
+    
+    Args:
+        row (int): Position of the prompt in the batch being generated
+        **values: Counters such as ``prompt_tokens`` or ``queue_wait``
+    """
+    span = target(row)
+    if span is not None:
+        span.add(**values)
+
+def annotate(row=None, **attributes):
+    """Set attributes on the span a model call belongs to; a no-op without one."""
+    span = target(row)
+    if span is not None:
+        span.annotate(**attributes)
+
+def rows(spans):
+    """
+    Attribute the rows of the batch generated inside the block to given spans.
+    
+    Args:
+        spans (list): Span per batch row (None leaves attribution unchanged)
+        
+    Returns:
+        context manager
+    """
+    return _Rows(spans)
+
+def focus(row):
+    """
+    Make the span owning a batch row the current span inside the block.
+    
+    Backends that generate a batch prompt by prompt use this so each call's
+    usage lands on its row's span.
+    
+    Args:
+        row (int): Position of the prompt in the batch
+        
+    Returns:
+        context manager
+    """
+    return _Focus(row)
+
+class _Rows:
+    
+    __slots__ = ("spans", "_token")
+    
+    def __init__(self, spans):
+        self.spans = spans
+        self._token = None
+    
+    def __enter__(self):
+        if self.spans is not None:
+            self._token = _ROWS.set(self.spans)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._token is not None:
+            _ROWS.reset(self._token)
+
+class _Focus:
+    
+    __slots__ = ("row", "_tokens")
+    
+    def __init__(self, row):
+        self.row = row
+        self._tokens = None
+    
+    def __enter__(self):
+        spans = _ROWS.get()
+        if spans is not None:
+            self._tokens = (_CURRENT.set(spans[self.row]), _ROWS.set(None))
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._tokens is not None:
+            _ROWS.reset(self._tokens[1])
+            _CURRENT.reset(self._tokens[0])
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from . import instrumentation
+from .models import LLMInterface
+from .spans import sentence_starts
+from .taxonomy import CATEGORIES
+from .parsing import SECTION_LABELS
+from .utils import tokenize_sections
+
+# Latency distributions ``MockModel`` can draw from, all with mean ``latency``
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+# Category a canned error of each RadCoT step is assigned to
+_STEP_CATEGORIES = {
+    1: "T3_OmissionInsertion",
+    2: "T2_Numerical",
+    3: "T4_Interpretation",
+    4: "T5_FindingsImpressionDiscrepancy",
+    5: "T3_OmissionInsertion",
+    6: "T1_Typographical"
+}
+_SEVERITIES = ("minor", "moderate", "major")
+
+_STEP_PATTERN = re.compile(r"^### Step ([1-6]):", re.MULTILINE)
+# The report ends where the step question, the pre-screen note or the fused
+# prompt's closing quotes begin
+_REPORT_END_PATTERN = re.compile(r'\n(?:\s*### Step [1-6]:|Automated checks|"""\s*\nOutput:)')
+
+class MockModelError(RuntimeError):
+    """Simulated backend failure raised by ``MockModel``."""
+
+class MockModel(LLMInterface):
+    """
+    Deterministic offline backend returning canned RadCoT-formatted outputs.
+    
+    Each report is given a fixed set of canned errors quoting its own
+    sentences, each attributed to a RadCoT step. Step prompts are answered
+    with that step's errors as a fenced JSON block (or "No issue identified
+    in this step"), the fused S1.2 prompt with six "Reasoning Step N" blocks
+    and a final JSON output, and the standard prompt with the JSON output
+    alone. Latency and failures are drawn per
+    call from a generator seeded by the prompt, so a run's outputs and timing
+    profile do not depend on concurrency or call order.
+    """
+    
+    def __init__(self, latency=0.0, distribution="constant", sigma=0.5, failure_rate=0.0,
+                 error_rate=0.3, seed=0, model_name="mock"):
+        """
+        Initialize the mock backend.
+        
+        Args:
+            latency (float): Mean seconds per call
+            distribution (str): Latency distribution, one of ``LATENCY_DISTRIBUTIONS``
+            sigma (float): Shape of the lognormal distribution
+            failure_rate (float): Probability that a call raises ``MockModelError``
+            error_rate (float): Probability that a report sentence carries a canned error
+            seed (int): Seed mixed into every per-call generator
+            model_name (str): Name reported to wrappers and instrumentation
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unsupported latency distribution: {distribution}")
+        
+        self.latency = latency
+        self.distribution = distribution
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.seed = seed
+        self.model_name = model_name
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def generate(self, prompt, temperature=0.0):
+        """
+        Answer a prompt with its canned output after a simulated delay.
+        
+        Args:
+            prompt (str): Input prompt
+            temperature (float): Ignored; outputs are deterministic
+            
+        Returns:
+            str: Canned output
+        """
+        rng = self._rng(prompt)
+        self._call(rng, self._draw_latency(rng))
+        response = self.respond(prompt)
+        instrumentation.record(prompt_tokens=_approximate_tokens(prompt),
+                               completion_tokens=_approximate_tokens(response))
+        return response
+    
+    def generate_batch(self, prompts, temperature=0.0):
+        """
+        Answer several prompts as one simulated forward pass.
+        
+        The batch takes as long as its slowest prompt, and fails as a whole
+        if any of its prompts fails.
+        
+        Args:
+            prompts (list): Input prompts
+            temperature (float): Ignored; outputs are deterministic
+            
+        Returns:
+            list: Canned output for each prompt, in input order
+        """
+        rngs = [self._rng(prompt) for prompt in prompts]
+        latencies = [self._draw_latency(rng) for rng in rngs]
+        failed = any(rng.random() < self.failure_rate for rng in rngs)
+        self._call(None, max(latencies, default=0.0), failed)
+        
+        responses = [self.respond(prompt) for prompt in prompts]
+        for row, (prompt, response) in enumerate(zip(prompts, responses)):
+            instrumentation.record(row=row, prompt_tokens=_approximate_tokens(prompt),
+                                   completion_tokens=_approximate_tokens(response))
+        return responses
+    
+    def generate_stream(self, prompt, temperature=0.0):
+        """
+        Stream the canned output line by line, spreading the latency over the lines.
+        
+        Args:
+            prompt (str): Input prompt
+            temperature (float): Ignored; outputs are deterministic
+            
+        Yields:
+            str: Successive lines of the canned output
+        """
+        rng = self._rng(prompt)
+        latency = self._draw_latency(rng)
+        self._call(rng, 0.0)
+        lines = self.respond(prompt).splitlines(keepends=True)
+        instrumentation.record(prompt_tokens=_approximate_tokens(prompt))
+        for line in lines:
+            time.sleep(latency / len(lines))
+            instrumentation.record(completion_tokens=_approximate_tokens(line))
+            yield line
+    
+    def respond(self, prompt):
+        """
+        Canned output for a prompt, without latency or failures.
+        
+        Args:
+            prompt (str): RadCoT step, fused or standard prompt
+            
+        Returns:
+            str: Output in the format the prompt asks for
+        """
+        report = _report_of(prompt)
+        errors = self.canned_errors(report)
+        
+        step = _STEP_PATTERN.search(prompt)
+        if step is not None:
+            number = int(step.group(1))
+            return _step_output(number, [error for error in errors if error["originating_step"] == number])
+        if "FINAL OUTPUT" in prompt:
+            blocks = [
+                _step_output(number, [error for error in errors if error["originating_step"] == number],
+                             fused=True)
+                for number in range(1, 7)
+            ]
+            return "\n\n".join(blocks) + "\n\nFINAL OUTPUT\n" + _json_block(errors)
+        # Standard prompting output schema
+        return _json_block([
+            {"error_id": error["error_id"], "error_type": error["error_type"], "text_span": error["text_span"],
+             "description": error["explanation"]}
+            for error in errors
+        ])
+    
+    def canned_errors(self, report):
+        """
+        The fixed errors of a report, as the output schema describes them.
+        
+        Args:
+            report (str): Report text
+            
+        Returns:
+            list: Errors quoting the report's sentences verbatim
+        """
+        rng = random.Random(f"{self.seed}:{_digest(report)}")
+        sections = tokenize_sections(report)
+        bounds = sentence_starts(report) + [len(report)]
+        
+        errors = []
+        for start, end in zip(bounds, bounds[1:]):
+            section = next((section for section in reversed(sections) if section["start"] <= start), None)
+            if section is not None:
+                # Quote the section content, not its header
+                start = max(start, section["content_start"])
+            sentence = report[start:end].strip()
+            if len(sentence) < 8 or sentence.endswith(":") or rng.random() >= self.error_rate:
+                continue
+            step = rng.randint(1, 6)
+            errors.append({
+                "error_id": len(errors) + 1,
+                "error_type": CATEGORIES[_STEP_CATEGORIES[step]],
+                "text_span": sentence,
+                "section": SECTION_LABELS.get(section["name"] if section else None, "Other"),
+                "originating_step": step,
+                "severity": rng.choice(_SEVERITIES),
+                "confidence": round(rng.uniform(0.5, 0.99), 2),
+                "uncertain": False,
+                "explanation": "Canned error for offline benchmarking."
+            })
+        return errors
+    
+    def _rng(self, prompt):
+        """Generator seeded by the prompt, so draws do not depend on call order."""
+        return random.Random(f"{self.seed}:{_digest(prompt)}")
+    
+    def _draw_latency(self, rng):
+        """Seconds one call takes, drawn from the configured distribution."""
+        if self.latency <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return rng.uniform(0.0, 2 * self.latency)
+        if self.distribution == "exponential":
+            return rng.expovariate(1 / self.latency)
+        if self.distribution == "lognormal":
+            # Parameterized so the mean stays at ``latency``
+            return rng.lognormvariate(math.log(self.latency) - self.sigma ** 2 / 2, self.sigma)
+        return self.latency
+    
+    def _call(self, rng, latency, failed=None):
+        """Count a call, wait out its latency and fail it if its draw says so."""
+        with self._lock:
+            self.calls += 1
+        if latency:
+            time.sleep(latency)
+        if failed is None:
+            failed = rng.random() < self.failure_rate
+        if failed:
+            raise MockModelError("Simulated backend failure")
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def _approximate_tokens(text):
+    return (len(text) + 3) // 4
+
+def _report_of(prompt):
+    """The report text embedded in a RadCoT prompt."""
+    start = prompt.rfind("Report:")
+    if start < 0:
+        return prompt
+    report = prompt[start + len("Report:"):]
+    end = _REPORT_END_PATTERN.search(report)
+    if end is not None:
+        report = report[:end.start()]
+    return report.strip().strip('"').strip()
+
+def _step_output(number, errors, fused=False):
+    """One step's answer: reasoning, then its issues (a JSON block, or a list inside the fused output)."""
+    reasoning = f"Reviewed the report for the checks of step {number}."
+    if fused:
+        head = f"Reasoning Step {number}: {reasoning}\nIssues found in Step {number}:"
+        if not errors:
+            return head + " None"
+        items = "\n".join(f'{i}. "{error["text_span"]}" ({error["error_type"]})' for i, error in enumerate(errors, 1))
+        return head + "\n" + items
+    if not errors:
+        return f"{reasoning}\nNo issue identified in this step"
+    return f"{reasoning}\n\n{_json_block(errors)}"
+
+def _json_block(errors):
+    return "```json\n" + json.dumps({"errors": errors}, indent=2) + "\n```"
@@ -1,6 +1,16 @@
+import asyncio
+import copy
+import functools
+import gc
 import os
-import openai
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+import sys
+import threading
+import time
+
+from . import instrumentation
+
+# Backends import their heavy dependencies (openai, torch, transformers) only when
+# instantiated, so importing radcot does not pull in a model stack it won't use.
 
 class LLMInterface:
     """Interface for large language models."""
@@ -8,16 +18,123 @@ class LLMInterface:
     def generate(self, prompt):
         """Generate text based on prompt."""
         raise NotImplementedError("Subclasses must implement generate()")
+    
+    def generate_batch(self, prompts, **kwargs):
+        """
+        Generate text for several prompts.
+        
+        Backends that can share a forward pass across prompts override this;
+        the default simply calls ``generate`` for each prompt.
+        
+        Args:
+            prompts (list): Input prompts
+            **kwargs: Decoding parameters forwarded to ``generate``
+            
+        Returns:
+            list: Generated text for each prompt, in input order
+        """
+        results = []
+        for row, prompt in enumerate(prompts):
+            # Each call's usage belongs to the span that owns its row
+            with instrumentation.focus(row):
+                results.append(self.generate(prompt, **kwargs))
+        return results
+    
+    def generate_with_prefix(self, prefix, suffixes, **kwargs):
+        """
+        Generate text for several prompts that share a common prefix.
+        
+        Backends that can reuse the prefix's key/value cache override this;
+        the default concatenates and calls ``generate`` for each suffix.
+        
+        Args:
+            prefix (str): Shared leading text of every prompt
+            suffixes (list): Prompt-specific trailing text
+            **kwargs: Decoding parameters forwarded to ``generate``
+            
+        Returns:
+            list: Generated text for each suffix, in input order
+        """
+        results = []
+        for row, suffix in enumerate(suffixes):
+            with instrumentation.focus(row):
+                results.append(self.generate(prefix + suffix, **kwargs))
+        return results
+    
+    def generate_stream(self, prompt, **kwargs):
+        """
+        Generate text incrementally.
+        
+        Closing the returned generator stops generation early on backends that
+        support streaming; the default yields the full ``generate`` output once.
+        
+        Args:
+            prompt (str): Input prompt
+            **kwargs: Decoding parameters forwarded to ``generate``
+            
+        Yields:
+            str: Successive chunks of generated text
+        """
+        yield self.generate(prompt, **kwargs)
+    
+    def memory_footprint(self):
+        """Bytes of local memory held by the model (0 for remote APIs)."""
+        return 0
+    
+    def unload(self):
+        """Release any local resources held by the model."""
+        pass
 
 class GPT4oModel(LLMInterface):
-    """Interface for OpenAI's GPT-4o model."""
+    """
+    Interface for OpenAI's GPT-4o model.
     
-    def __init__(self):
-        """Initialize GPT-4o model."""
-        openai.api_key = os.environ.get("OPENAI_API_KEY")
-        if not openai.api_key:
+    Reuses one client (and so one HTTP connection pool) per instance for sync
+    and async calls, budgets requests
+    and estimated tokens per minute with a token-bucket scheduler (settling
+    each reservation against the tokens the response used), and retries
+    rate-limited (429), server (5xx) and connection errors with jittered
+    exponential backoff. The ``usage`` block of each response, and the time
+    spent waiting on the rate limiter, are recorded on the current
+    instrumentation span.
+    """
+    
+    SYSTEM_PROMPT = "You are a radiological assistant specialized in detecting errors in radiology reports."
+    
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_retries=5,
+                 timeout=120.0, max_tokens=2000, base_url=None):
+        """
+        Initialize GPT-4o model.
+        
+        Args:
+            requests_per_minute (int): Request quota to stay under (None for unlimited)
+            tokens_per_minute (int): Token quota to stay under (None for unlimited)
+            max_retries (int): Retries on 429, 5xx and connection errors
+            timeout (float): Per-request timeout in seconds
+            max_tokens (int): Maximum completion tokens per request
+            base_url (str): API endpoint override, e.g. a local stub server
+                (defaults to OPENAI_BASE_URL or the public API)
+        """
+        import openai
+        
+        self.model_name = "gpt-4o"
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
+        from .ratelimit import RateLimiter
+        
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        
+        base_url = base_url or os.environ.get("OPENAI_BASE_URL")
+        # Retries are handled here so they go through the rate limiter
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout)
+        self.async_client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout)
+        # Task closing the async client when unloaded inside a running event loop
+        self.closing = None
+        
     def generate(self, prompt, temperature=0.7):
         """
         Generate text using GPT-4o.
@@ -29,38 +146,215 @@ class GPT4oModel(LLMInterface):
         Returns:
             str: Generated text
         """
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a radiological assistant specialized in detecting errors in radiology reports."},
+        request = self._request(prompt, temperature)
+        reserved = self._estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            self.limiter.acquire(reserved)
+            instrumentation.record(queue_wait=time.perf_counter() - queued)
+            try:
+                response = self.client.chat.completions.create(**request)
+                self._record_usage(response, reserved)
+                return response.choices[0].message.content
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+    
+    async def agenerate(self, prompt, temperature=0.7):
+        """
+        Generate text using GPT-4o without blocking the event loop.
+        
+        Args:
+            prompt (str): Input prompt
+            temperature (float): Sampling temperature
+            
+        Returns:
+            str: Generated text
+        """
+        request = self._request(prompt, temperature)
+        reserved = self._estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            await self.limiter.acquire_async(reserved)
+            instrumentation.record(queue_wait=time.perf_counter() - queued)
+            try:
+                response = await self.async_client.chat.completions.create(**request)
+                self._record_usage(response, reserved)
+                return response.choices[0].message.content
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+    
+    def generate_stream(self, prompt, temperature=0.7):
+        """
+        Stream text from GPT-4o; closing the generator abandons the response.
+        
+        Only opening the stream is retried; a stream that fails midway raises.
+        
+        Args:
+            prompt (str): Input prompt
+            temperature (float): Sampling temperature
+            
+        Yields:
+            str: Successive chunks of generated text
+        """
+        request = self._request(prompt, temperature)
+        reserved = self._estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            self.limiter.acquire(reserved)
+            instrumentation.record(queue_wait=time.perf_counter() - queued)
+            try:
+                # The final chunk then carries the usage block
+                stream = self.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **request
+                )
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+        
+        settled = False
+        streamed = 0
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    self._record_usage(chunk, reserved)
+                    settled = True
+                if chunk.choices and chunk.choices[0].delta.content:
+                    streamed += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+            if not settled:
+                # Closed before the usage chunk: settle on an estimate of what was used
+                self.limiter.reconcile(reserved, reserved - self.max_tokens + streamed // 4)
+    
+    def unload(self):
+        """
+        Close the pooled HTTP connections of both clients.
+        
+        Called from a running event loop, the async client is closed by a task
+        kept in ``closing`` until it finishes; callers there should await
+        ``aclose`` instead.
+        """
+        self.client.close()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.async_client.close())
+        else:
+            self.closing = loop.create_task(self.async_client.close())
+    
+    async def aclose(self):
+        """Close the pooled HTTP connections of both clients from a running event loop."""
+        self.client.close()
+        await self.async_client.close()
+    
+    def _request(self, prompt, temperature):
+        """Chat completion arguments for a single-turn request."""
+        return {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": self.SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=temperature,
-            max_tokens=2000
+            "temperature": temperature,
+            "max_tokens": self.max_tokens
+        }
+    
+    def _record_usage(self, response, reserved):
+        """
+        Settle the rate-limit reservation of a request with its token usage,
+        and record the usage and exact model version on the current span.
+        """
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.limiter.reconcile(reserved, usage.prompt_tokens + usage.completion_tokens)
+        if instrumentation.current_span() is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        instrumentation.record(
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_prompt_tokens=getattr(details, "cached_tokens", None) or 0
         )
-        return response.choices[0].message.content
+        instrumentation.annotate(model=response.model)
+    
+    def _estimate_tokens(self, prompt):
+        """Upper-bound token cost of a request for rate budgeting."""
+        # About four characters per token, plus the full completion allowance
+        return (len(self.SYSTEM_PROMPT) + len(prompt)) // 4 + self.max_tokens
+    
+    def _retry_delay(self, error, attempt):
+        """
+        Decide whether a failed request should be retried.
+        
+        Args:
+            error (Exception): Error raised by the client
+            attempt (int): Zero-based attempt number that failed
+            
+        Returns:
+            float: Seconds to wait before retrying, or None to give up
+        """
+        import openai
+        from .ratelimit import backoff_delay
+        
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return backoff_delay(attempt)
+        if isinstance(error, openai.APIStatusError) and (
+                error.status_code == 429 or error.status_code >= 500):
+            retry_after = error.response.headers.get("retry-after")
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            return backoff_delay(attempt, retry_after=retry_after)
+        return None
 
-class LlamaModel(LLMInterface):
-    """Interface for Meta's Llama 3 model."""
+class HuggingFaceModel(LLMInterface):
+    """
+    Shared implementation for locally hosted Hugging Face causal LMs.
     
-    def __init__(self, model_size="70b"):
+    Prompt and completion token counts, and the time spent waiting for the
+    model lock, are recorded on the instrumentation span of each prompt.
+    """
+    
+    def __init__(self, model_name):
         """
-        Initialize Llama 3 model.
+        Load tokenizer and weights for a Hugging Face model.
         
         Args:
-            model_size (str): Size of the model (70b)
+            model_name (str): Hugging Face Hub model identifier
         """
-        model_name = f"meta-llama/Llama-3-{model_size}"
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Decoder-only models must be left-padded so generation continues each row
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
         self.model = AutoModelForCausalLM.from_pretrained(
             model_name,
             device_map="auto",
             torch_dtype="auto"
         )
-        
+        # One forward pass at a time, so detectors sharing this model are thread-safe
+        self._lock = threading.Lock()
+    
     def generate(self, prompt, temperature=0.7):
         """
-        Generate text using Llama 3.
+        Generate text for a single prompt.
         
         Args:
             prompt (str): Input prompt
@@ -69,63 +363,282 @@ class LlamaModel(LLMInterface):
         Returns:
             str: Generated text
         """
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-        outputs = self.model.generate(
-            inputs.input_ids,
-            max_new_tokens=2000,
-            temperature=temperature,
-            do_sample=True
-        )
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)[len(prompt):]
-
-class MixtralModel(LLMInterface):
-    """Interface for Mistral AI's Mixtral 8x22b model."""
+        return self.generate_batch([prompt], temperature=temperature)[0]
     
-    def __init__(self):
-        """Initialize Mixtral 8x22b model."""
-        model_name = "mistralai/Mixtral-8x22B-v0.1"
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_name,
-            device_map="auto",
-            torch_dtype="auto"
-        )
+    def generate_batch(self, prompts, temperature=0.7, batch_size=8):
+        """
+        Generate text for several prompts with padded, attention-masked batches.
         
-    def generate(self, prompt, temperature=0.7):
+        Prompts are tokenized once and grouped by token length so each batch
+        carries little padding; only the newly generated token IDs of each row
+        are decoded.
+        
+        Args:
+            prompts (list): Input prompts
+            temperature (float): Sampling temperature (0 for greedy decoding)
+            batch_size (int): Maximum number of prompts per forward pass
+            
+        Returns:
+            list: Generated text for each prompt, in input order
         """
-        Generate text using Mixtral.
+        encoded = self.tokenizer(list(prompts))["input_ids"]
+        order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+        results = [None] * len(encoded)
+        
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = self.tokenizer.pad(
+                {"input_ids": [encoded[i] for i in indices]},
+                return_tensors="pt"
+            ).to(self.model.device)
+            queued = time.perf_counter()
+            with self._lock:
+                waited = time.perf_counter() - queued
+                outputs = self.model.generate(
+                    **batch,
+                    max_new_tokens=2000,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    **self._sampling_kwargs(temperature)
+                )
+            new_tokens = outputs[:, batch["input_ids"].shape[1]:]
+            texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+            for i, text in zip(indices, texts):
+                results[i] = text
+            
+            if instrumentation.enabled():
+                # Rows end in padding once they finish
+                completed = (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+                for i, completion_tokens in zip(indices, completed):
+                    instrumentation.record(
+                        row=i,
+                        queue_wait=waited,
+                        prompt_tokens=len(encoded[i]),
+                        completion_tokens=completion_tokens
+                    )
+        
+        return results
+    
+    def generate_with_prefix(self, prefix, suffixes, temperature=0.7):
+        """
+        Prefill a shared prefix once and reuse its key/value cache for each suffix.
+        
+        Prefix and suffixes are tokenized separately and concatenated at the
+        token level, so every prompt starts with exactly the cached tokens.
+        Only the suffix tokens are run through the model; the cache handed to
+        ``generate`` then covers all but the last prompt token, which both the
+        older (last token only) and newer (cache position) input slicing of
+        ``transformers`` expect.
         
         Args:
-            prompt (str): Input prompt
-            temperature (float): Sampling temperature
+            prefix (str): Shared leading text (system instruction plus report)
+            suffixes (list): Step-specific trailing text
+            temperature (float): Sampling temperature (0 for greedy decoding)
             
         Returns:
-            str: Generated text
+            list: Generated text for each suffix, in input order
+        """
+        import torch
+        
+        prefix_ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+        # The prefix's last token is fed with each suffix, so the cache never covers a whole prompt
+        cached = prefix_ids.shape[1] - 1
+        queued = time.perf_counter()
+        with self._lock, torch.no_grad():
+            waited = time.perf_counter() - queued
+            prefix_cache = self.model(prefix_ids[:, :cached], use_cache=True).past_key_values if cached else None
+        
+        results = []
+        for row, suffix in enumerate(suffixes):
+            suffix_ids = self.tokenizer(
+                suffix,
+                add_special_tokens=False,
+                return_tensors="pt"
+            ).input_ids.to(self.model.device)
+            input_ids = torch.cat([prefix_ids, suffix_ids], dim=-1)
+            queued = time.perf_counter()
+            with self._lock, torch.no_grad():
+                waited += time.perf_counter() - queued
+                # generate() extends the cache in place, so each step gets its own copy
+                past = copy.deepcopy(prefix_cache)
+                pending = input_ids[:, cached:-1]
+                if pending.shape[1]:
+                    past = self.model(pending, past_key_values=past, use_cache=True).past_key_values
+                outputs = self.model.generate(
+                    input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    past_key_values=past,
+                    max_new_tokens=2000,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    **self._sampling_kwargs(temperature)
+                )
+            results.append(
+                self.tokenizer.decode(outputs[0, input_ids.shape[1]:], skip_special_tokens=True)
+            )
+            # The prefix tokens were served from the shared key/value cache
+            instrumentation.record(
+                row=row,
+                queue_wait=waited,
+                prompt_tokens=input_ids.shape[1],
+                cached_prompt_tokens=cached,
+                completion_tokens=outputs.shape[1] - input_ids.shape[1]
+            )
+            waited = 0.0
+        
+        return results
+    
+    def generate_stream(self, prompt, temperature=0.7):
         """
+        Stream text through a ``TextIteratorStreamer``.
+        
+        Generation runs on a background thread; closing the generator sets a
+        stopping criterion so decoding halts at the next token.
+        
+        Args:
+            prompt (str): Input prompt
+            temperature (float): Sampling temperature (0 for greedy decoding)
+            
+        Yields:
+            str: Successive chunks of newly generated text
+        """
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+        
+        stop = threading.Event()
+        failure = []
+        # Stopping criteria run once per generated token, so they count them
+        generated = [0]
+        waited = [0.0]
+        
+        class _StopWhenClosed(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                generated[0] += 1
+                return stop.is_set()
+        
         inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-        outputs = self.model.generate(
-            inputs.input_ids,
-            max_new_tokens=2000,
-            temperature=temperature,
-            do_sample=True
-        )
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)[len(prompt):]
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        
+        def run():
+            try:
+                queued = time.perf_counter()
+                with self._lock:
+                    waited[0] = time.perf_counter() - queued
+                    self.model.generate(
+                        **inputs,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_StopWhenClosed()]),
+                        max_new_tokens=2000,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                        **self._sampling_kwargs(temperature)
+                    )
+            except Exception as e:
+                failure.append(e)
+                # Unblock the consumer waiting on the streamer
+                streamer.end()
+        
+        worker = threading.Thread(target=run, name="radcot-stream", daemon=True)
+        worker.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            stop.set()
+            worker.join()
+            instrumentation.record(
+                queue_wait=waited[0],
+                prompt_tokens=inputs["input_ids"].shape[1],
+                completion_tokens=generated[0]
+            )
+        if failure:
+            raise failure[0]
+    
+    def memory_footprint(self):
+        """Bytes of memory held by the loaded weights."""
+        if self.model is None:
+            return 0
+        return self.model.get_memory_footprint()
+    
+    def unload(self):
+        """Drop the weights and return freed accelerator memory to the device."""
+        with self._lock:
+            self.model = None
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def _sampling_kwargs(self, temperature):
+        """Map a temperature onto Hugging Face decoding arguments."""
+        if temperature and temperature > 0:
+            return {"do_sample": True, "temperature": temperature}
+        return {"do_sample": False}
+
+class LlamaModel(HuggingFaceModel):
+    """Interface for Meta's Llama 3 model."""
+    
+    def __init__(self, model_size="70b"):
+        """
+        Initialize Llama 3 model.
+        
+        Args:
+            model_size (str): Size of the model (70b)
+        """
+        super().__init__(f"meta-llama/Llama-3-{model_size}")
 
-def load_model(model_name):
+class MixtralModel(HuggingFaceModel):
+    """Interface for Mistral AI's Mixtral 8x22b model."""
+    
+    def __init__(self):
+        """Initialize Mixtral 8x22b model."""
+        super().__init__("mistralai/Mixtral-8x22B-v0.1")
+
+_BACKENDS = {}
+
+def register_backend(name, factory):
+    """
+    Register a backend under a model name for ``load_model``.
+    
+    Args:
+        name (str): Model name, matched case-insensitively
+        factory (callable): Callable returning an LLMInterface from keyword
+            configuration; it should import heavy dependencies only when called
+    """
+    _BACKENDS[name.lower()] = factory
+
+def available_models():
+    """
+    List the model names accepted by ``load_model``.
+    
+    Returns:
+        list: Registered model names
+    """
+    return sorted(_BACKENDS)
+
+register_backend("gpt-4o", GPT4oModel)
+register_backend("llama-3-70b", functools.partial(LlamaModel, model_size="70b"))
+register_backend("mixtral-8x22b", MixtralModel)
+
+def _mock_backend(**config):
+    """Deterministic offline backend for benchmarks (see ``mock.MockModel``)."""
+    from .mock import MockModel
+    return MockModel(**config)
+
+register_backend("mock", _mock_backend)
+
+def load_model(model_name, **config):
     """
     Load a language model by name.
     
+    Most callers should go through ``registry.shared_registry`` instead, which
+    hands out one shared instance per model and configuration.
+    
     Args:
         model_name (str): Name of the model to load
+        **config: Backend-specific configuration passed to its factory
         
     Returns:
         LLMInterface: Model interface
     """
-    if model_name.lower() == "gpt-4o":
-        return GPT4oModel()
-    elif model_name.lower() == "llama-3-70b":
-        return LlamaModel(model_size="70b")
-    elif model_name.lower() == "mixtral-8x22b":
-        return MixtralModel()
-    else:
-        raise ValueError(f"Unsupported model: {model_name}")
\ No newline at end of file
+    factory = _BACKENDS.get(model_name.lower())
+    if factory is None:
+        raise ValueError(f"Unsupported model: {model_name}")
+    return factory(**config)
\ No newline at end of file
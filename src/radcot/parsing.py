@@ -0,0 +1,508 @@
+import functools
+import json
+import re
+
+from .taxonomy import CATEGORIES, normalize_category
+from .utils import tokenize_sections
+
+# Version of the output schemas below (Supplementary Document S1)
+SCHEMA_VERSION = "2.0"
+
+_ERROR_TYPES = list(CATEGORIES.values())
+
+# RadCoT output schema (JSON Schema Draft 2020-12)
+OUTPUT_SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "required": ["abstain", "abstain_reason", "errors", "summary"],
+    "additionalProperties": False,
+    "properties": {
+        "abstain": {"type": "boolean"},
+        "abstain_reason": {"type": ["string", "null"]},
+        "errors": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["error_id", "error_type", "text_span", "section", "originating_step",
+                             "severity", "confidence", "uncertain", "explanation"],
+                "additionalProperties": False,
+                "properties": {
+                    "error_id": {"type": "integer", "minimum": 1},
+                    "error_type": {"type": "string", "enum": _ERROR_TYPES},
+                    "text_span": {"type": "string", "minLength": 1},
+                    "section": {
+                        "type": "string",
+                        "enum": ["Technique", "Clinical Information", "Comparison", "Findings", "Impression", "Other"]
+                    },
+                    "originating_step": {"type": "integer", "minimum": 1, "maximum": 6},
+                    "severity": {"type": "string", "enum": ["minor", "moderate", "major"]},
+                    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+                    "uncertain": {"type": "boolean"},
+                    "explanation": {"type": "string", "minLength": 1}
+                }
+            }
+        },
+        "summary": {
+            "type": "object",
+            "required": ["n_errors", "by_type", "by_step", "mean_confidence"],
+            "additionalProperties": False,
+            "properties": {
+                "n_errors": {"type": "integer", "minimum": 0},
+                "by_type": {"type": "object"},
+                "by_step": {"type": "object"},
+                "mean_confidence": {"type": "number", "minimum": 0, "maximum": 1}
+            }
+        }
+    }
+}
+
+# Standard prompting output schema (JSON Schema Draft 2020-12)
+STANDARD_OUTPUT_SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "required": ["errors"],
+    "additionalProperties": False,
+    "properties": {
+        "errors": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["error_id", "error_type", "text_span", "description"],
+                "additionalProperties": False,
+                "properties": {
+                    "error_id": {"type": "integer", "minimum": 1},
+                    "error_type": {"type": "string", "enum": _ERROR_TYPES},
+                    "text_span": {"type": "string", "minLength": 1},
+                    "description": {"type": "string", "minLength": 1}
+                }
+            }
+        }
+    }
+}
+
+SCHEMAS = {"radcot": OUTPUT_SCHEMA, "standard": STANDARD_OUTPUT_SCHEMA}
+
+# Error fields the prompts do not always ask for (the fused prompt's final
+# output has neither): parsed errors may omit them, but are checked when present
+PARSED_OPTIONAL_FIELDS = ("severity", "confidence")
+
+# Schema section labels of the report sections found by ``utils.tokenize_sections``
+SECTION_LABELS = {
+    "findings": "Findings",
+    "impression": "Impression",
+    "technique": "Technique",
+    "clinical_info": "Clinical Information",
+    "comparison": "Comparison"
+}
+
+_FENCE_PATTERN = re.compile(r"```[ \t]*(?:json|JSON)?[ \t]*\n?(.*?)```", re.DOTALL)
+_OPENING_PATTERN = re.compile(r"[\[{]")
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[\]}])")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_DECODER = json.JSONDecoder()
+
+class SchemaValidator:
+    """
+    A JSON Schema compiled into nested checks once, then applied many times.
+    
+    The built-in compiler supports the keywords the published schemas use
+    (type, enum, required, properties, additionalProperties, items, minimum,
+    maximum, minLength). With ``use_jsonschema`` the reference
+    ``jsonschema`` Draft 2020-12 validator is used instead.
+    """
+    
+    def __init__(self, schema, use_jsonschema=False):
+        """
+        Compile a schema.
+        
+        Args:
+            schema (dict): JSON Schema
+            use_jsonschema (bool): Whether to validate with the ``jsonschema`` package
+        """
+        self.schema = schema
+        if use_jsonschema:
+            import jsonschema
+            
+            jsonschema.Draft202012Validator.check_schema(schema)
+            reference = jsonschema.Draft202012Validator(schema)
+            self._check = lambda instance, path: [
+                f"{'/'.join(map(str, error.absolute_path)) or '(root)'}: {error.message}"
+                for error in reference.iter_errors(instance)
+            ]
+        else:
+            self._check = _compile(schema)
+    
+    def errors(self, instance):
+        """
+        Validate an instance.
+        
+        Args:
+            instance: Decoded JSON value
+            
+        Returns:
+            list: Violation messages (empty when valid)
+        """
+        return self._check(instance, "")
+
+@functools.lru_cache(maxsize=None)
+def compiled_validator(name="radcot", part="output", use_jsonschema=False):
+    """
+    The process-wide compiled validator of a published schema.
+    
+    Args:
+        name (str): "radcot" or "standard" (see ``SCHEMAS``)
+        part (str): "output" for the whole object, "error" for one error
+            item, "parsed" for one error item parsed from model output
+            (``PARSED_OPTIONAL_FIELDS`` not required)
+        use_jsonschema (bool): Whether to validate with the ``jsonschema`` package
+        
+    Returns:
+        SchemaValidator: Validator, compiled on first use
+    """
+    schema = SCHEMAS[name]
+    if part in ("error", "parsed"):
+        schema = schema["properties"]["errors"]["items"]
+        if part == "parsed":
+            required = [field for field in schema["required"] if field not in PARSED_OPTIONAL_FIELDS]
+            schema = dict(schema, required=required)
+    elif part != "output":
+        raise ValueError(f"Unknown schema part: {part}")
+    return SchemaValidator(schema, use_jsonschema=use_jsonschema)
+
+def _compile(schema):
+    """Turn a schema into a function (instance, path) -> list of violation messages."""
+    checks = []
+    
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else list(types)
+        python_types = tuple(t for name in types for t in _PYTHON_TYPES[name])
+        
+        def check_type(value, path):
+            # bool is an int in Python but not a JSON number
+            if not isinstance(value, python_types) or (
+                    isinstance(value, bool) and "boolean" not in types):
+                return [f"{path or '(root)'}: {value!r} is not of type {' or '.join(types)}"]
+            return None
+        checks.append(check_type)
+    
+    if "enum" in schema:
+        allowed = schema["enum"]
+        checks.append(lambda value, path: None if value in allowed else [
+            f"{path or '(root)'}: {value!r} is not one of {allowed}"
+        ])
+    
+    if "minLength" in schema:
+        minimum_length = schema["minLength"]
+        checks.append(lambda value, path: None if not isinstance(value, str) or len(value) >= minimum_length else [
+            f"{path or '(root)'}: {value!r} is shorter than {minimum_length}"
+        ])
+    
+    for keyword, fails in (("minimum", lambda value, bound: value < bound),
+                           ("maximum", lambda value, bound: value > bound)):
+        if keyword in schema:
+            def check_bound(value, path, bound=schema[keyword], fails=fails, keyword=keyword):
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and fails(value, bound):
+                    return [f"{path or '(root)'}: {value!r} violates {keyword} {bound}"]
+                return None
+            checks.append(check_bound)
+    
+    properties = {name: _compile(subschema) for name, subschema in schema.get("properties", {}).items()}
+    required = schema.get("required", [])
+    closed = schema.get("additionalProperties") is False
+    if properties or required or closed:
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return None
+            messages = [f"{path or '(root)'}: missing {name!r}" for name in required if name not in value]
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    messages += check(item, f"{path}/{name}" if path else name)
+                elif closed:
+                    messages.append(f"{path or '(root)'}: unexpected property {name!r}")
+            return messages
+        checks.append(check_object)
+    
+    if "items" in schema:
+        check_item = _compile(schema["items"])
+        
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return None
+            messages = []
+            for index, item in enumerate(value):
+                messages += check_item(item, f"{path}/{index}" if path else str(index))
+            return messages
+        checks.append(check_items)
+    
+    def check(value, path):
+        messages = []
+        for single in checks:
+            found = single(value, path)
+            if found:
+                messages += found
+                if single is checks[0] and types is not None:
+                    # Nothing else is meaningful for a value of the wrong type
+                    break
+        return messages
+    return check
+
+_PYTHON_TYPES = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "null": (type(None),)
+}
+
+def extract_json(text):
+    """
+    Find the model's structured output in free text.
+    
+    Fenced code blocks are tried first, then the JSON values starting at each
+    ``{`` or ``[`` in turn; the first output object (with ``errors`` or
+    ``abstain``) or list of objects wins, and a lone error object is the
+    last resort. Trailing commas are tolerated.
+    
+    Args:
+        text (str): Model output
+        
+    Returns:
+        The decoded value, or None if the text contains no output
+    """
+    if not isinstance(text, str):
+        return None
+    
+    for fence in _FENCE_PATTERN.finditer(text):
+        block = fence.group(1).strip()
+        value = _decode(block)
+        if value is None:
+            value = _decode(_TRAILING_COMMA_PATTERN.sub(r"\1", block))
+        if _looks_like_output(value) or _looks_like_error(value):
+            return value
+    
+    output, error = _scan(text)
+    if output is None and _TRAILING_COMMA_PATTERN.search(text):
+        output, repaired_error = _scan(_TRAILING_COMMA_PATTERN.sub(r"\1", text))
+        error = error or repaired_error
+    return output if output is not None else error
+
+def _scan(text):
+    """The first output value decoded at an opening bracket, and the first lone error object."""
+    error = None
+    position = 0
+    while True:
+        opening = _OPENING_PATTERN.search(text, position)
+        if opening is None:
+            return None, error
+        try:
+            value, end = _DECODER.raw_decode(text, opening.start())
+        except ValueError:
+            position = opening.start() + 1
+            continue
+        if _looks_like_output(value):
+            return value, error
+        if error is None and _looks_like_error(value):
+            error = value
+        position = end
+
+def _decode(block):
+    try:
+        return json.loads(block)
+    except ValueError:
+        return None
+
+def _looks_like_output(value):
+    if isinstance(value, dict):
+        return "errors" in value or "abstain" in value
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+def _looks_like_error(value):
+    return isinstance(value, dict) and "text_span" in value
+
+def locate_span(report, span):
+    """
+    Find a quoted span in a report.
+    
+    Tries an exact substring search first, then a case-insensitive one
+    (when case folding keeps offsets), then a match that tolerates
+    differences in whitespace.
+    
+    Args:
+        report (str): Report text
+        span (str): Quoted text span
+        
+    Returns:
+        tuple: Start and end offsets in the report, or None if the span does not occur
+    """
+    if not isinstance(span, str):
+        return None
+    span = span.strip()
+    if not span:
+        return None
+    
+    start = report.find(span)
+    if start >= 0:
+        return start, start + len(span)
+    
+    folded_span = span.casefold()
+    if len(folded_span) == len(span):
+        folded = _casefolded(report)
+        if len(folded) == len(report):
+            start = folded.find(folded_span)
+            if start >= 0:
+                return start, start + len(span)
+    
+    words = _WHITESPACE_PATTERN.split(span)
+    match = re.search(r"\s+".join(map(re.escape, words)), report, re.IGNORECASE)
+    return match.span() if match else None
+
+@functools.lru_cache(maxsize=64)
+def _casefolded(report):
+    return report.casefold()
+
+class OutputParser:
+    """
+    Parse model output into schema-valid, evidence-grounded errors.
+    
+    The structured output is extracted from fenced or mixed text. Each error
+    is normalized (category labels to their canonical form, numeric strings
+    to numbers, fields the step context implies filled in), validated
+    against the published schema (``severity`` and ``confidence`` may be
+    absent, since not every prompt asks for them), and its ``text_span``
+    located in the report. Errors that fail validation or quote text absent
+    from the report are rejected, with the reasons. Accepted errors carry their taxonomy
+    ``category`` key and their ``span_start`` and ``span_end`` offsets.
+    """
+    
+    def __init__(self, schema="radcot", verify_spans=True, use_jsonschema=False):
+        """
+        Initialize the parser.
+        
+        Args:
+            schema (str): Output schema errors follow, "radcot" or "standard"
+            verify_spans (bool): Whether to reject errors whose ``text_span``
+                does not occur in the report
+            use_jsonschema (bool): Whether to validate with the ``jsonschema``
+                package instead of the built-in compiled validator
+        """
+        self.schema = schema
+        self.verify_spans = verify_spans
+        self.validator = compiled_validator(schema, "parsed", use_jsonschema)
+    
+    def parse(self, response, report=None, step=None):
+        """
+        Parse one model output.
+        
+        Args:
+            response (str): Model output
+            report (str): Report text the model saw, for span verification
+                and to fill in missing sections
+            step (int): RadCoT step (1-6) that produced the output, used when
+                errors do not state their ``originating_step``
+                
+        Returns:
+            dict: Accepted ``errors``, ``rejected`` errors with their
+                ``reasons``, and the ``abstain`` flag and ``abstain_reason``
+        """
+        parsed = {"errors": [], "rejected": [], "abstain": False, "abstain_reason": None}
+        output = extract_json(response)
+        if output is None:
+            return parsed
+        
+        if isinstance(output, dict) and "text_span" in output:
+            output = [output]
+        if isinstance(output, dict):
+            parsed["abstain"] = output.get("abstain") is True
+            parsed["abstain_reason"] = output.get("abstain_reason")
+            output = output.get("errors") or []
+            if not isinstance(output, list):
+                parsed["rejected"].append({"error": output, "reasons": ["errors: not an array"]})
+                return parsed
+        
+        sections = None
+        for position, raw in enumerate(output, 1):
+            if not isinstance(raw, dict):
+                parsed["rejected"].append({"error": raw, "reasons": ["(root): not an object"]})
+                continue
+            error = self._normalize(raw, position, step)
+            
+            located = None
+            if report is not None and isinstance(error.get("text_span"), str):
+                located = locate_span(report, error["text_span"])
+                if located is not None:
+                    # Quote the report verbatim, whatever case or spacing the model used
+                    error["text_span"] = report[located[0]:located[1]]
+                    if self.schema == "radcot" and "section" not in error:
+                        if sections is None:
+                            sections = tokenize_sections(report)
+                        error["section"] = _section_at(sections, located[0])
+            
+            reasons = self.validator.errors(error)
+            if self.verify_spans and report is not None and located is None:
+                reasons.append("text_span: not found in the report")
+            if reasons:
+                parsed["rejected"].append({"error": raw, "reasons": reasons})
+                continue
+            
+            error["category"] = normalize_category(error["error_type"])
+            if located is not None:
+                error["span_start"], error["span_end"] = located
+            if self.schema == "standard":
+                error["explanation"] = error["description"]
+            parsed["errors"].append(error)
+        return parsed
+    
+    def _normalize(self, raw, position, step):
+        """Canonicalize labels and numeric strings, and fill in implied fields."""
+        error = dict(raw)
+        category = normalize_category(error.get("error_type"))
+        if category is not None:
+            error["error_type"] = CATEGORIES[category]
+        error.setdefault("error_id", position)
+        # The two schemas name the free-text field differently
+        wanted, other = ("description", "explanation") if self.schema == "standard" else ("explanation", "description")
+        if wanted not in error and other in error:
+            error[wanted] = error.pop(other)
+        if self.schema == "standard":
+            return error
+        
+        if step is not None:
+            error.setdefault("originating_step", step)
+        error.setdefault("uncertain", False)
+        if isinstance(error.get("severity"), str):
+            error["severity"] = error["severity"].strip().lower()
+        for field, convert in (("originating_step", int), ("error_id", int), ("confidence", float)):
+            value = error.get(field)
+            if isinstance(value, str):
+                try:
+                    error[field] = convert(value.strip())
+                except ValueError:
+                    pass
+        return error
+
+def _section_at(sections, offset):
+    """Schema section label of the report section containing an offset."""
+    name = None
+    for section in sections:
+        if section["start"] > offset:
+            break
+        name = section["name"]
+    return SECTION_LABELS.get(name, "Other")
+
+def validate_output(output, schema="radcot", use_jsonschema=False):
+    """
+    Validate a complete decoded output object against a published schema.
+    
+    Args:
+        output (dict): Decoded model output
+        schema (str): "radcot" or "standard"
+        use_jsonschema (bool): Whether to validate with the ``jsonschema`` package
+        
+    Returns:
+        list: Violation messages (empty when valid)
+    """
+    return compiled_validator(schema, "output", use_jsonschema).errors(output)
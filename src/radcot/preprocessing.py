@@ -0,0 +1,195 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from .utils import ABBREVIATION_ALTERNATION, ABBREVIATIONS
+
+# Whitespace the input contract collapses: any run that is not a single
+# plain space. Runs containing a line break keep it, so section boundaries
+# survive; both branches start with one character class to keep the scan fast
+_WHITESPACE_ALTERNATION = r"(?P<space>[^\S ]\s*| \s+)"
+
+_WHITESPACE_PATTERN = re.compile(_WHITESPACE_ALTERNATION)
+_WHITESPACE_AND_ABBREVIATION_PATTERN = re.compile(
+    _WHITESPACE_ALTERNATION + r"|(?P<abbreviation>" + ABBREVIATION_ALTERNATION + r")",
+    re.IGNORECASE
+)
+
+class NormalizedReport:
+    """
+    A preprocessed report with a character offset map back to the original text.
+    """
+    
+    __slots__ = ("text", "original", "_starts", "_ends")
+    
+    def __init__(self, text, original, starts, ends):
+        """
+        Initialize the normalized report.
+        
+        Args:
+            text (str): Normalized text
+            original (str): Original report text
+            starts (list): Per normalized character, the original offset it starts at
+            ends (list): Per normalized character, the original offset it ends at
+        """
+        self.text = text
+        self.original = original
+        self._starts = starts
+        self._ends = ends
+    
+    def to_original(self, start, end):
+        """
+        Map a span of the normalized text to the original text.
+        
+        Args:
+            start (int): Start offset in the normalized text
+            end (int): End offset (exclusive) in the normalized text
+            
+        Returns:
+            tuple: Start and end offsets in the original text
+        """
+        if end <= start:
+            offset = self._starts[start] if start < len(self._starts) else len(self.original)
+            return offset, offset
+        return self._starts[start], self._ends[end - 1]
+    
+    def locate(self, span):
+        """
+        Find a span quoted from the normalized text in the original text.
+        
+        Args:
+            span (str): Text span as it appears in the normalized text
+            
+        Returns:
+            tuple: Start and end offsets in the original text, or None if the
+                span does not occur
+        """
+        if not isinstance(span, str) or not span.strip():
+            return None
+        span = span.strip()
+        start = self.text.find(span)
+        if start < 0:
+            return None
+        return self.to_original(start, start + len(span))
+
+def normalize_report(text, expand_abbreviations=False):
+    """
+    Apply the ``input_contract`` preprocessing to a report.
+    
+    NFKC normalization is followed by a single pass that collapses
+    whitespace (line breaks are kept, blank lines collapse to one) and,
+    optionally, expands anatomical abbreviations. The input contract asks for
+    no lexical substitution, so abbreviation expansion is off by default.
+    
+    Args:
+        text (str): Original report text
+        expand_abbreviations (bool): Whether to expand abbreviations such as "rt"
+        
+    Returns:
+        NormalizedReport: Normalized text with its offset map
+    """
+    nfkc, nfkc_starts, nfkc_ends = _nfkc_with_offsets(text)
+    pattern = _WHITESPACE_AND_ABBREVIATION_PATTERN if expand_abbreviations else _WHITESPACE_PATTERN
+    
+    pieces, starts, ends = [], [], []
+    last = 0
+    for match in pattern.finditer(nfkc):
+        start, end = match.span()
+        pieces.append(nfkc[last:start])
+        starts.extend(range(last, start))
+        ends.extend(range(last + 1, start + 1))
+        
+        if match.lastgroup == "abbreviation":
+            replacement = ABBREVIATIONS[match.group().lower()]
+        elif start == 0 or end == len(nfkc):
+            replacement = ""
+        elif "\n" in match.group():
+            replacement = "\n\n" if match.group().count("\n") > 1 else "\n"
+        else:
+            replacement = " "
+        pieces.append(replacement)
+        starts.extend([start] * len(replacement))
+        ends.extend([end] * len(replacement))
+        last = end
+    
+    pieces.append(nfkc[last:])
+    starts.extend(range(last, len(nfkc)))
+    ends.extend(range(last + 1, len(nfkc) + 1))
+    
+    if nfkc_starts is not None:
+        # Compose with the NFKC offset map
+        starts = [nfkc_starts[offset] if offset < len(nfkc) else len(text) for offset in starts]
+        ends = [nfkc_ends[offset - 1] if offset > 0 else 0 for offset in ends]
+    
+    return NormalizedReport("".join(pieces), text, starts, ends)
+
+def _nfkc_with_offsets(text):
+    """
+    NFKC-normalize text, keeping offsets when normalization changes it.
+    
+    Returns:
+        tuple: Normalized text, and per-character original start and end
+            offsets (both None when the text was already normalized)
+    """
+    if unicodedata.is_normalized("NFKC", text):
+        return text, None, None
+    
+    # Normalize each base character together with the combining marks after it
+    pieces, starts, ends = [], [], []
+    cluster_start = 0
+    for i in range(1, len(text) + 1):
+        if i < len(text) and unicodedata.combining(text[i]):
+            continue
+        piece = unicodedata.normalize("NFKC", text[cluster_start:i])
+        pieces.append(piece)
+        starts.extend([cluster_start] * len(piece))
+        ends.extend([i] * len(piece))
+        cluster_start = i
+    return "".join(pieces), starts, ends
+
+class ReportPreprocessor:
+    """
+    Memoizing front end to ``normalize_report``.
+    
+    Results are kept by content hash, so a report shared by several steps,
+    or seen again in a rerun, is normalized only once.
+    """
+    
+    def __init__(self, expand_abbreviations=False, max_entries=4096):
+        """
+        Initialize the preprocessor.
+        
+        Args:
+            expand_abbreviations (bool): Whether to expand anatomical abbreviations
+            max_entries (int): Normalized reports kept, least recently used evicted
+        """
+        self.expand_abbreviations = expand_abbreviations
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __call__(self, text):
+        """
+        Normalize a report, reusing an earlier result for identical text.
+        
+        Args:
+            text (str): Original report text
+            
+        Returns:
+            NormalizedReport: Normalized text with its offset map
+        """
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            normalized = self._entries.get(key)
+            if normalized is not None:
+                self._entries.move_to_end(key)
+                return normalized
+        
+        normalized = normalize_report(text, self.expand_abbreviations)
+        with self._lock:
+            self._entries[key] = normalized
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return normalized
@@ -1,3 +1,190 @@
+RADCOT_SYSTEM = """You are a radiology quality assurance specialist tasked with detecting errors in radiology reports. 
+                Analyze each report using the Radiological Chain-of-Thought (RadCoT) framework."""
+
+# Every RadCoT step prompt starts with this report-first prefix and ends with its
+# step-specific question, so local backends can prefill the prefix once per report
+# and reuse its key/value cache for each step (see LLMInterface.generate_with_prefix).
+RADCOT_REPORT_PREFIX = RADCOT_SYSTEM + """
+
+Report:
+{report}
+
+"""
+
+# Lists the rule-based pre-screen hits (see rules.RuleChecker) inside a prompt,
+# so the model spends its output on errors the rules cannot find
+PRESCREEN_NOTE = """Automated checks have already identified the following errors. Do not report them again:
+{hits}"""
+
+# Added to the fused prompt for steps the scheduler skipped for this report
+FUSED_SKIP_NOTE = """Do not perform the following steps for this report; write "Issues found in Step N: None" for each:
+{steps}"""
+
+# Closes every RadCoT step prompt, so the step's errors come back in the fields
+# parsing.OutputParser validates (severity and confidence may be left out)
+STEP_OUTPUT_FORMAT = """
+
+Then give the errors as a JSON block in this format, or {{"errors": []}} if there are none:
+```json
+{{"errors": [{{"error_type": "Typographical" | "Numerical" | "Omission/Insertion" | "Interpretation" | "Findings-Impression Discrepancy",
+  "text_span": "<verbatim quote from the report>",
+  "severity": "minor" | "moderate" | "major",
+  "confidence": <number between 0 and 1>,
+  "explanation": "<one-sentence rationale>"}}]}}
+```"""
+
+# S1.2 one-shot RadCoT prompt (prompts/prompt.txt): all six steps in a single call.
+# Each step answers with "Reasoning Step N:" / "Issues found in Step N:" blocks,
+# which RadCoT splits back into a per-step reasoning trace.
+RADCOT_FUSED_PROMPT = '''You are a senior board-certified radiologist performing structured quality
+assurance (QA) review of a finalized radiology report. Your task is to
+identify reporting errors by following the six-step radiological reasoning
+framework below. You must complete the steps IN ORDER and SHOW YOUR
+REASONING for each step before producing the final error list.
+
+General rules:
+  - Base your judgments strictly on the text of the report provided. Do not
+    invent findings that are not stated.
+  - Quote the exact offending text span (verbatim) for every error.
+  - Assign each error to exactly ONE of the following categories:
+      (1) Typographical        — spelling, punctuation, or minor grammar
+                                 issues without change in clinical meaning.
+      (2) Numerical            — incorrect measurements, units, or
+                                 internally inconsistent quantitative values.
+      (3) Omission/Insertion   — missing critical findings, or mention of
+                                 structures/findings not actually present.
+      (4) Interpretation       — incorrect diagnostic conclusions or
+                                 misjudged severity/clinical significance.
+      (5) Findings–Impression  — inconsistencies between the Findings section
+          Discrepancy            and the Impression section.
+  - If no errors are present in a given step, explicitly state "No issue
+    identified in this step" and proceed to the next step.
+
+────────────────────────────────────────────────────────────────────────
+STEP 1 — Anatomical Validation
+────────────────────────────────────────────────────────────────────────
+Verify anatomical correctness:
+  • Are all anatomical terms used appropriate for the imaged body region
+    and the stated modality?
+  • Is laterality (left/right) consistent throughout the report and
+    consistent with the clinical indication?
+  • Are there any impossible anatomical configurations (e.g., a uterus
+    described in a male patient, gallbladder in a post-cholecystectomy
+    patient without acknowledgment)?
+  • Are spatial relationships (superior/inferior, medial/lateral,
+    anterior/posterior) internally consistent?
+
+Reasoning Step 1: <your reasoning here>
+Issues found in Step 1: <list or "None">
+
+────────────────────────────────────────────────────────────────────────
+STEP 2 — Measurement Consistency
+────────────────────────────────────────────────────────────────────────
+Verify all quantitative content:
+  • Are measurement units appropriate (e.g., mm vs cm vs m) and consistent
+    across mentions of the same lesion?
+  • Are multiplicities consistent (e.g., "two nodules" in Findings vs
+    "a single nodule" in Impression)?
+  • Are numerical values plausible for the described anatomy (e.g.,
+    "25 cm renal cyst" is implausible)?
+  • Do values reported in different sections (Findings, Impression,
+    comparison statements) agree with each other?
+
+Reasoning Step 2: <your reasoning here>
+Issues found in Step 2: <list or "None">
+
+────────────────────────────────────────────────────────────────────────
+STEP 3 — Cross-Sectional / Inter-Section Correlation
+────────────────────────────────────────────────────────────────────────
+Check consistency ACROSS sections, sequences, and planes:
+  • Does information in Technique, Findings, Comparison, and Impression
+    refer to the same study, patient, and body region?
+  • For multi-sequence studies (CT/MRI), are sequence-specific findings
+    internally coherent (e.g., T2-hyperintense lesion described as
+    T2-hypointense later)?
+  • Are comparison statements consistent with the prior study referenced?
+  • Are contradictions present between different paragraphs of Findings?
+
+Reasoning Step 3: <your reasoning here>
+Issues found in Step 3: <list or "None">
+
+────────────────────────────────────────────────────────────────────────
+STEP 4 — Findings–Impression Alignment
+────────────────────────────────────────────────────────────────────────
+Verify that the Impression faithfully summarizes the Findings:
+  • Are all clinically significant findings reflected in the Impression?
+  • Is any Impression statement unsupported by the Findings (e.g.,
+    "possible ischemic changes" when Findings describe normal parenchyma)?
+  • Are diagnostic qualifiers preserved ("possible", "suspicious for",
+    "no definite evidence of") without drift toward stronger or weaker
+    certainty?
+  • Are measurements of key lesions preserved in the Impression when
+    relevant?
+
+Reasoning Step 4: <your reasoning here>
+Issues found in Step 4: <list or "None">
+
+────────────────────────────────────────────────────────────────────────
+STEP 5 — Clinical Completeness
+────────────────────────────────────────────────────────────────────────
+Assess whether expected elements are present, given the modality and
+clinical indication:
+  • Are all structures routinely evaluated for this modality addressed
+    (e.g., lung bases on an abdominal CT, vascular structures on a
+    contrast-enhanced study)?
+  • Are appropriate follow-up recommendations or incidental-finding
+    management suggestions present when the findings warrant them
+    (e.g., Fleischner-type pulmonary nodule recommendations, LI-RADS
+    categorization for liver lesions)?
+  • Are critical/actionable findings communicated with appropriate
+    urgency language?
+
+Reasoning Step 5: <your reasoning here>
+Issues found in Step 5: <list or "None">
+
+────────────────────────────────────────────────────────────────────────
+STEP 6 — Terminology Verification
+────────────────────────────────────────────────────────────────────────
+Verify radiological terminology:
+  • Is terminology standardized (RadLex-consistent where applicable)?
+  • Are there ambiguous, colloquial, or obsolete expressions (e.g.,
+    "shadow" instead of "opacity"; "looks like" instead of "consistent
+    with")?
+  • Are abbreviations defined on first use where non-standard?
+  • Are spelling and punctuation correct at the level of individual
+    tokens?
+
+Reasoning Step 6: <your reasoning here>
+Issues found in Step 6: <list or "None">
+
+────────────────────────────────────────────────────────────────────────
+FINAL OUTPUT
+────────────────────────────────────────────────────────────────────────
+After completing all six steps, consolidate your findings into a single
+structured JSON array. Each element must follow this schema:
+
+{{
+  "error_id": <integer, 1-based>,
+  "error_type": <one of: "Typographical" | "Numerical" |
+                 "Omission/Insertion" | "Interpretation" |
+                 "Findings–Impression Discrepancy">,
+  "text_span":  <verbatim quote from the report>,
+  "section":    <"Findings" | "Impression" | "Technique" |
+                 "Clinical Information" | "Comparison" | "Other">,
+  "originating_step": <integer 1–6, the RadCoT step that surfaced the error>,
+  "explanation": <one-sentence rationale>
+}}
+
+If no errors are identified after all six steps, output:
+  {{"errors": []}}
+
+Report:
+"""
+{report}
+"""
+
+Output:'''
+
 def load_prompts(use_radcot=True):
     """
     Load prompts for error detection in radiology reports.
@@ -10,88 +197,73 @@ def load_prompts(use_radcot=True):
     """
     if use_radcot:
         return {
-            "system": """You are a radiology quality assurance specialist tasked with detecting errors in radiology reports. 
-                      Analyze each report using the Radiological Chain-of-Thought (RadCoT) framework.""",
+            "system": RADCOT_SYSTEM,
             
-            "anatomical_validation": """### Step 1: Anatomical Structure Validation
-                                    Carefully review the following radiology report and identify any errors related to 
+            "report_prefix": RADCOT_REPORT_PREFIX,
+            
+            "anatomical_validation": RADCOT_REPORT_PREFIX + """### Step 1: Anatomical Structure Validation
+                                    Carefully review the radiology report above and identify any errors related to 
                                     anatomical references, laterality (left/right), or spatial relationships.
                                     
-                                    Report:
-                                    {report}
-                                    
                                     1. Are all anatomical structures correctly named?
                                     2. Is laterality (left/right) consistently and correctly specified?
                                     3. Are spatial relationships anatomically accurate?
                                     4. Are there any contradictory anatomical descriptions?
                                     
-                                    List all anatomical errors found:""",
+                                    List all anatomical errors found, or state "No issue identified in this step":""" + STEP_OUTPUT_FORMAT,
             
-            "measurement_consistency": """### Step 2: Measurement Consistency Checking
-                                      Carefully review the following radiology report and identify any errors related to 
+            "measurement_consistency": RADCOT_REPORT_PREFIX + """### Step 2: Measurement Consistency Checking
+                                      Carefully review the radiology report above and identify any errors related to 
                                       measurements, units, or numerical values.
                                       
-                                      Report:
-                                      {report}
-                                      
                                       1. Are all measurements provided with appropriate units?
                                       2. Are measurements consistent throughout the report?
                                       3. Are the measurements within physiologically plausible ranges?
                                       4. Are there any contradictory measurements?
                                       
-                                      List all measurement errors found:""",
+                                      List all measurement errors found, or state "No issue identified in this step":""" + STEP_OUTPUT_FORMAT,
             
-            "cross_sectional": """### Step 3: Cross-sectional Correlation
-                              Carefully review the following radiology report and identify any inconsistencies 
+            "cross_sectional": RADCOT_REPORT_PREFIX + """### Step 3: Cross-sectional Correlation
+                              Carefully review the radiology report above and identify any inconsistencies 
                               between different imaging planes, sequences, or sections of the report.
                               
-                              Report:
-                              {report}
-                              
                               1. Are findings consistent across different imaging planes/sequences?
                               2. Are there contradictions between descriptions of the same structure in different sections?
                               3. If multiple imaging techniques are mentioned, are their results compatible?
                               
-                              List all cross-sectional correlation errors found:""",
+                              List all cross-sectional correlation errors found, or state "No issue identified in this step":""" + STEP_OUTPUT_FORMAT,
             
-            "findings_impression": """### Step 4: Findings-Impression Alignment
-                                  Carefully review the following radiology report and identify any discrepancies 
+            "findings_impression": RADCOT_REPORT_PREFIX + """### Step 4: Findings-Impression Alignment
+                                  Carefully review the radiology report above and identify any discrepancies 
                                   between the detailed findings section and the summary impression section.
                                   
-                                  Report:
-                                  {report}
-                                  
                                   1. Are all significant findings from the findings section reflected in the impression?
                                   2. Are there any conclusions in the impression not supported by the findings?
                                   3. Are the impressions logically derived from the findings?
                                   
-                                  List all findings-impression alignment errors found:""",
+                                  List all findings-impression alignment errors found, or state "No issue identified in this step":""" + STEP_OUTPUT_FORMAT,
             
-            "clinical_completeness": """### Step 5: Clinical Completeness Assessment
-                                    Carefully review the following radiology report and identify any errors related to 
+            "clinical_completeness": RADCOT_REPORT_PREFIX + """### Step 5: Clinical Completeness Assessment
+                                    Carefully review the radiology report above and identify any errors related to 
                                     missing clinically important information or follow-up recommendations.
                                     
-                                    Report:
-                                    {report}
-                                    
                                     1. Based on the findings, are appropriate follow-up recommendations provided?
                                     2. Are there any clinically significant findings that appear to be overlooked?
                                     3. Is the report complete for the stated clinical indication?
                                     
-                                    List all clinical completeness errors found:""",
+                                    List all clinical completeness errors found, or state "No issue identified in this step":""" + STEP_OUTPUT_FORMAT,
             
-            "terminology_accuracy": """### Step 6: Radiological Terminology Accuracy
-                                   Carefully review the following radiology report and identify any errors related to 
+            "terminology_accuracy": RADCOT_REPORT_PREFIX + """### Step 6: Radiological Terminology Accuracy
+                                   Carefully review the radiology report above and identify any errors related to 
                                    radiological terminology, lexicon, or standard reporting language.
                                    
-                                   Report:
-                                   {report}
-                                   
                                    1. Is standard radiological terminology used appropriately?
                                    2. Are there any instances of incorrect or outdated terms?
                                    3. Are abbreviations used consistently and appropriately?
                                    
-                                   List all terminology errors found:""",
+                                   List all terminology errors found, or state "No issue identified in this step":""" + STEP_OUTPUT_FORMAT,
+            
+            "fused": RADCOT_FUSED_PROMPT,
             
             "final_prompt": """Based on your structured analysis using the RadCoT framework, 
                            provide a comprehensive list of all errors found in the report.
@@ -110,6 +282,8 @@ def load_prompts(use_radcot=True):
             
             "standard": """Please review the following radiology report and identify any errors present. 
                         List each error you find with a brief explanation.
+                        Return strict JSON only, in this format, or {{"errors": []}} if there are no errors:
+                        {{"errors": [{{"error_id": 1, "error_type": "<Typographical | Numerical | Omission/Insertion | Interpretation | Findings-Impression Discrepancy>", "text_span": "<verbatim quote from the report>", "description": "<one-sentence description>"}}]}}
                         
                         Report:
                         {report}"""
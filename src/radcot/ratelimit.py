@@ -0,0 +1,138 @@
+import asyncio
+import random
+import threading
+import time
+
+class TokenBucket:
+    """
+    Continuously refilling token bucket.
+    
+    ``capacity`` units are available per ``period`` seconds and refill
+    linearly, so short bursts up to the capacity are allowed while the
+    long-run rate never exceeds the limit.
+    """
+    
+    def __init__(self, capacity, period=60.0):
+        """
+        Initialize the bucket full.
+        
+        Args:
+            capacity (float): Units available per period
+            period (float): Refill period in seconds
+        """
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def refill(self, now):
+        """Add the units accrued since the last update."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount):
+        """Seconds until ``amount`` units are available (0 if available now)."""
+        # Requests larger than the bucket are admitted once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+class RateLimiter:
+    """
+    Budget requests and estimated tokens per minute across threads and tasks.
+    
+    Each call reserves one request and its estimated token count; callers wait
+    until both buckets can cover the reservation, so a batch job runs at the
+    quota without provoking 429 responses.
+    """
+    
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        """
+        Initialize the limiter.
+        
+        Args:
+            requests_per_minute (int): Request quota (None for unlimited)
+            tokens_per_minute (int): Token quota (None for unlimited)
+        """
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens=0):
+        """
+        Block until a request of ``tokens`` estimated tokens may be sent.
+        
+        Args:
+            tokens (int): Estimated prompt plus completion tokens
+        """
+        while True:
+            delay = self._reserve(tokens)
+            if delay == 0.0:
+                return
+            time.sleep(delay)
+    
+    async def acquire_async(self, tokens=0):
+        """
+        Wait without blocking the event loop until a request may be sent.
+        
+        Args:
+            tokens (int): Estimated prompt plus completion tokens
+        """
+        while True:
+            delay = self._reserve(tokens)
+            if delay == 0.0:
+                return
+            await asyncio.sleep(delay)
+    
+    def reconcile(self, reserved, used):
+        """
+        Settle a reservation against the tokens the request actually used.
+        
+        Reservations are upper bounds (the full completion allowance), so the
+        unused tokens go back into the bucket; a request that used more than
+        it reserved draws the difference, delaying later callers instead.
+        
+        Args:
+            reserved (int): Tokens reserved with ``acquire``
+            used (int): Tokens the response reported using
+        """
+        if self._tokens is None:
+            return
+        with self._lock:
+            bucket = self._tokens
+            bucket.refill(time.monotonic())
+            bucket.level = min(bucket.capacity, bucket.level + min(reserved, bucket.capacity) - used)
+    
+    def _reserve(self, tokens):
+        """Take the reservation if both buckets allow it, else return the wait time."""
+        with self._lock:
+            now = time.monotonic()
+            buckets = [(bucket, amount) for bucket, amount in ((self._requests, 1), (self._tokens, tokens))
+                       if bucket is not None]
+            for bucket, _ in buckets:
+                bucket.refill(now)
+            delay = max((bucket.wait_time(amount) for bucket, amount in buckets), default=0.0)
+            if delay > 0.0:
+                return delay
+            for bucket, amount in buckets:
+                bucket.level -= min(amount, bucket.capacity)
+            return 0.0
+
+def backoff_delay(attempt, base=0.5, cap=30.0, retry_after=None):
+    """
+    Delay before retry number ``attempt`` using full-jitter exponential backoff.
+    
+    Args:
+        attempt (int): Zero-based retry attempt
+        base (float): Delay scale in seconds
+        cap (float): Maximum delay in seconds
+        retry_after (float): Server-requested delay, used as a lower bound
+        
+    Returns:
+        float: Seconds to wait
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+
+from .models import load_model
+
+class _Entry:
+    """Registry slot for one loaded backend."""
+    
+    def __init__(self):
+        self.model = None
+        self.refcount = 0
+        self.last_used = time.monotonic()
+        # Serializes loading so concurrent acquirers of the same model load it once
+        self.load_lock = threading.Lock()
+
+class ModelRegistry:
+    """
+    Process-wide, reference-counted cache of loaded model backends.
+    
+    Every caller asking for the same model name and configuration receives the
+    same backend instance, so e.g. a standard-prompting and a RadCoT detector
+    side by side load the weights only once. Idle backends (no outstanding
+    references) stay loaded for reuse until unloaded explicitly or evicted to
+    fit the memory budget.
+    """
+    
+    def __init__(self, memory_budget=None):
+        """
+        Initialize the registry.
+        
+        Args:
+            memory_budget (int): Bytes of model memory to keep loaded; idle
+                backends are evicted least recently used first when exceeded
+                (None for unbounded)
+        """
+        self.memory_budget = memory_budget
+        self._entries = {}
+        # References still held on force-unloaded backends, released without error
+        self._unloaded = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, model_name, **config):
+        """
+        Get a shared backend, loading it on first use.
+        
+        Args:
+            model_name (str): Name of the model to load
+            **config: Backend configuration forwarded to ``load_model``
+            
+        Returns:
+            LLMInterface: Shared model interface; pair with ``release``
+        """
+        key = self._key(model_name, config)
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+        
+        with entry.load_lock:
+            if entry.model is None:
+                try:
+                    entry.model = load_model(model_name, **config)
+                except Exception:
+                    with self._lock:
+                        entry.refcount -= 1
+                        if entry.refcount == 0 and entry.model is None:
+                            self._entries.pop(key, None)
+                    raise
+            model = entry.model
+        
+        self._enforce_budget()
+        return model
+    
+    def release(self, model_name, **config):
+        """
+        Drop one reference to a shared backend.
+        
+        The backend stays loaded while idle unless the memory budget requires
+        evicting it.
+        
+        Args:
+            model_name (str): Name of the model
+            **config: Backend configuration used when acquiring it
+        """
+        key = self._key(model_name, config)
+        with self._lock:
+            if self._unloaded.get(key):
+                # A reference to a backend that was force-unloaded under its holder
+                self._unloaded[key] -= 1
+                if not self._unloaded[key]:
+                    del self._unloaded[key]
+                return
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                raise ValueError(f"Model {model_name} is not acquired")
+            entry.refcount -= 1
+            entry.last_used = time.monotonic()
+        self._enforce_budget()
+    
+    def unload(self, model_name, force=False, **config):
+        """
+        Unload a backend and free its memory.
+        
+        A forced unload leaves its holders with an unloaded backend: they must
+        not call ``generate`` on it again, but may still ``release`` it, and
+        the next ``acquire`` loads a fresh one.
+        
+        Args:
+            model_name (str): Name of the model
+            force (bool): Unload even if it is still referenced
+            **config: Backend configuration used when acquiring it
+            
+        Returns:
+            bool: True if the backend was unloaded
+        """
+        key = self._key(model_name, config)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.model is None:
+                return False
+            if entry.refcount > 0 and not force:
+                raise RuntimeError(f"Model {model_name} is still in use ({entry.refcount} references)")
+            del self._entries[key]
+            if entry.refcount > 0:
+                self._unloaded[key] = self._unloaded.get(key, 0) + entry.refcount
+        entry.model.unload()
+        return True
+    
+    def clear(self):
+        """Unload every idle backend."""
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry.refcount == 0]
+            entries = [self._entries.pop(key) for key in idle]
+        for entry in entries:
+            if entry.model is not None:
+                entry.model.unload()
+    
+    def loaded(self):
+        """
+        Describe the loaded backends.
+        
+        Returns:
+            dict: Reference count and memory footprint per model key
+        """
+        with self._lock:
+            return {
+                key: {"refcount": entry.refcount, "memory_bytes": entry.model.memory_footprint()}
+                for key, entry in self._entries.items()
+                if entry.model is not None
+            }
+    
+    def _enforce_budget(self):
+        """Evict idle backends, least recently used first, until within budget."""
+        if self.memory_budget is None:
+            return
+        
+        evicted = []
+        with self._lock:
+            loaded = [(key, entry) for key, entry in self._entries.items() if entry.model is not None]
+            total = sum(entry.model.memory_footprint() for _, entry in loaded)
+            idle = sorted(
+                (item for item in loaded if item[1].refcount == 0),
+                key=lambda item: item[1].last_used
+            )
+            for key, entry in idle:
+                if total <= self.memory_budget:
+                    break
+                total -= entry.model.memory_footprint()
+                evicted.append(self._entries.pop(key))
+        
+        for entry in evicted:
+            entry.model.unload()
+    
+    @staticmethod
+    def _key(model_name, config):
+        # Serialized, so unhashable values such as generation_kwargs dicts can be keyed
+        return (model_name.lower(), json.dumps(config, sort_keys=True, default=repr))
+
+# Registry shared by every RadCoT instance in the process
+shared_registry = ModelRegistry()
@@ -0,0 +1,242 @@
+import re
+
+from .spans import sentence_starts
+from .taxonomy import CATEGORIES
+from .utils import tokenize_sections
+
+# Sizes with an optional "x"-separated multi-dimension part, e.g. "2.5 cm", "3 x 2.1 mm"
+_SIZE_PATTERN = re.compile(
+    r"(?<![\w.])(?P<value>\d+(?:\.\d+)?)(?:\s*[x×]\s*\d+(?:\.\d+)?)*\s*(?P<unit>mm|cm|m)\b(?!\s*/)",
+    re.IGNORECASE
+)
+_UNIT_TO_MM = {"mm": 1.0, "cm": 10.0, "m": 1000.0}
+
+# Lesions larger than this are implausible in any report (millimetres)
+_MAX_PLAUSIBLE_SIZE_MM = 500.0
+
+# Sentences whose sizes measure a lesion or structure, where metres are implausible,
+# and body measurements (patient height, field of view), where they are not
+_SIZE_CONTEXT_PATTERN = re.compile(
+    r"\b(?:measur\w*|size[sd]?|diameter|span|length|thick(?:ness|ened)?|dimensions?)\b", re.IGNORECASE
+)
+_BODY_MEASUREMENT_PATTERN = re.compile(
+    r"\b(?:height|tall|stature|weigh(?:t|s|ing)|BMI|body\s+(?:length|habitus|surface)|field\s+of\s+view|"
+    r"FOV|distance)\b",
+    re.IGNORECASE
+)
+
+# Sided sites whose laterality can be compared between findings and impression
+_SITES = (
+    "upper lobe", "middle lobe", "lower lobe", "lung", "hemithorax", "hilum", "kidney",
+    "adrenal gland", "adrenal", "ureter", "ovary", "adnexa", "breast", "axilla", "thyroid lobe",
+    "hepatic lobe", "lobe of the liver", "parotid gland", "hip", "knee", "shoulder", "femur"
+)
+_LATERALITY_PATTERN = re.compile(
+    r"\b(?P<side>right|left)\s+(?P<site>"
+    + "|".join(re.escape(site).replace(r"\ ", r"\s+") for site in sorted(_SITES, key=len, reverse=True))
+    + r")\b",
+    re.IGNORECASE
+)
+
+_NORMAL_IMPRESSION_PATTERN = re.compile(
+    r"^(?:\d{1,2}[.)]\s*)?(?:normal|unremarkable|negative)\b", re.IGNORECASE
+)
+_POSITIVE_FINDING_PATTERN = re.compile(
+    r"\b(?:lesions?|mass(?:es)?|nodul(?:e|es|ar)|opacit(?:y|ies)|fractures?|effusions?|pneumothorax|"
+    r"consolidation|hemorrhage|haemorrhage|stenosis|aneurysm|dissection|cysts?|tumou?rs?|thrombus|"
+    r"obstruction|lymphadenopathy|hydronephrosis|abscess)\b",
+    re.IGNORECASE
+)
+_NEGATION_PATTERN = re.compile(r"\b(?:no|not|without|negative for|free of|resolved)\b", re.IGNORECASE)
+_LIST_MARKER_PATTERN = re.compile(r"^\s*\d{1,2}[.)]\s+")
+
+class _Mention:
+    """One sentence of a section with its sizes (in millimetres) and sided sites."""
+    
+    __slots__ = ("start", "end", "text", "sizes", "sites")
+    
+    def __init__(self, report, start, end):
+        self.text = report[start:end].strip()
+        self.start = start + (len(report[start:end]) - len(report[start:end].lstrip()))
+        self.end = self.start + len(self.text)
+        self.sizes = [
+            float(match.group("value")) * _UNIT_TO_MM[match.group("unit").lower()]
+            for match in _SIZE_PATTERN.finditer(self.text)
+        ]
+        self.sites = {
+            (match.group("side").lower(), " ".join(match.group("site").lower().split()))
+            for match in _LATERALITY_PATTERN.finditer(self.text)
+        }
+
+class RuleChecker:
+    """
+    Deterministic pre-screen for errors that need no language model.
+    
+    The checks cover implausible measurement units, laterality flips and size
+    mismatches between findings and impression, and a normal impression
+    despite positive findings. Hits use the output schema's error fields and
+    are tagged ``source="rules"`` with the ``rule`` that fired.
+    """
+    
+    def __init__(self, rules=None, coverage=None):
+        """
+        Initialize the checker.
+        
+        Args:
+            rules (list): Names of the rules to run (defaults to all of ``RULES``)
+            coverage (dict): Rule names by step number (1-6) that together
+                perform every check of that step (defaults to ``STEP_COVERAGE``)
+        """
+        self.rules = list(RULES) if rules is None else list(rules)
+        self.coverage = dict(STEP_COVERAGE if coverage is None else coverage)
+        unknown = set(self.rules).union(*self.coverage.values()) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown rules: {sorted(unknown)}")
+    
+    def covered_steps(self):
+        """
+        Steps whose checks the rules run by this checker fully cover.
+        
+        Returns:
+            list: Step numbers (1-6) a model need not run
+        """
+        return sorted(step for step, rules in self.coverage.items() if set(rules) <= set(self.rules))
+    
+    def check(self, report):
+        """
+        Run the rules on a report.
+        
+        Args:
+            report (str): Full text of the radiology report
+            
+        Returns:
+            list: Structured errors, in report order
+        """
+        facts = _ReportFacts(report)
+        errors = []
+        for name in self.rules:
+            for error in RULES[name](facts):
+                error.update({"confidence": 1.0, "uncertain": False, "source": "rules", "rule": name})
+                errors.append(error)
+        return sorted(errors, key=lambda error: error["span_start"])
+
+class _ReportFacts:
+    """Sections and per-sentence mentions of a report, parsed once for all rules."""
+    
+    def __init__(self, report):
+        self.report = report
+        self.sections = {}
+        for section in tokenize_sections(report):
+            self.sections.setdefault(section["name"], section)
+        self.findings = self._mentions("findings")
+        self.impression = self._mentions("impression")
+    
+    def _mentions(self, name):
+        section = self.sections.get(name)
+        if section is None:
+            return []
+        start, end = section["content_start"], section["end"]
+        offsets = [start + offset for offset in sentence_starts(self.report[start:end])] + [end]
+        mentions = [_Mention(self.report, a, b) for a, b in zip(offsets, offsets[1:])]
+        return [mention for mention in mentions if mention.text]
+
+def _error(error_type, mention, section, step, severity, explanation, span=None):
+    """Build a structured error quoting ``span`` (default: the mention's sentence)."""
+    text = mention.text if span is None else span
+    # Impression items are quoted without their list marker
+    marker = _LIST_MARKER_PATTERN.match(text)
+    if marker and span is None:
+        text = text[marker.end():]
+    offset = mention.start + mention.text.find(text)
+    return {
+        "error_type": CATEGORIES[error_type],
+        "text_span": text,
+        "section": section,
+        "originating_step": step,
+        "severity": severity,
+        "explanation": explanation,
+        "span_start": offset,
+        "span_end": offset + len(text)
+    }
+
+def _implausible_units(facts):
+    """Lesion or structure sizes in metres, or larger than any lesion could be."""
+    errors = []
+    for section, mentions in (("Findings", facts.findings), ("Impression", facts.impression)):
+        for mention in mentions:
+            if _BODY_MEASUREMENT_PATTERN.search(mention.text) or not (
+                    _POSITIVE_FINDING_PATTERN.search(mention.text) or _SIZE_CONTEXT_PATTERN.search(mention.text)):
+                continue
+            for match in _SIZE_PATTERN.finditer(mention.text):
+                size = float(match.group("value")) * _UNIT_TO_MM[match.group("unit").lower()]
+                if match.group("unit").lower() == "m" or size > _MAX_PLAUSIBLE_SIZE_MM:
+                    errors.append(_error(
+                        "T2_Numerical", mention, section, 2, "moderate",
+                        f"A size of {match.group().strip()} is anatomically implausible; "
+                        "the unit is likely wrong.",
+                        span=match.group().strip()
+                    ))
+    return errors
+
+def _laterality_flips(facts):
+    """Impression sites whose size matches a findings site of the opposite side only."""
+    errors = []
+    for mention in facts.impression:
+        for side, site in mention.sites:
+            if not mention.sizes or any((side, site) in other.sites for other in facts.findings):
+                continue
+            opposite = "left" if side == "right" else "right"
+            if any((opposite, site) in other.sites and set(mention.sizes) & set(other.sizes)
+                   for other in facts.findings):
+                errors.append(_error(
+                    "T5_FindingsImpressionDiscrepancy", mention, "Impression", 1, "major",
+                    f"The impression places this finding in the {side} {site}, "
+                    f"but the findings describe it in the {opposite} {site}."
+                ))
+    return errors
+
+def _size_mismatches(facts):
+    """The single lesion at a site measured differently in findings and impression."""
+    errors = []
+    for mention in facts.impression:
+        if len(mention.sizes) != 1 or len(mention.sites) != 1:
+            continue
+        (site,) = mention.sites
+        described = [other for other in facts.findings if site in other.sites and other.sizes]
+        if len(described) != 1 or len(described[0].sizes) != 1:
+            continue
+        if abs(described[0].sizes[0] - mention.sizes[0]) > 1e-6:
+            errors.append(_error(
+                "T2_Numerical", mention, "Impression", 2, "moderate",
+                f"The impression measures the {' '.join(site)} finding differently from the findings."
+            ))
+    return errors
+
+def _normal_impression_with_findings(facts):
+    """An impression calling the study normal while the findings describe pathology."""
+    if not facts.impression or not _NORMAL_IMPRESSION_PATTERN.match(facts.impression[0].text):
+        return []
+    
+    for mention in facts.findings:
+        for match in _POSITIVE_FINDING_PATTERN.finditer(mention.text):
+            if not _NEGATION_PATTERN.search(mention.text, 0, match.start()):
+                return [_error(
+                    "T5_FindingsImpressionDiscrepancy", facts.impression[0], "Impression", 4, "major",
+                    f"The impression states a normal study, but the findings describe "
+                    f"\"{mention.text}\"."
+                )]
+    return []
+
+# Rules by name, in the order they run
+RULES = {
+    "implausible_unit": _implausible_units,
+    "laterality_flip": _laterality_flips,
+    "size_mismatch": _size_mismatches,
+    "normal_impression": _normal_impression_with_findings
+}
+
+# Rule names by step number (1-6) for steps whose every check the rules perform,
+# which the "skip" pre-screen may leave out. Each built-in rule is only one of its
+# step's checks (laterality_flip does not validate the rest of the anatomy in
+# step 1), so by default no step is skipped and steps with hits are only narrowed.
+STEP_COVERAGE = {}
@@ -0,0 +1,323 @@
+import json
+import os
+
+# Results made durable (flushed, fsynced and checkpointed) at a time
+CHECKPOINT_EVERY = 100
+
+def shard_path(output_path, shard, num_shards):
+    """
+    Results file of one shard.
+    
+    Args:
+        output_path (str): Results file of the whole run
+        shard (int): Shard index
+        num_shards (int): Number of shards
+        
+    Returns:
+        str: ``output_path`` itself for an unsharded run, else e.g.
+            ``results.shard-03-of-16.jsonl``
+    """
+    if num_shards == 1:
+        return output_path
+    root, extension = os.path.splitext(output_path)
+    width = len(str(num_shards - 1))
+    return f"{root}.shard-{shard:0{width}d}-of-{num_shards}{extension or '.jsonl'}"
+
+def read_records(input_path, shard=0, num_shards=1, skip=(), on_error=None):
+    """
+    Stream the input-contract records of one shard from a JSONL file.
+    
+    Records are assigned to shards by line number, so the assignment is
+    static and the same on every run. A record without REPORT_ID is
+    identified by its line number.
+    
+    Args:
+        input_path (str): JSONL file of records (REPORT_TEXT, MODALITY,
+            BODY_REGION, INDICATION, PRIOR_STUDIES) or of report strings
+        shard (int): Shard index
+        num_shards (int): Number of shards
+        skip (set): Report IDs not to yield, e.g. those already processed
+        on_error (callable): Called with a ``status="error"`` result for each
+            malformed line, which is then skipped (by default a ValueError
+            is raised)
+            
+    Yields:
+        dict: Record with REPORT_ID and REPORT_TEXT
+    """
+    with open(input_path, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if index % num_shards != shard or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record, problem = None, f"invalid JSON ({e})"
+            else:
+                if isinstance(record, str):
+                    record = {"REPORT_TEXT": record}
+                problem = None if isinstance(record, dict) and isinstance(record.get("REPORT_TEXT"), str) \
+                    else "record is missing REPORT_TEXT"
+            
+            report_id = record.get("REPORT_ID", record.get("report_id", index)) if isinstance(record, dict) else index
+            if report_id in skip:
+                continue
+            if problem is not None:
+                if on_error is None:
+                    raise ValueError(f"{input_path}:{index + 1}: {problem}")
+                on_error({"report_id": report_id, "status": "error", "error": f"line {index + 1}: {problem}"})
+                continue
+            record["REPORT_ID"] = report_id
+            yield record
+
+class _Checkpoint:
+    """
+    Append-only results file with a checkpoint of its durable length.
+    
+    Results are appended as JSON lines; every ``every`` results the file is
+    fsynced and its length written atomically to ``<results>.checkpoint``.
+    On resume the file is truncated back to the checkpointed length, which
+    drops any torn last line, and the reports whose results survive are
+    skipped. Reports that failed are retried.
+    """
+    
+    def __init__(self, path, shard, num_shards, every=CHECKPOINT_EVERY):
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.shard = shard
+        self.num_shards = num_shards
+        self.every = every
+        self.state = {"shard": shard, "num_shards": num_shards, "offset": 0, "completed": 0, "errors": 0}
+        self.done = set()
+        self._pending = 0
+        self._file = None
+    
+    def open(self):
+        """Recover the durable results and open the file for appending."""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if (state["shard"], state["num_shards"]) != (self.shard, self.num_shards):
+                raise ValueError(
+                    f"{self.path} was written as shard {state['shard']} of {state['num_shards']}, "
+                    f"not {self.shard} of {self.num_shards}"
+                )
+            self.state = state
+        elif os.path.exists(self.path):
+            # Not written by a runner, or by one that never started: do not truncate it
+            raise ValueError(f"{self.path} exists but has no checkpoint; remove it or choose another output")
+        
+        self._file = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+        # A compacted file can be shorter than the checkpoint written before it
+        self._file.truncate(min(self.state["offset"], os.fstat(self._file.fileno()).st_size))
+        self._file.seek(0)
+        for line in self._file:
+            result = json.loads(line)
+            if result.get("status") == "ok":
+                self.done.add(result["report_id"])
+        self._file.seek(0, os.SEEK_END)
+        self.commit()
+        return self
+    
+    def append(self, result):
+        """Append one result, checkpointing every ``every`` results."""
+        self._file.write((json.dumps(result, default=str) + "\n").encode("utf-8"))
+        self.state["completed"] += result.get("status") == "ok"
+        self.state["errors"] += result.get("status") != "ok"
+        self._pending += 1
+        if self._pending >= self.every:
+            self.commit()
+    
+    def commit(self):
+        """Make the appended results durable and record the file's new length."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.state["offset"] = self._file.tell()
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+        self._pending = 0
+    
+    def compact(self):
+        """
+        Rewrite the results file keeping only the last result of each report.
+        
+        Retried reports leave their earlier failures behind in the file; the
+        compacted file is written beside it and swapped in atomically.
+        """
+        self.commit()
+        self._file.seek(0)
+        last = {}
+        lines = 0
+        for line in self._file:
+            last[json.loads(line)["report_id"]] = lines
+            lines += 1
+        if len(last) == lines:
+            return
+        
+        keep = set(last.values())
+        self.state["completed"] = self.state["errors"] = 0
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            self._file.seek(0)
+            for number, line in enumerate(self._file):
+                if number in keep:
+                    f.write(line)
+                    ok = json.loads(line).get("status") == "ok"
+                    self.state["completed"] += ok
+                    self.state["errors"] += not ok
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, "r+b")
+        self._file.seek(0, os.SEEK_END)
+        self.commit()
+    
+    def close(self):
+        """Checkpoint the remaining results and close the file."""
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
+
+def run_shard(input_path, output_path, shard=0, num_shards=1, detector_options=None,
+              max_in_flight=8, checkpoint_every=CHECKPOINT_EVERY):
+    """
+    Process one shard of a JSONL corpus, resuming where an earlier run stopped.
+    
+    Args:
+        input_path (str): JSONL file of input-contract records
+        output_path (str): Results file of the whole run; the shard writes
+            to ``shard_path(output_path, shard, num_shards)``
+        shard (int): Shard index
+        num_shards (int): Number of shards
+        detector_options (dict): ``RadCoT`` keyword arguments, including ``model_name``
+        max_in_flight (int): Reports processed concurrently
+        checkpoint_every (int): Results appended between checkpoints
+        
+    Returns:
+        dict: The shard's results file and its counts of completed reports,
+            failed reports, and reports already done by earlier runs
+    """
+    from .framework import RadCoT
+    
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Shard {shard} is out of range for {num_shards} shards")
+    
+    path = shard_path(output_path, shard, num_shards)
+    checkpoint = _Checkpoint(path, shard, num_shards, every=checkpoint_every).open()
+    resumed = len(checkpoint.done)
+    completed, errors = checkpoint.state["completed"], checkpoint.state["errors"]
+    try:
+        with RadCoT(**(detector_options or {})) as detector:
+            records = read_records(input_path, shard, num_shards, skip=checkpoint.done, on_error=checkpoint.append)
+            for result in detector.detect_errors_batch(records, max_in_flight=max_in_flight):
+                checkpoint.append(result)
+        summary = {
+            "path": path,
+            "completed": checkpoint.state["completed"] - completed,
+            "errors": checkpoint.state["errors"] - errors,
+            "resumed": resumed
+        }
+        if num_shards == 1:
+            # No merge follows an unsharded run: drop the failures of retried reports here
+            checkpoint.compact()
+    finally:
+        checkpoint.close()
+    return summary
+
+def run_sharded(input_path, output_path, num_shards, detector_options=None, workers=None,
+                max_in_flight=8, checkpoint_every=CHECKPOINT_EVERY, merge=True):
+    """
+    Process a JSONL corpus in static shards across worker processes.
+    
+    Each worker process runs whole shards with its own ``RadCoT`` instance;
+    workers are started with "spawn" so model backends initialize cleanly.
+    Rerunning after an interruption resumes every shard.
+    
+    Args:
+        input_path (str): JSONL file of input-contract records
+        output_path (str): Merged results file
+        num_shards (int): Number of shards
+        detector_options (dict): ``RadCoT`` keyword arguments, including ``model_name``
+        workers (int): Worker processes (defaults to one per shard)
+        max_in_flight (int): Reports processed concurrently per worker
+        checkpoint_every (int): Results appended between checkpoints
+        merge (bool): Whether to merge the shard results into ``output_path``
+        
+    Returns:
+        dict: Per-shard counts and, when merged, the merge counts
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers or num_shards, mp_context=context) as executor:
+        futures = [
+            executor.submit(run_shard, input_path, output_path, shard, num_shards, detector_options,
+                            max_in_flight, checkpoint_every)
+            for shard in range(num_shards)
+        ]
+        shards = [future.result() for future in futures]
+    
+    summary = {"shards": shards}
+    if merge:
+        summary["merged"] = merge_results([shard["path"] for shard in shards], output_path)
+    return summary
+
+def merge_results(paths, output_path):
+    """
+    Merge shard results files into one, one result per report.
+    
+    A report that failed and was retried keeps its successful result; one
+    that only failed keeps its first failure. Results stay in shard order.
+    
+    Args:
+        paths (list): Shard results files
+        output_path (str): Merged results file (written atomically)
+        
+    Returns:
+        dict: Counts of reports merged and of those that failed
+    """
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise ValueError(f"Shard results not found: {', '.join(missing)}; run those shards first")
+    
+    succeeded = set()
+    for result in _read_results(paths):
+        if result.get("status") == "ok":
+            succeeded.add(result["report_id"])
+    
+    written = set()
+    counts = {"reports": 0, "errors": 0}
+    temporary = f"{output_path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        for result in _read_results(paths):
+            report_id = result["report_id"]
+            if report_id in written or (result.get("status") != "ok" and report_id in succeeded):
+                continue
+            written.add(report_id)
+            counts["reports"] += 1
+            counts["errors"] += result.get("status") != "ok"
+            f.write(json.dumps(result, default=str) + "\n")
+    os.replace(temporary, output_path)
+    return counts
+
+def _read_results(paths):
+    """Results checkpointed in each file, ignoring anything past its checkpoint."""
+    for path in paths:
+        offset = None
+        if os.path.exists(f"{path}.checkpoint"):
+            with open(f"{path}.checkpoint", encoding="utf-8") as f:
+                offset = json.load(f)["offset"]
+        with open(path, "rb") as f:
+            position = 0
+            for line in f:
+                position += len(line)
+                if offset is not None and position > offset:
+                    break
+                if line.strip():
+                    yield json.loads(line)
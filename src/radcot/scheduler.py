@@ -0,0 +1,149 @@
+import re
+
+from .utils import extract_measurements, tokenize_sections
+
+# Modality spellings mapped to the input contract's MODALITY enum
+_MODALITY_ALIASES = {
+    "radiography": "Radiography", "radiograph": "Radiography", "x-ray": "Radiography",
+    "xray": "Radiography", "xr": "Radiography", "cr": "Radiography", "dx": "Radiography",
+    "plain film": "Radiography",
+    "ultrasound": "Ultrasound", "sonography": "Ultrasound", "us": "Ultrasound",
+    "ct": "CT", "computed tomography": "CT",
+    "mri": "MRI", "mr": "MRI", "magnetic resonance": "MRI"
+}
+_MODALITY_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(alias) for alias in sorted(_MODALITY_ALIASES, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+_MULTI_VIEW_PATTERN = re.compile(
+    r"\b(?:(?:pa|ap)\s+and\s+lateral|(?:two|three|four|[2-4])\s+views|multiple\s+views|oblique)\b",
+    re.IGNORECASE
+)
+_DIGIT_PATTERN = re.compile(r"\d")
+
+def normalize_modality(label):
+    """
+    Map a modality label to the input contract's MODALITY enum.
+    
+    Args:
+        label (str): Modality as written, e.g. "XR", "CT chest", "MR brain"
+        
+    Returns:
+        str: "Radiography", "Ultrasound", "CT" or "MRI", or None if unrecognized
+    """
+    if not isinstance(label, str):
+        return None
+    match = _MODALITY_PATTERN.search(label)
+    return _MODALITY_ALIASES[match.group().lower()] if match else None
+
+def _single_view_radiograph(features):
+    if features["modality"] == "Radiography" and not features["multi_view"]:
+        return "single-view radiograph has no planes or sequences to correlate"
+    return None
+
+def _no_impression(features):
+    if "impression" not in features["sections"]:
+        return "report has no IMPRESSION section to align with the findings"
+    if "findings" not in features["sections"]:
+        return "report has no FINDINGS section to align with the impression"
+    return None
+
+def _no_numbers(features):
+    if not features["has_numbers"]:
+        return "report contains no measurements or other numbers"
+    return None
+
+# Default policy: (step prompt key, predicate) pairs; a predicate returns the
+# reason to skip the step for a report, or None to run it
+DEFAULT_POLICY = [
+    ("cross_sectional", _single_view_radiograph),
+    ("findings_impression", _no_impression),
+    ("measurement_consistency", _no_numbers)
+]
+
+class StepScheduler:
+    """
+    Decide per report which RadCoT steps to run.
+    
+    The decision uses the input contract metadata (MODALITY, BODY_REGION) and
+    cheap report features: the sections present, the number of measurements,
+    whether the report contains numbers at all, and its length.
+    """
+    
+    def __init__(self, policy=None, fuse_below=None):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            policy (list): (step key, predicate) pairs; each predicate takes
+                the feature dict and returns a skip reason or None (defaults
+                to ``DEFAULT_POLICY``)
+            fuse_below (int): Reports shorter than this many characters run
+                all their steps in one fused call instead (None never fuses)
+        """
+        from .framework import RADCOT_STEPS
+        
+        self.policy = list(DEFAULT_POLICY if policy is None else policy)
+        self.fuse_below = fuse_below
+        self._step_index = {key: index for index, key in enumerate(RADCOT_STEPS)}
+        unknown = {key for key, _ in self.policy} - set(self._step_index)
+        if unknown:
+            raise ValueError(f"Unknown steps in policy: {sorted(unknown)}")
+    
+    def features(self, report, metadata=None):
+        """
+        Extract the scheduling features of a report.
+        
+        Args:
+            report (str): Full text of the radiology report
+            metadata (dict): Input contract fields (MODALITY, BODY_REGION, ...)
+            
+        Returns:
+            dict: ``modality``, ``body_region``, ``sections``,
+                ``measurement_count``, ``has_numbers``, ``multi_view`` and ``length``
+        """
+        metadata = metadata or {}
+        sections = tokenize_sections(report)
+        names = {section["name"] for section in sections}
+        
+        modality = normalize_modality(metadata.get("MODALITY"))
+        examination = next((section for section in sections if section["name"] == "examination"), None)
+        if modality is None and examination is not None:
+            # Fall back to the modality named in the EXAMINATION header
+            modality = normalize_modality(report[examination["content_start"]:examination["end"]])
+        
+        return {
+            "modality": modality,
+            "body_region": metadata.get("BODY_REGION"),
+            "sections": names,
+            "measurement_count": len(extract_measurements(report)),
+            "has_numbers": _DIGIT_PATTERN.search(report) is not None,
+            "multi_view": _MULTI_VIEW_PATTERN.search(report) is not None,
+            "length": len(report)
+        }
+    
+    def plan(self, report, metadata=None):
+        """
+        Plan the steps of one report.
+        
+        Args:
+            report (str): Full text of the radiology report
+            metadata (dict): Input contract fields (MODALITY, BODY_REGION, ...)
+            
+        Returns:
+            dict: ``skip`` maps step indices (0-based) to the reason for
+                skipping them; ``fuse`` is True when the remaining steps
+                should run as one fused call
+        """
+        features = self.features(report, metadata)
+        skip = {}
+        for key, predicate in self.policy:
+            index = self._step_index[key]
+            if index in skip:
+                continue
+            reason = predicate(features)
+            if reason:
+                skip[index] = reason
+        
+        fuse = self.fuse_below is not None and features["length"] < self.fuse_below
+        return {"skip": skip, "fuse": fuse}
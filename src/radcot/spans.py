@@ -0,0 +1,288 @@
+import bisect
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+from .taxonomy import CATEGORY_KEYS, normalize_category
+
+# Candidate sentence boundaries: terminal punctuation or a line break, then any
+# whitespace; a single leading character class keeps the scan fast
+_BOUNDARY_PATTERN = re.compile(r"[.!?\n][.!?\"')\]]*(\s*)(?=\S)")
+# A bare list marker ("1." / "2)") at the start of a line does not end a sentence
+_LIST_MARKER_PATTERN = re.compile(r"[ \t]*\d{1,2}[.)]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_CATEGORY_CODES = {key: code for code, key in enumerate(CATEGORY_KEYS)}
+
+def sentence_starts(text):
+    """
+    Segment a report into sentences.
+    
+    Sentences end at terminal punctuation followed by whitespace or at line
+    breaks, so section headers and numbered impression items each form their
+    own sentence. Decimal points and list markers are not boundaries.
+    
+    Args:
+        text (str): Report text
+        
+    Returns:
+        list: Character offset at which each sentence starts
+    """
+    first = len(text) - len(text.lstrip())
+    starts = [first] if first < len(text) else []
+    for boundary in _BOUNDARY_PATTERN.finditer(text):
+        start = boundary.start()
+        if text[start] != "\n":
+            # Punctuation must be followed by whitespace ("2.5" is not a boundary)
+            if boundary.end(1) == boundary.start(1):
+                continue
+            # ... and must not be a list marker such as "1. "
+            line_start = text.rfind("\n", 0, start) + 1
+            if _LIST_MARKER_PATTERN.fullmatch(text, line_start, start + 1):
+                continue
+        starts.append(boundary.end())
+    return starts
+
+class SentenceIndex:
+    """Sentence offsets of one report with interval lookup for spans."""
+    
+    def __init__(self, text):
+        """
+        Segment the report once.
+        
+        Args:
+            text (str): Report text
+        """
+        self.text = text
+        self.starts = sentence_starts(text)
+        self._folded = None
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def sentence_of(self, offset):
+        """
+        Resolve one character offset to its sentence ID.
+        
+        Args:
+            offset (int): Character offset into the report (-1 for unresolved)
+            
+        Returns:
+            int: Sentence ID (-1 for unresolved)
+        """
+        if offset < 0:
+            return -1
+        return max(bisect.bisect_right(self.starts, offset) - 1, 0)
+    
+    def sentence_at(self, offsets):
+        """
+        Resolve character offsets to sentence IDs.
+        
+        Args:
+            offsets (array-like): Character offsets into the report (-1 for unresolved)
+            
+        Returns:
+            numpy.ndarray: Sentence ID per offset (-1 for unresolved)
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        sentences = np.searchsorted(np.asarray(self.starts, dtype=np.int64), offsets, side="right") - 1
+        return np.where(offsets < 0, -1, np.maximum(sentences, 0))
+    
+    def locate(self, span):
+        """
+        Find where a quoted span occurs in the report.
+        
+        Tries an exact substring search first, then a case-insensitive one,
+        then a match that tolerates differences in whitespace.
+        
+        Args:
+            span (str): Quoted text span
+            
+        Returns:
+            int: Character offset of the span, or -1 if it does not occur
+        """
+        if not isinstance(span, str) or not span.strip():
+            return -1
+        span = span.strip()
+        
+        offset = self.text.find(span)
+        if offset >= 0:
+            return offset
+        
+        if self._folded is None:
+            self._folded = self.text.casefold()
+        folded = span.casefold()
+        if len(folded) == len(span):
+            offset = self._folded.find(folded)
+            if offset >= 0:
+                return offset
+        
+        words = _WHITESPACE_PATTERN.split(span)
+        pattern = r"\s+".join(re.escape(word) for word in words)
+        match = re.search(pattern, self.text, re.IGNORECASE)
+        return match.start() if match else -1
+
+class SpanMatcher:
+    """
+    Sentence-level prediction-to-reference matching (``evaluation_alignment``).
+    
+    A predicted error is a true positive when its text span localizes to the
+    same sentence as a reference span, or one within ``window`` sentences, and
+    its category matches the reference after taxonomy normalization.
+    Unrecognized categories and spans that do not occur in the report can
+    never match, so such predictions count as false positives.
+    """
+    
+    def __init__(self, window=1, max_indexes=4096):
+        """
+        Initialize the matcher.
+        
+        Args:
+            window (int): Maximum sentence distance between matched spans
+            max_indexes (int): Sentence indexes kept for reuse, least
+                recently used dropped first
+        """
+        self.window = window
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()
+    
+    def sentence_index(self, report_id, text):
+        """
+        Get the sentence index of a report, segmenting it only once.
+        
+        Args:
+            report_id: Report identifier
+            text (str): Report text
+            
+        Returns:
+            SentenceIndex: Sentence index of the report
+        """
+        index = self._indexes.get(report_id)
+        if index is None or index.text is not text and index.text != text:
+            index = SentenceIndex(text)
+            self._indexes[report_id] = index
+            if len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(report_id)
+        return index
+    
+    def resolve(self, errors_by_report, reports):
+        """
+        Resolve errors to (report, category, sentence) codes.
+        
+        Args:
+            errors_by_report (dict): Errors by report ID, each with a
+                ``text_span`` (or ``location``) and ``error_type`` (or ``type``)
+            reports (dict): Report text by report ID
+            
+        Returns:
+            dict: Parallel arrays ``report_id``, ``report`` (code),
+                ``category`` (code, -1 if unrecognized) and ``sentence``
+                (-1 if the span does not occur in the report)
+        """
+        report_ids, report_codes, categories, sentences = [], [], [], []
+        codes = {report_id: code for code, report_id in enumerate(reports)}
+        
+        for report_id, errors in errors_by_report.items():
+            if report_id not in codes or not errors:
+                for _ in errors or ():
+                    report_ids.append(report_id)
+                    report_codes.append(-1)
+                    categories.append(-1)
+                    sentences.append(-1)
+                continue
+            
+            index = self.sentence_index(report_id, reports[report_id])
+            for error in errors:
+                category = normalize_category(error.get("error_type", error.get("type")))
+                offset = index.locate(error.get("text_span", error.get("location")))
+                categories.append(_CATEGORY_CODES.get(category, -1))
+                sentences.append(index.sentence_of(offset))
+                report_ids.append(report_id)
+                report_codes.append(codes[report_id])
+        
+        return {
+            "report_id": report_ids,
+            "report": np.asarray(report_codes, dtype=np.int64),
+            "category": np.asarray(categories, dtype=np.int64),
+            "sentence": np.asarray(sentences, dtype=np.int64)
+        }
+    
+    def match(self, predictions, ground_truth, reports):
+        """
+        Match predicted errors to reference errors across a corpus.
+        
+        Assignment is one-to-one and proceeds in passes of increasing sentence
+        distance (same sentence first), each pass fully vectorized.
+        
+        Args:
+            predictions (dict): Predicted errors by report ID
+            ground_truth (dict): Reference errors by report ID
+            reports (dict): Report text by report ID
+            
+        Returns:
+            dict: Resolved ``predictions`` and ``references`` (see ``resolve``),
+                each with a boolean ``matched`` array
+        """
+        preds = self.resolve(predictions, reports)
+        refs = self.resolve(ground_truth, reports)
+        
+        stride = max(
+            int(preds["sentence"].max(initial=0)),
+            int(refs["sentence"].max(initial=0))
+        ) + 2 * self.window + 1
+        pred_keys = self._keys(preds, stride)
+        ref_keys = self._keys(refs, stride)
+        
+        ref_matched = np.zeros(len(ref_keys), dtype=bool)
+        pred_valid = np.flatnonzero(pred_keys >= 0)
+        unique_keys, inverse, counts = np.unique(pred_keys[pred_valid], return_inverse=True, return_counts=True)
+        remaining = counts.copy()
+        
+        for distance in self._distances():
+            candidates = np.flatnonzero(~ref_matched & (ref_keys >= 0))
+            if len(candidates) == 0 or len(unique_keys) == 0:
+                break
+            targets = ref_keys[candidates] + distance
+            slots = np.minimum(np.searchsorted(unique_keys, targets), len(unique_keys) - 1)
+            found = unique_keys[slots] == targets
+            candidates, slots = candidates[found], slots[found]
+            
+            # Rank references competing for the same predictions; only as many
+            # as there are predictions left under that key can match
+            order = np.argsort(slots, kind="stable")
+            candidates, slots = candidates[order], slots[order]
+            group_starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+            ranks = np.arange(len(slots)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(slots)]))
+            accepted = ranks < remaining[slots]
+            
+            ref_matched[candidates[accepted]] = True
+            remaining -= np.bincount(slots[accepted], minlength=len(remaining))
+        
+        # Within each key, the first (counts - remaining) predictions are the matched ones
+        pred_matched = np.zeros(len(pred_keys), dtype=bool)
+        if len(pred_valid):
+            order = np.argsort(inverse, kind="stable")
+            grouped = inverse[order]
+            group_starts = np.r_[0, np.cumsum(counts)[:-1]]
+            ranks = np.arange(len(grouped)) - group_starts[grouped]
+            pred_matched[pred_valid[order]] = ranks < (counts - remaining)[grouped]
+        
+        preds["matched"] = pred_matched
+        refs["matched"] = ref_matched
+        return {"predictions": preds, "references": refs}
+    
+    def _keys(self, resolved, stride):
+        """Encode (report, category, sentence) as one integer, -1 if unresolvable."""
+        valid = (resolved["report"] >= 0) & (resolved["category"] >= 0) & (resolved["sentence"] >= 0)
+        keys = ((resolved["report"] * len(CATEGORY_KEYS) + resolved["category"]) * stride
+                + resolved["sentence"] + self.window)
+        return np.where(valid, keys, -1)
+    
+    def _distances(self):
+        """Sentence offsets tried in order: 0, -1, +1, -2, +2, ..."""
+        distances = [0]
+        for step in range(1, self.window + 1):
+            distances.extend([-step, step])
+        return distances
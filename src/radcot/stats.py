@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Upper bound on elements drawn per resampling chunk, to keep memory flat
+_CHUNK_ELEMENTS = 1 << 22
+
+# Per-worker copy of the count matrices, set once by the pool initializer
+_worker_arrays = None
+
+def per_report_counts(table, report_ids=None):
+    """
+    Collapse a match table to true/false positive and false negative counts per report.
+    
+    Args:
+        table (pandas.DataFrame): Table from ``RadCoTEvaluator.build_table``
+        report_ids (list): Reports to include, in order; reports without any
+            errors get zero counts (defaults to the reports in the table)
+            
+    Returns:
+        tuple: Report IDs, and an (n_reports, 3) integer array of TP, FP, FN
+    """
+    reference = (table["source"] == "reference").to_numpy()
+    matched = table["matched"].to_numpy()
+    counts = table[["report_id"]].assign(
+        true_positives=reference & matched,
+        false_positives=~reference & ~matched,
+        false_negatives=reference & ~matched
+    ).groupby("report_id", dropna=False, sort=False).sum()
+    
+    if report_ids is not None:
+        counts = counts.reindex(list(report_ids), fill_value=0)
+    return list(counts.index), counts.to_numpy(dtype=np.int64)
+
+def metrics_from_counts(totals):
+    """
+    Precision, recall and F1 from summed counts, vectorized over leading axes.
+    
+    Args:
+        totals (numpy.ndarray): Array whose last axis holds TP, FP, FN
+        
+    Returns:
+        dict: Arrays of ``precision``, ``recall`` and ``f1`` (0.0 when undefined)
+    """
+    totals = np.asarray(totals, dtype=float)
+    tp, fp, fn = totals[..., 0], totals[..., 1], totals[..., 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+def bootstrap_ci(counts, n_resamples=10000, confidence=0.95, seed=None, n_jobs=1):
+    """
+    Report-level cluster bootstrap confidence intervals for precision, recall and F1.
+    
+    Reports, not individual errors, are resampled with replacement, since
+    errors within one report are not independent. Each resample only sums
+    the precomputed per-report counts, so no matching is repeated.
+    
+    Args:
+        counts (numpy.ndarray): (n_reports, 3) TP, FP, FN per report
+            (see ``per_report_counts``)
+        n_resamples (int): Number of bootstrap resamples
+        confidence (float): Confidence level of the percentile intervals
+        seed (int): Random seed; results are identical for any ``n_jobs``
+        n_jobs (int): Worker processes (1 to resample in-process)
+        
+    Returns:
+        dict: Per metric, the point ``estimate`` and the ``lower`` and
+            ``upper`` interval bounds
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    totals = _run_chunks(_bootstrap_chunk, (counts,), n_resamples, len(counts), seed, n_jobs)
+    
+    alpha = (1 - confidence) / 2
+    estimate = metrics_from_counts(counts.sum(axis=0))
+    resampled = metrics_from_counts(totals)
+    
+    return {
+        metric: {
+            "estimate": float(estimate[metric]),
+            "lower": float(np.quantile(resampled[metric], alpha)),
+            "upper": float(np.quantile(resampled[metric], 1 - alpha))
+        }
+        for metric in ("precision", "recall", "f1")
+    }
+
+def paired_permutation_test(counts_a, counts_b, metric="f1", n_permutations=10000, seed=None, n_jobs=1):
+    """
+    Paired permutation test of the difference in a metric between two systems.
+    
+    Both systems must be scored on the same reports in the same order. Under
+    the null hypothesis the systems are exchangeable, so each permutation
+    swaps the two systems' counts on a random half of the reports.
+    
+    Args:
+        counts_a (numpy.ndarray): (n_reports, 3) TP, FP, FN per report of system A
+        counts_b (numpy.ndarray): (n_reports, 3) TP, FP, FN per report of system B
+        metric (str): "precision", "recall" or "f1"
+        n_permutations (int): Number of random permutations
+        seed (int): Random seed; results are identical for any ``n_jobs``
+        n_jobs (int): Worker processes (1 to permute in-process)
+        
+    Returns:
+        dict: Observed ``difference`` (A - B) and two-sided ``p_value``
+    """
+    counts_a = np.asarray(counts_a, dtype=np.int64)
+    counts_b = np.asarray(counts_b, dtype=np.int64)
+    if counts_a.shape != counts_b.shape:
+        raise ValueError("Both systems must be scored on the same reports")
+    
+    observed = (metrics_from_counts(counts_a.sum(axis=0))[metric]
+                - metrics_from_counts(counts_b.sum(axis=0))[metric])
+    totals = _run_chunks(_permutation_chunk, (counts_a, counts_b), n_permutations, len(counts_a), seed, n_jobs)
+    differences = metrics_from_counts(totals[:, 0])[metric] - metrics_from_counts(totals[:, 1])[metric]
+    
+    # Tolerance keeps ties from being lost to floating point noise
+    extreme = np.count_nonzero(np.abs(differences) >= abs(observed) - 1e-12)
+    return {
+        "difference": float(observed),
+        "p_value": float((extreme + 1) / (n_permutations + 1))
+    }
+
+def _run_chunks(function, arrays, n_draws, n_reports, seed, n_jobs):
+    """
+    Evaluate ``function`` over chunks of draws, in-process or in a process pool.
+    
+    Every chunk gets its own child of one seed sequence, so the draws do not
+    depend on how chunks are spread across workers.
+    """
+    chunk_size = max(1, min(n_draws, _CHUNK_ELEMENTS // max(n_reports, 1)))
+    sizes = [min(chunk_size, n_draws - start) for start in range(0, n_draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    
+    if n_jobs == 1 or len(sizes) == 1:
+        _init_worker(arrays)
+        try:
+            return np.concatenate([function(s, size) for s, size in zip(seeds, sizes)])
+        finally:
+            _init_worker(None)
+    
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(arrays,)) as pool:
+        return np.concatenate(list(pool.map(function, seeds, sizes)))
+
+def _init_worker(arrays):
+    global _worker_arrays
+    _worker_arrays = arrays
+
+def _bootstrap_chunk(seed, size):
+    """Summed TP, FP, FN of ``size`` bootstrap resamples, shape (size, 3)."""
+    (counts,) = _worker_arrays
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(counts), size=(size, len(counts)))
+    # Times each report was drawn per resample, so the sum is one matrix product
+    flat = (indices + np.arange(size)[:, None] * len(counts)).ravel()
+    weights = np.bincount(flat, minlength=size * len(counts)).reshape(size, len(counts))
+    return weights.astype(float) @ counts
+
+def _permutation_chunk(seed, size):
+    """Summed counts of both systems under ``size`` random swaps, shape (size, 2, 3)."""
+    counts_a, counts_b = _worker_arrays
+    rng = np.random.default_rng(seed)
+    # One random byte yields eight swap decisions
+    packed = rng.integers(0, 256, size=(size, (len(counts_a) + 7) // 8), dtype=np.uint8)
+    swaps = np.unpackbits(packed, axis=1, count=len(counts_a)).astype(float)
+    shift = swaps @ (counts_b - counts_a)
+    totals_a = counts_a.sum(axis=0) + shift
+    totals_b = counts_b.sum(axis=0) - shift
+    return np.stack([totals_a, totals_b], axis=1)
@@ -0,0 +1,84 @@
+import re
+
+# Canonical error categories of the RadCoT taxonomy (radcot-tax-1.0)
+CATEGORIES = {
+    "T1_Typographical": "Typographical",
+    "T2_Numerical": "Numerical",
+    "T3_OmissionInsertion": "Omission/Insertion",
+    "T4_Interpretation": "Interpretation",
+    "T5_FindingsImpressionDiscrepancy": "Findings-Impression Discrepancy"
+}
+
+# Category keys in order, so a category can be stored as a small integer code
+CATEGORY_KEYS = list(CATEGORIES)
+
+# When a candidate error fits several categories, the highest-priority one wins
+DISAMBIGUATION_PRIORITY = [
+    "T4_Interpretation",
+    "T5_FindingsImpressionDiscrepancy",
+    "T3_OmissionInsertion",
+    "T2_Numerical",
+    "T1_Typographical"
+]
+
+_ALIASES = {
+    "typographical": "T1_Typographical",
+    "typographic": "T1_Typographical",
+    "typo": "T1_Typographical",
+    "numerical": "T2_Numerical",
+    "numeric": "T2_Numerical",
+    "measurement": "T2_Numerical",
+    "omissioninsertion": "T3_OmissionInsertion",
+    "omission": "T3_OmissionInsertion",
+    "insertion": "T3_OmissionInsertion",
+    "interpretation": "T4_Interpretation",
+    "interpretive": "T4_Interpretation",
+    "findingsimpressiondiscrepancy": "T5_FindingsImpressionDiscrepancy",
+    "findingsimpressiondiscrepancies": "T5_FindingsImpressionDiscrepancy",
+    "findingsimpression": "T5_FindingsImpressionDiscrepancy",
+    "findingsimpressionalignment": "T5_FindingsImpressionDiscrepancy"
+}
+_ALIASES.update({key.lower(): key for key in CATEGORIES})
+_ALIASES.update({key.split("_")[0].lower(): key for key in CATEGORIES})
+_ALIASES.update({re.sub(r"[^a-z0-9]", "", key.lower()): key for key in CATEGORIES})
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_TRAILING_NOISE = re.compile(r"errors?$")
+
+def normalize_category(label):
+    """
+    Map a model- or annotator-emitted category label to its taxonomy key.
+    
+    Accepts the canonical labels ("Findings-Impression Discrepancy" with any
+    dash), the taxonomy keys ("T5_FindingsImpressionDiscrepancy"), their short
+    codes ("T5", "(5)") and common variants ("Numerical error").
+    
+    Args:
+        label (str): Category label
+        
+    Returns:
+        str: Taxonomy key such as "T2_Numerical", or None if unrecognized
+    """
+    if not isinstance(label, str):
+        return None
+    
+    compact = _NON_ALNUM.sub("", label.lower())
+    if compact in _ALIASES:
+        return _ALIASES[compact]
+    if compact.isdigit() and 1 <= int(compact) <= len(CATEGORY_KEYS):
+        return CATEGORY_KEYS[int(compact) - 1]
+    
+    stripped = _TRAILING_NOISE.sub("", compact)
+    return _ALIASES.get(stripped)
+
+def category_label(key):
+    """
+    Human-readable label of a taxonomy key.
+    
+    Args:
+        key (str): Taxonomy key such as "T2_Numerical"
+        
+    Returns:
+        str: Label such as "Numerical"
+    """
+    return CATEGORIES[key]
@@ -1,6 +1,127 @@
 import re
 import numpy as np
 
+# Top-level section keywords and the section each one opens
+SECTION_KEYWORDS = {
+    "examination": "examination", "exam": "examination", "study": "examination",
+    "clinical": "clinical_info", "indication": "clinical_info", "history": "clinical_info",
+    "comparison": "comparison",
+    "technique": "technique", "procedure": "technique",
+    "findings": "findings", "finding": "findings", "result": "findings", "results": "findings",
+    "impression": "impression", "conclusion": "impression", "conclusions": "impression",
+    "assessment": "impression"
+}
+
+# Organ subheadings that nest inside the enclosing section (usually findings)
+ORGAN_HEADERS = (
+    "lungs", "lung", "pleura", "heart", "mediastinum", "airways", "chest wall",
+    "liver", "gallbladder", "biliary", "pancreas", "spleen", "adrenals", "adrenal glands",
+    "kidneys", "kidney", "bladder", "bowel", "peritoneum", "pelvis", "uterus", "ovaries",
+    "prostate", "vessels", "vasculature", "lymph nodes", "bones", "soft tissues", "brain",
+    "ventricles", "orbits", "sinuses", "spine"
+)
+
+def _alternation(words):
+    """Regex alternation of literal words, longest first so prefixes cannot shadow them."""
+    return "|".join(re.escape(word).replace(r"\ ", r"[ \t]+") for word in sorted(words, key=len, reverse=True))
+
+# One pattern recognizes every header: organ subheadings at the start of a
+# line (any case) or anywhere in capitals, and section headers anywhere, any
+# case, with up to a few more words before the colon
+_SECTION_HEADER_PATTERN = re.compile(
+    r"(?P<organ>(?:^[ \t]*(?:[-*\u2022][ \t]*)?(?P<organ_line>" + _alternation(ORGAN_HEADERS) + r")"
+    r"|\b(?-i:(?P<organ_caps>" + _alternation(word.upper() for word in ORGAN_HEADERS) + r")))"
+    r"(?:(?:[ \t]+and[ \t]+|[ \t]*/[ \t]*)[a-z]+(?:[ \t]+[a-z]+)?)?[ \t]*:)"
+    r"|\b(?P<keyword>" + _alternation(SECTION_KEYWORDS) + r")\b[^:\n.]{0,40}?:",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Longest header text considered before a colon
+_MAX_HEADER_LENGTH = 64
+
+def _find_headers(report):
+    """
+    Yield header matches in report order.
+    
+    Every header ends in a colon, so the scan jumps from colon to colon and
+    only tries the header pattern on the short stretch of line before each.
+    """
+    previous = -1
+    colon = report.find(":")
+    while colon != -1:
+        line_start = report.rfind("\n", 0, colon) + 1
+        match = _SECTION_HEADER_PATTERN.search(
+            report, max(line_start, previous + 1, colon - _MAX_HEADER_LENGTH), colon + 1
+        )
+        if match:
+            yield match
+        previous = colon
+        colon = report.find(":", colon + 1)
+
+def tokenize_sections(report):
+    """
+    Split a radiology report into sections with character offsets.
+    
+    All headers are found in one left-to-right scan. A top-level section runs from its
+    header to the next top-level header; organ subheadings such as LUNGS: or
+    HEART: nest inside the enclosing section and run to the next subheading
+    or the end of that section.
+    
+    Args:
+        report (str): The radiology report text
+        
+    Returns:
+        list: Sections in report order, each a dict with ``name``, ``header``
+            (as written), ``start`` (of the header), ``content_start``,
+            ``end`` and ``subsections`` (same shape, ``name`` is the organ)
+    """
+    sections = []
+    current = None
+    subsection = None
+    
+    for match in _find_headers(report):
+        if match.group("organ"):
+            organ = match.group("organ_line") or match.group("organ_caps")
+            start = match.start("organ_line") if match.group("organ_line") else match.start()
+            entry = {
+                "name": " ".join(organ.lower().split()),
+                "header": report[start:match.end()],
+                "start": start,
+                "content_start": match.end(),
+                "end": len(report),
+                "subsections": []
+            }
+            if subsection is not None:
+                subsection["end"] = entry["start"]
+            if current is not None:
+                current["subsections"].append(entry)
+                subsection = entry
+            else:
+                sections.append(entry)
+                subsection = None
+            continue
+        
+        entry = {
+            "name": SECTION_KEYWORDS[match.group("keyword").lower()],
+            "header": match.group(),
+            "start": match.start(),
+            "content_start": match.end(),
+            "end": len(report),
+            "subsections": []
+        }
+        if sections:
+            sections[-1]["end"] = entry["start"]
+        if subsection is not None:
+            subsection["end"] = entry["start"]
+        sections.append(entry)
+        current, subsection = entry, None
+    
+    # A top-level organ entry (no enclosing section yet) ends at the next header
+    for previous, following in zip(sections, sections[1:]):
+        previous["end"] = min(previous["end"], following["start"])
+    
+    return sections
+
 def extract_sections(report):
     """
     Extract standard sections from a radiology report.
@@ -11,25 +132,12 @@ def extract_sections(report):
     Returns:
         dict: Dictionary containing extracted sections
     """
-    # Define common section headers
-    section_patterns = {
-        "clinical_info": r"(?:CLINICAL|INDICATION|HISTORY).*?:",
-        "technique": r"(?:TECHNIQUE|PROCEDURE).*?:",
-        "findings": r"(?:FINDINGS|RESULT).*?:",
-        "impression": r"(?:IMPRESSION|CONCLUSION|ASSESSMENT).*?:"
-    }
-    
-    sections = {}
+    sections = dict.fromkeys(SECTION_KEYWORDS.values(), "")
     
-    # Extract each section
-    for section_name, pattern in section_patterns.items():
-        match = re.search(f"{pattern}(.*?)(?={''|'.join(list(section_patterns.values()))}|$)", 
-                         report, 
-                         re.DOTALL | re.IGNORECASE)
-        if match:
-            sections[section_name] = match.group(1).strip()
-        else:
-            sections[section_name] = ""
+    # The first occurrence of each section wins
+    for section in reversed(tokenize_sections(report)):
+        if section["name"] in sections:
+            sections[section["name"]] = report[section["content_start"]:section["end"]].strip()
     
     return sections
 
@@ -49,6 +157,22 @@ def extract_measurements(text):
     
     return [{"value": float(value), "unit": unit.lower()} for value, unit in measurements]
 
+# Anatomical abbreviations and their expansions (matched case-insensitively, whole words)
+ABBREVIATIONS = {
+    "rt": "right",
+    "lt": "left",
+    "ant": "anterior",
+    "post": "posterior",
+    "sup": "superior",
+    "inf": "inferior",
+    "med": "medial",
+    "lat": "lateral"
+}
+
+# All abbreviations in one alternation, so text is scanned once however many there are
+ABBREVIATION_ALTERNATION = r"\b(?:" + "|".join(sorted(ABBREVIATIONS, key=len, reverse=True)) + r")\b"
+_ABBREVIATION_PATTERN = re.compile(ABBREVIATION_ALTERNATION, re.IGNORECASE)
+
 def normalize_anatomical_terms(text):
     """
     Normalize anatomical terms to standard terminology.
@@ -59,20 +183,4 @@ def normalize_anatomical_terms(text):
     Returns:
         str: Text with normalized anatomical terms
     """
-    # Example normalization mappings
-    replacements = {
-        r"\brt\b": "right",
-        r"\blt\b": "left",
-        r"\bant\b": "anterior",
-        r"\bpost\b": "posterior",
-        r"\bsup\b": "superior",
-        r"\binf\b": "inferior",
-        r"\bmed\b": "medial",
-        r"\blat\b": "lateral"
-    }
-    
-    normalized = text
-    for pattern, replacement in replacements.items():
-        normalized = re.sub(pattern, replacement, normalized, flags=re.IGNORECASE)
-    
-    return normalized
\ No newline at end of file
+    return _ABBREVIATION_PATTERN.sub(lambda match: ABBREVIATIONS[match.group().lower()], text)
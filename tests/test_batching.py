@@ -0,0 +1,46 @@
+from radcot.batching import BatchingModel
+from radcot.framework import RadCoT
+from radcot.models import LLMInterface
+
+class _PrefixModel(LLMInterface):
+    """Records which entry point served each prompt."""
+    
+    def __init__(self):
+        self.served = []
+        self.stream_closed = False
+    
+    def generate(self, prompt, temperature=0.0):
+        self.served.append(("generate", prompt))
+        return prompt.upper()
+    
+    def generate_with_prefix(self, prefix, suffixes, temperature=0.0):
+        self.served.extend(("prefix", prefix + suffix) for suffix in suffixes)
+        return [(prefix + suffix).upper() for suffix in suffixes]
+    
+    def generate_stream(self, prompt, temperature=0.0):
+        try:
+            for character in prompt:
+                yield character
+        finally:
+            self.stream_closed = True
+
+def test_prefix_and_stream_reach_the_wrapped_model():
+    model = _PrefixModel()
+    batching = BatchingModel(model)
+    try:
+        assert batching.generate_with_prefix("ab", ["c", "d"]) == ["ABC", "ABD"]
+        assert model.served == [("prefix", "abc"), ("prefix", "abd")]
+        
+        stream = batching.generate_stream("xyz")
+        assert next(stream) == "x"
+        stream.close()
+        assert model.stream_closed
+    finally:
+        batching.close()
+
+def test_detector_close_stops_the_dispatcher_thread(tmp_path):
+    with RadCoT("mock", batch_size=4, cache_path=str(tmp_path / "cache.sqlite"), preprocess=False) as detector:
+        detector.detect_errors("FINDINGS: Lungs are clear.\nIMPRESSION: Normal chest.")
+        batching = detector.model.model
+        assert batching._worker.is_alive()
+    assert not batching._worker.is_alive()
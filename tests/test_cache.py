@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from radcot.batching import BatchingModel
+from radcot.cache import CachedModel, ResponseCache
+from radcot.framework import RadCoT
+from radcot.models import LLMInterface
+
+class _CountingModel(LLMInterface):
+    """Echoes prompts and counts the calls of each kind."""
+    
+    def __init__(self):
+        self.calls = {"generate": 0, "prefix": 0, "stream": 0}
+    
+    def generate(self, prompt, temperature=0.0):
+        self.calls["generate"] += 1
+        return f"answer to {prompt}"
+    
+    def generate_with_prefix(self, prefix, suffixes, temperature=0.0):
+        self.calls["prefix"] += len(suffixes)
+        return [f"answer to {prefix + suffix}" for suffix in suffixes]
+    
+    def generate_stream(self, prompt, temperature=0.0):
+        self.calls["stream"] += 1
+        for word in f"answer to {prompt}".split(" "):
+            yield word + " "
+
+def _cached(tmp_path):
+    model = _CountingModel()
+    return model, CachedModel(model, ResponseCache(str(tmp_path / "cache.sqlite")))
+
+def test_prefix_generation_is_cached_by_full_prompt(tmp_path):
+    model, cached = _cached(tmp_path)
+    assert cached.generate("report step 1") == "answer to report step 1"
+    assert cached.generate_with_prefix("report ", ["step 1", "step 2"]) == [
+        "answer to report step 1", "answer to report step 2"]
+    # Only the miss reaches the backend's prefix path
+    assert model.calls == {"generate": 1, "prefix": 1, "stream": 0}
+    assert cached.generate_with_prefix("report ", ["step 1", "step 2"]) == [
+        "answer to report step 1", "answer to report step 2"]
+    assert model.calls["prefix"] == 1
+
+def test_stream_is_cached_only_when_read_to_the_end(tmp_path):
+    model, cached = _cached(tmp_path)
+    stream = cached.generate_stream("report")
+    next(stream)
+    stream.close()
+    assert "".join(cached.generate_stream("report")) == "answer to report "
+    assert model.calls["stream"] == 2
+    assert list(cached.generate_stream("report")) == ["answer to report "]
+    assert model.calls["stream"] == 2
+
+def test_key_includes_the_backend_defaults_under_a_batching_wrapper(tmp_path):
+    model = _CountingModel()
+    batching = BatchingModel(model)
+    cached = CachedModel(batching, ResponseCache(str(tmp_path / "cache.sqlite")))
+    try:
+        cached.generate("report")
+        cached.generate("report", temperature=0.0)
+        assert model.calls["generate"] == 1
+        cached.generate("report", temperature=0.5)
+        assert model.calls["generate"] == 2
+    finally:
+        batching.close()
+
+def test_cached_requests_decode_at_temperature_zero(tmp_path):
+    class _SamplingModel(LLMInterface):
+        def __init__(self):
+            self.temperatures = []
+        
+        def generate(self, prompt, temperature=0.7):
+            self.temperatures.append(temperature)
+            return f"answer to {prompt}"
+    
+    model = _SamplingModel()
+    cached = CachedModel(model, ResponseCache(str(tmp_path / "cache.sqlite")))
+    cached.generate("report")
+    cached.generate_batch(["report", "other report"])
+    list(cached.generate_stream("third report"))
+    cached.generate("report", temperature=0.7)
+    assert model.temperatures == [0.0, 0.0, 0.0, 0.7]
+
+def test_detector_close_closes_its_cache(tmp_path):
+    with RadCoT("mock", cache_path=str(tmp_path / "cache.sqlite"), preprocess=False) as detector:
+        detector.detect_errors("FINDINGS: Lungs are clear.\nIMPRESSION: Normal chest.")
+        cache = detector.model.cache
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.stats()
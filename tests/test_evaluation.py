@@ -0,0 +1,110 @@
+import random
+
+import numpy as np
+
+from radcot.benchmark import synthetic_annotations
+from radcot.evaluation import RadCoTEvaluator
+from radcot.spans import SentenceIndex, SpanMatcher, sentence_starts
+
+REPORT = "FINDINGS: A 3 cm lesion in the left kidney. No hydronephrosis.\nIMPRESSION: 1. Right renal lesion. 2. No stones."
+
+def baseline_match_errors(predictions, ground_truth):
+    """The baseline matcher: a reference is matched if any prediction has its location and type."""
+    matched = np.zeros(len(ground_truth), dtype=int)
+    for i, gt_error in enumerate(ground_truth):
+        for pred_error in predictions:
+            if (gt_error.get("location") == pred_error.get("location")
+                    and gt_error.get("type") == pred_error.get("type")):
+                matched[i] = 1
+                break
+    return matched, np.ones(len(ground_truth), dtype=int)
+
+def random_errors(rng, n, locations, types):
+    return [{"location": rng.choice(locations), "type": rng.choice(types)} for _ in range(n)]
+
+def test_hash_matching_agrees_with_baseline():
+    rng = random.Random(0)
+    evaluator = RadCoTEvaluator()
+    types = ["Numerical", "Interpretation", "Typographical"]
+    for _ in range(50):
+        locations = [f"span {i}" for i in range(rng.randint(1, 30))]
+        # Distinct references, so one-to-one assignment and the baseline coincide
+        keys = list({(rng.choice(locations), rng.choice(types)) for _ in range(rng.randint(0, 20))})
+        ground_truth = [{"location": location, "type": error_type} for location, error_type in keys]
+        predictions = random_errors(rng, rng.randint(0, 40), locations, types)
+        
+        expected, ones = baseline_match_errors(predictions, ground_truth)
+        matched, reference = evaluator._match_errors(predictions, ground_truth)
+        assert matched.tolist() == expected.tolist()
+        assert reference.tolist() == ones.tolist()
+
+def test_matching_is_one_to_one():
+    evaluator = RadCoTEvaluator()
+    error = {"location": "3 cm", "type": "Numerical"}
+    result = evaluator.evaluate([error], [error, dict(error)])
+    assert (result["true_positives"], result["false_positives"], result["false_negatives"]) == (1, 0, 1)
+
+def test_sentence_segmentation():
+    starts = sentence_starts(REPORT)
+    sentences = [REPORT[a:b].strip() for a, b in zip(starts, starts[1:] + [len(REPORT)])]
+    assert "A 3 cm lesion in the left kidney." in sentences[0]
+    assert "No hydronephrosis." in sentences
+    assert any(sentence.startswith("2.") for sentence in sentences)
+
+def test_locate_tolerates_case_and_whitespace():
+    index = SentenceIndex(REPORT)
+    assert index.locate("no  HYDRONEPHROSIS") == REPORT.index("No hydronephrosis")
+    assert index.locate("not in the report") == -1
+    assert index.sentence_of(-1) == -1
+
+def test_span_matching_window():
+    reports = {"r": REPORT}
+    reference = {"r": [{"text_span": "A 3 cm lesion in the left kidney", "error_type": "Findings-Impression Discrepancy"}]}
+    same = {"r": [{"text_span": "left kidney", "error_type": "T5"}]}
+    adjacent = {"r": [{"text_span": "No hydronephrosis", "error_type": "T5"}]}
+    far = {"r": [{"text_span": "No stones", "error_type": "T5"}]}
+    wrong_type = {"r": [{"text_span": "left kidney", "error_type": "Numerical"}]}
+    unknown = {"r": [{"text_span": "left kidney", "error_type": "Bogus"}]}
+    
+    matcher = SpanMatcher(window=1)
+    assert matcher.match(same, reference, reports)["references"]["matched"].tolist() == [True]
+    assert matcher.match(adjacent, reference, reports)["references"]["matched"].tolist() == [True]
+    assert matcher.match(far, reference, reports)["references"]["matched"].tolist() == [False]
+    assert matcher.match(wrong_type, reference, reports)["references"]["matched"].tolist() == [False]
+    assert matcher.match(unknown, reference, reports)["predictions"]["matched"].tolist() == [False]
+    assert SpanMatcher(window=0).match(adjacent, reference, reports)["references"]["matched"].tolist() == [False]
+
+def test_span_evaluation_counts():
+    corpus = synthetic_annotations(200, seed=1)
+    evaluator = RadCoTEvaluator()
+    result = evaluator.evaluate(corpus["predictions"], corpus["ground_truth"], reports=corpus["reports"])
+    n_predictions = sum(len(errors) for errors in corpus["predictions"].values())
+    n_references = sum(len(errors) for errors in corpus["ground_truth"].values())
+    assert result["true_positives"] + result["false_positives"] == n_predictions
+    assert result["true_positives"] + result["false_negatives"] == n_references
+    assert 0 < result["recall"] < 1
+    
+    abstained = evaluator.evaluate(corpus["predictions"], corpus["ground_truth"], reports=corpus["reports"],
+                                   abstained=["r0", "r1"])
+    assert abstained["abstained_n"] == 2
+
+def test_grouped_evaluation_matches_per_type_evaluation():
+    corpus = synthetic_annotations(100, seed=2)
+    evaluator = RadCoTEvaluator()
+    flat_predictions = [error for errors in corpus["predictions"].values() for error in errors]
+    flat_ground_truth = [error for errors in corpus["ground_truth"].values() for error in errors]
+    by_type = evaluator.evaluate_by_error_type(flat_predictions, flat_ground_truth)
+    for error_type, metrics in by_type.items():
+        expected = evaluator.evaluate(
+            [error for error in flat_predictions if error["type"] == error_type],
+            [error for error in flat_ground_truth if error["type"] == error_type]
+        )
+        assert metrics == expected
+
+def test_sentence_index_cache_is_bounded():
+    matcher = SpanMatcher(max_indexes=2)
+    first = matcher.sentence_index("a", "One. Two.")
+    matcher.sentence_index("b", "Three.")
+    assert matcher.sentence_index("a", "One. Two.") is first
+    matcher.sentence_index("c", "Four.")
+    assert list(matcher._indexes) == ["a", "c"]
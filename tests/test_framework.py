@@ -0,0 +1,89 @@
+import threading
+import time
+
+from radcot.framework import RadCoT
+
+REPORT = """FINDINGS: A 6 mm nodule in the left upper lobe.
+IMPRESSION: 6 mm nodule in the left upper lobe."""
+
+class _SlowModel:
+    """Step 1 hangs; every other step answers after a short delay."""
+    
+    def __init__(self, hang=1.0, delay=0.15):
+        self.hang = hang
+        self.delay = delay
+        self.stream_closed = threading.Event()
+    
+    def generate(self, prompt, **kwargs):
+        time.sleep(self.hang if "### Step 1:" in prompt else self.delay)
+        return "No issue identified in this step"
+    
+    def generate_stream(self, prompt, **kwargs):
+        if "### Step 1:" not in prompt:
+            yield self.generate(prompt)
+            return
+        try:
+            while True:
+                time.sleep(0.01)
+                yield "still thinking "
+        finally:
+            self.stream_closed.set()
+
+def test_step_deadline_starts_when_the_step_starts():
+    # Two workers: the hanging step holds one, so the other five run one after
+    # another for longer than one step_timeout in total, but each within its own
+    with RadCoT("mock", parallel_steps=True, max_workers=2, step_timeout=0.4, preprocess=False) as detector:
+        detector.model = _SlowModel()
+        result = detector.detect_errors(REPORT)
+    assert result["incomplete_steps"] == ["step_1"]
+    assert "of starting" in result["reasoning_trace"]["step_1"]
+
+def test_abandoned_streamed_step_is_cancelled():
+    model = _SlowModel(delay=0.0)
+    with RadCoT("mock", parallel_steps=True, stream_steps=True, step_timeout=0.2, preprocess=False) as detector:
+        detector.model = model
+        started = time.monotonic()
+        result = detector.detect_errors(REPORT)
+        assert time.monotonic() - started < 1.0
+        assert model.stream_closed.wait(1.0)
+    assert result["incomplete_steps"] == ["step_1"]
+
+def _stream(detector, text, size=7):
+    """Feed ``text`` to the early-stop check in chunks, as a streamed step would."""
+    for end in range(size, len(text) + size, size):
+        complete = detector._complete_step_output(text[:end])
+        if complete is not None:
+            return complete
+    return text
+
+def test_early_stop_keeps_the_json_block_after_a_list():
+    text = ('1. "6 cm nodule" contradicts the findings.\n\n'
+            '```json\n{"errors": [{"error_type": "Numerical", "text_span": "6 cm nodule",\n\n'
+            '  "explanation": "Size mismatch."}]}\n```\nThis closing remark is not needed.')
+    with RadCoT("mock", preprocess=False) as detector:
+        assert _stream(detector, text) == text[:text.index("\nThis closing")]
+        bare = '1. "6 cm nodule" contradicts the findings.\n\n{"errors": []}'
+        assert _stream(detector, bare) == bare
+
+def test_early_stop_after_a_list_followed_by_prose():
+    text = "1. Laterality differs.\n2. Size differs.\n\nThese are all the issues."
+    with RadCoT("mock", preprocess=False) as detector:
+        assert _stream(detector, text) == "1. Laterality differs.\n2. Size differs."
+        assert _stream(detector, "Checked.\nNo issue identified in this step. Done.") == (
+            "Checked.\nNo issue identified in this step")
+
+def test_fused_plan_records_the_skipped_steps():
+    from radcot.scheduler import StepScheduler
+    
+    report = "EXAMINATION: Chest X-ray, PA view.\nFINDINGS: Lungs are clear.\nIMPRESSION: No acute disease."
+    with RadCoT("mock", scheduler=StepScheduler(fuse_below=100000), preprocess=False) as detector:
+        model = detector.model
+        prompts = []
+        detector.model = type("Recording", (), {
+            "generate": lambda self, prompt, **kwargs: prompts.append(prompt) or model.generate(prompt, **kwargs)
+        })()
+        result = detector.detect_errors(report)
+    assert len(prompts) == 1
+    assert result["skipped_steps"] == ["step_2", "step_3"]
+    assert result["reasoning_trace"]["step_3"].startswith("Step skipped: single-view radiograph")
+    assert "- Step 2: report contains no measurements" in prompts[0]
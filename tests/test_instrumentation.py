@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from radcot.instrumentation import HISTOGRAM_RESOLUTION, Instrumentation, _Histogram
+
+def test_histogram_percentiles_track_exact_ones():
+    values = np.random.default_rng(0).lognormal(mean=-1.0, sigma=1.0, size=20000)
+    histogram = _Histogram()
+    for value in values:
+        histogram.add(float(value))
+    for p in (50, 95, 99):
+        assert histogram.percentile(p) == pytest.approx(np.percentile(values, p), rel=HISTOGRAM_RESOLUTION)
+    assert histogram.total == pytest.approx(values.sum())
+    assert (histogram.min, histogram.max) == (values.min(), values.max())
+    # Bounded by the range of durations, not their number
+    assert len(histogram.buckets) < 400
+
+def test_zero_durations_and_empty_histogram():
+    histogram = _Histogram()
+    assert histogram.percentile(50) == 0.0
+    for value in (0.0, 0.0, 0.0, 2.0):
+        histogram.add(value)
+    assert histogram.percentile(50) == 0.0
+    assert histogram.percentile(100) == pytest.approx(2.0, rel=HISTOGRAM_RESOLUTION)
+
+def test_summary_aggregates_without_keeping_values():
+    recorder = Instrumentation(max_spans=0)
+    for _ in range(1000):
+        with recorder.span("step", "anatomical_validation") as span:
+            span.add(prompt_tokens=10, queue_wait=0.01)
+    entry = recorder.summary()["anatomical_validation"]
+    assert entry["count"] == 1000 and entry["prompt_tokens"] == 10000
+    assert entry["queue_wait_total"] == pytest.approx(10.0)
+    assert entry["queue_wait_p50"] == pytest.approx(0.01, rel=HISTOGRAM_RESOLUTION)
+    assert entry["wall_min"] <= entry["wall_p50"] <= entry["wall_max"]
+    assert "radcot_wall_seconds_count" in recorder.export_prometheus()
@@ -0,0 +1,78 @@
+import pytest
+
+from radcot.framework import RADCOT_STEPS, RadCoT
+from radcot.mock import MockModel, MockModelError
+from radcot.parsing import OutputParser
+
+REPORT = """EXAMINATION: CT abdomen and pelvis with contrast.
+FINDINGS:
+LIVER: A 3.2 cm hypodense lesion in segment 7.
+LUNGS: A 4 mm nodule in the right upper lobe.
+IMPRESSION: Hepatic lesion, further characterization with MRI."""
+
+def test_canned_errors_quote_report_sentences():
+    errors = MockModel(error_rate=1.0).canned_errors(REPORT)
+    assert errors
+    for error in errors:
+        assert error["text_span"] in REPORT
+        assert not error["text_span"].endswith(":")
+        assert 1 <= error["originating_step"] <= 6
+
+def test_outputs_are_deterministic():
+    with RadCoT("mock", preprocess=False) as detector:
+        prompt = detector._step_prompt(RADCOT_STEPS[0], REPORT)
+    assert MockModel(seed=3).respond(prompt) == MockModel(seed=3).respond(prompt)
+    assert MockModel(seed=3).canned_errors(REPORT) == MockModel(seed=3).canned_errors(REPORT)
+
+def test_step_outputs_parse_to_the_canned_errors():
+    mock = MockModel(error_rate=1.0)
+    parser = OutputParser()
+    with RadCoT("mock", preprocess=False) as detector:
+        parsed = []
+        for step, key in enumerate(RADCOT_STEPS, 1):
+            output = mock.respond(detector._step_prompt(key, REPORT))
+            parsed += parser.parse(output, REPORT, step)["errors"]
+    assert sorted(error["text_span"] for error in parsed) == sorted(
+        error["text_span"] for error in mock.canned_errors(REPORT))
+
+def test_failures_are_raised():
+    with pytest.raises(MockModelError):
+        MockModel(failure_rate=1.0).generate("prompt")
+    with pytest.raises(MockModelError):
+        MockModel(failure_rate=1.0).generate_batch(["a", "b"])
+
+def test_batch_and_stream_match_generate():
+    mock = MockModel(error_rate=1.0)
+    with RadCoT("mock", preprocess=False) as detector:
+        prompt = detector._step_prompt(RADCOT_STEPS[1], REPORT)
+    assert mock.generate_batch([prompt, prompt]) == [mock.generate(prompt)] * 2
+    assert "".join(mock.generate_stream(prompt)) == mock.generate(prompt)
+
+def test_unknown_distribution_is_rejected():
+    with pytest.raises(ValueError):
+        MockModel(distribution="pareto")
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"strategy": "fused"},
+    {"batch_size": 6},
+    {"parallel_steps": True},
+    {"prefix_cache": True}
+])
+def test_detector_recovers_canned_errors(options):
+    expected = MockModel(error_rate=1.0).canned_errors(REPORT)
+    with RadCoT("mock", model_config={"error_rate": 1.0}, **options) as detector:
+        result = detector.detect_errors(REPORT)
+    assert result["rejected_errors"] == []
+    assert {error["text_span"] for error in result["errors"]} == {error["text_span"] for error in expected}
+    for error in result["errors"]:
+        assert REPORT[error["span_start"]:error["span_end"]] == error["text_span"]
+
+def test_batch_reports_malformed_items_without_aborting():
+    items = [REPORT, {"REPORT_ID": "no-text", "MODALITY": "CT"}, 42, {"REPORT_ID": "ok", "REPORT_TEXT": REPORT}]
+    with RadCoT("mock") as detector:
+        results = {result["report_id"]: result for result in detector.detect_errors_batch(items, max_in_flight=2)}
+    assert set(results) == {0, "no-text", 2, "ok"}
+    assert results[0]["status"] == results["ok"]["status"] == "ok"
+    assert results["no-text"]["status"] == "error" and "REPORT_TEXT" in results["no-text"]["error"]
+    assert results[2]["status"] == "error" and results[2]["error"].startswith("TypeError")
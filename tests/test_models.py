@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from radcot.ratelimit import RateLimiter
+
+pytest.importorskip("openai")
+
+USAGE = {"prompt_tokens": 40, "completion_tokens": 10, "total_tokens": 50}
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint answering like the OpenAI API."""
+    
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append(body)
+        if server.fail_first and len(server.requests) == 1:
+            return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                              {"retry-after": "0"})
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            chunks = [_chunk([{"index": 0, "delta": {"content": text}, "finish_reason": None}])
+                      for text in ("No issue ", "identified in this step")]
+            chunks.append(_chunk([], usage=USAGE))
+            for chunk in chunks:
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        self._send(200, {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": "gpt-4o-2024-08-06",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "No issue identified in this step"},
+                         "finish_reason": "stop"}],
+            "usage": USAGE
+        })
+    
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, *args):
+        pass
+
+def _chunk(choices, usage=None):
+    return {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0,
+            "model": "gpt-4o-2024-08-06", "choices": choices, "usage": usage}
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests = []
+    server.fail_first = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def model(stub_server, monkeypatch):
+    from radcot.models import GPT4oModel
+    
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    model = GPT4oModel(tokens_per_minute=100000, max_retries=2, timeout=5.0,
+                       base_url=f"http://127.0.0.1:{stub_server.server_address[1]}/v1")
+    yield model
+    model.unload()
+
+def _tokens_taken(model):
+    """Tokens the calls so far hold in the bucket (less what refilled since)."""
+    bucket = model.limiter._tokens
+    return bucket.capacity - bucket.level
+
+def test_generate_settles_the_reservation_with_actual_usage(model, stub_server):
+    assert model.generate("Report: normal chest.") == "No issue identified in this step"
+    assert stub_server.requests[0]["max_tokens"] == model.max_tokens
+    # The reservation included the full completion allowance; only 50 tokens were used
+    assert _tokens_taken(model) <= USAGE["total_tokens"] < model.max_tokens
+
+def test_rate_limited_request_is_retried(model, stub_server):
+    stub_server.fail_first = True
+    assert model.generate("Report: normal chest.") == "No issue identified in this step"
+    assert len(stub_server.requests) == 2
+
+def test_stream_settles_on_the_usage_chunk(model, stub_server):
+    assert "".join(model.generate_stream("Report: normal chest.")) == "No issue identified in this step"
+    assert stub_server.requests[0]["stream_options"] == {"include_usage": True}
+    assert _tokens_taken(model) <= USAGE["total_tokens"] < model.max_tokens
+
+def test_agenerate_uses_the_async_client(model):
+    assert asyncio.run(model.agenerate("Report: normal chest.")) == "No issue identified in this step"
+    assert _tokens_taken(model) <= USAGE["total_tokens"] < model.max_tokens
+
+def test_unload_closes_both_clients(model):
+    model.unload()
+    assert model.client.is_closed() and model.async_client.is_closed()
+
+def test_aclose_closes_both_clients_in_a_running_loop(model):
+    asyncio.run(model.aclose())
+    assert model.client.is_closed() and model.async_client.is_closed()
+
+def test_unload_in_a_running_loop_keeps_the_close_task(model):
+    async def unload():
+        model.unload()
+        await model.closing
+    
+    asyncio.run(unload())
+    assert model.async_client.is_closed()
+
+def test_reconcile_returns_and_draws_tokens():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    limiter.acquire(600)
+    limiter.reconcile(600, 100)
+    assert limiter._tokens.level == pytest.approx(900, abs=1)
+    limiter.reconcile(0, 1000)
+    assert limiter._reserve(1) > 0
@@ -0,0 +1,135 @@
+import pytest
+
+from radcot.framework import RADCOT_STEPS, RadCoT
+from radcot.parsing import OutputParser, extract_json, validate_output
+
+REPORT = """EXAMINATION: CT chest without contrast.
+FINDINGS:
+There is a 6 mm nodule in the left upper lobe.
+No pleural effusion.
+IMPRESSION: 6 cm nodule in the right upper lobe."""
+
+# Final output of the fused prompt, exactly as its FINAL OUTPUT schema asks:
+# no severity, confidence or uncertain fields, and an en dash in the category
+FUSED_RESPONSE = """Reasoning Step 1: The findings place the nodule in the left upper lobe, the impression on the right.
+Issues found in Step 1:
+1. "right upper lobe" contradicts the findings.
+Reasoning Step 2: The nodule measures 6 mm in the findings and 6 cm in the impression.
+Issues found in Step 2:
+1. "6 cm nodule" is inconsistent with the findings.
+Reasoning Step 3: No cross-sectional issues.
+Issues found in Step 3: None
+Reasoning Step 4: See steps 1 and 2.
+Issues found in Step 4: None
+Reasoning Step 5: Follow-up for the nodule is not recommended.
+Issues found in Step 5: None
+Reasoning Step 6: Terminology is standard.
+Issues found in Step 6: None
+
+[
+  {
+    "error_id": 1,
+    "error_type": "Findings–Impression Discrepancy",
+    "text_span": "right upper lobe",
+    "section": "Impression",
+    "originating_step": 1,
+    "explanation": "The impression gives the opposite laterality to the findings."
+  },
+  {
+    "error_id": 2,
+    "error_type": "Numerical",
+    "text_span": "6 cm nodule",
+    "section": "Impression",
+    "originating_step": 2,
+    "explanation": "The impression states 6 cm where the findings state 6 mm."
+  }
+]"""
+
+# Answer to a step prompt: the free-text list, then the requested JSON block
+STEP_RESPONSE = """1. The impression measures the nodule as "6 cm", the findings as 6 mm.
+
+```json
+{"errors": [{"error_type": "Numerical", "text_span": "6 cm nodule", "severity": "Major",
+  "confidence": "0.9", "explanation": "The impression contradicts the findings measurement."}]}
+```"""
+
+class _ScriptedModel:
+    """Answers every prompt with the same response."""
+    
+    def __init__(self, response):
+        self.response = response
+        self.prompts = []
+    
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return self.response
+    
+    def generate_batch(self, prompts, **kwargs):
+        return [self.generate(prompt) for prompt in prompts]
+
+def test_fused_final_output_without_severity_or_confidence_parses():
+    parsed = OutputParser().parse(FUSED_RESPONSE.split("\n\n", 1)[1], REPORT)
+    assert parsed["rejected"] == []
+    assert [error["category"] for error in parsed["errors"]] == [
+        "T5_FindingsImpressionDiscrepancy", "T2_Numerical"]
+    for error in parsed["errors"]:
+        assert "severity" not in error and "confidence" not in error
+        assert REPORT[error["span_start"]:error["span_end"]] == error["text_span"]
+
+def test_fused_detection_keeps_prompt_conformant_errors():
+    with RadCoT("mock", strategy="fused", preprocess=False) as detector:
+        detector.model = _ScriptedModel(FUSED_RESPONSE)
+        result = detector.detect_errors(REPORT)
+    assert sorted(error["text_span"] for error in result["errors"]) == ["6 cm nodule", "right upper lobe"]
+    assert result["rejected_errors"] == []
+
+def test_step_output_list_then_json_block_parses():
+    parsed = OutputParser().parse(STEP_RESPONSE, REPORT, step=2)
+    assert parsed["rejected"] == []
+    error, = parsed["errors"]
+    assert error["originating_step"] == 2
+    assert error["severity"] == "major" and error["confidence"] == 0.9
+    assert error["section"] == "Impression"
+
+def test_step_prompts_ask_for_the_parsed_fields():
+    with RadCoT("mock", preprocess=False) as detector:
+        for key in RADCOT_STEPS:
+            prompt = detector._step_prompt(key, REPORT)
+            assert "No issue identified in this step" in prompt
+            for field in ("error_type", "text_span", "explanation"):
+                assert f'"{field}"' in prompt
+
+def test_free_text_output_yields_no_errors():
+    parsed = OutputParser().parse('1. "right upper lobe" contradicts the findings.', REPORT, step=1)
+    assert parsed == {"errors": [], "rejected": [], "abstain": False, "abstain_reason": None}
+
+def test_invalid_and_ungrounded_errors_are_rejected():
+    response = """{"errors": [
+      {"error_type": "Spelling", "text_span": "left upper lobe", "explanation": "Unknown category."},
+      {"error_type": "Numerical", "text_span": "7 mm nodule", "explanation": "Not in the report."},
+      {"error_type": "Numerical", "text_span": "6 cm nodule", "confidence": 2, "explanation": "Out of range."}
+    ]}"""
+    parsed = OutputParser().parse(response, REPORT, step=2)
+    assert parsed["errors"] == []
+    reasons = [" ".join(rejected["reasons"]) for rejected in parsed["rejected"]]
+    assert "error_type" in reasons[0]
+    assert "not found in the report" in reasons[1]
+    assert "confidence" in reasons[2]
+
+def test_standard_output_parses():
+    response = ('{"errors": [{"error_id": 1, "error_type": "Findings-Impression Discrepancy", '
+                '"text_span": "right upper lobe", "description": "Laterality differs from the findings."}]}')
+    error, = OutputParser(schema="standard").parse(response, REPORT)["errors"]
+    assert error["explanation"] == "Laterality differs from the findings."
+
+def test_complete_output_validation_stays_strict():
+    output = {"abstain": False, "abstain_reason": None, "errors": [extract_json(FUSED_RESPONSE)[0]],
+              "summary": {"n_errors": 1, "by_type": {}, "by_step": {}, "mean_confidence": 0.5}}
+    messages = validate_output(output)
+    assert any("severity" in message for message in messages)
+    assert any("confidence" in message for message in messages)
+
+def test_jsonschema_validator_agrees():
+    pytest.importorskip("jsonschema")
+    response = FUSED_RESPONSE.split("\n\n", 1)[1]
+    assert OutputParser(use_jsonschema=True).parse(response, REPORT) == OutputParser().parse(response, REPORT)
@@ -0,0 +1,56 @@
+import pytest
+
+from radcot import registry
+from radcot.framework import RadCoT
+from radcot.registry import ModelRegistry, shared_registry
+
+class _Backend:
+    """Backend recording its configuration and whether it was unloaded."""
+    
+    def __init__(self, **config):
+        self.config = config
+        self.unloaded = False
+    
+    def memory_footprint(self):
+        return 0
+    
+    def unload(self):
+        self.unloaded = True
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    monkeypatch.setattr(registry, "load_model", lambda model_name, **config: _Backend(**config))
+
+def test_unhashable_config_values_share_one_backend(fake_backends):
+    models = ModelRegistry()
+    config = {"generation_kwargs": {"top_p": 0.9, "stop": ["\n\n"]}}
+    first = models.acquire("local", **config)
+    assert models.acquire("local", generation_kwargs={"stop": ["\n\n"], "top_p": 0.9}) is first
+    assert models.acquire("local", generation_kwargs={"top_p": 0.5}) is not first
+
+def test_holders_release_a_force_unloaded_backend(fake_backends):
+    models = ModelRegistry()
+    first = models.acquire("local")
+    models.acquire("local")
+    assert models.unload("local", force=True) and first.unloaded
+    assert models.loaded() == {}
+    
+    second = models.acquire("local")
+    assert second is not first
+    models.release("local")
+    models.release("local")
+    # The fresh backend's own reference is still counted
+    assert list(models.loaded().values()) == [{"refcount": 1, "memory_bytes": 0}]
+    models.release("local")
+    with pytest.raises(ValueError, match="not acquired"):
+        models.release("local")
+
+def test_detector_closes_after_a_forced_unload():
+    detector = RadCoT("mock", model_config={"seed": 11})
+    assert shared_registry.unload("mock", force=True, seed=11)
+    detector.close()
+
+def test_failed_init_releases_the_model(tmp_path):
+    with pytest.raises(Exception):
+        RadCoT("mock", cache_path=str(tmp_path), model_config={"seed": 12})
+    assert [entry["refcount"] for key, entry in shared_registry.loaded().items() if '"seed": 12' in key[1]] == [0]
@@ -0,0 +1,53 @@
+from radcot.framework import RadCoT
+from radcot.rules import RuleChecker
+
+FLIPPED = """FINDINGS: A 6 mm nodule in the left upper lobe. The right kidney is absent; left nephrectomy clips.
+IMPRESSION: 6 mm nodule in the right upper lobe."""
+
+class _StepModel:
+    """Reports a second anatomical error in step 1 and nothing elsewhere."""
+    
+    def __init__(self):
+        self.steps = []
+    
+    def generate(self, prompt, **kwargs):
+        step = int(prompt.split("### Step ", 1)[1][0])
+        self.steps.append(step)
+        if step != 1:
+            return "No issue identified in this step"
+        return ('1. The absent kidney contradicts the side of the nephrectomy.\n\n'
+                '```json\n{"errors": [{"error_type": "Interpretation", "text_span": "right kidney is absent", '
+                '"explanation": "The nephrectomy clips are on the left."}]}\n```')
+
+def _implausible(report):
+    return [error["text_span"] for error in RuleChecker(["implausible_unit"]).check(report)]
+
+def test_lesion_sizes_in_metres_are_flagged():
+    report = ("FINDINGS: A 2.5 m spiculated nodule in the right lower lobe. The liver measures 80 cm.\n"
+              "IMPRESSION: Right lower lobe nodule.")
+    assert _implausible(report) == ["2.5 m", "80 cm"]
+
+def test_body_measurements_are_not_flagged():
+    report = ("CLINICAL INFORMATION: Patient height 1.8 m.\n"
+              "FINDINGS: Patient height 1.8 m, weight 80 kg. The patient is 1.75 m tall. "
+              "Field of view 1 m. A 4 mm nodule in the left upper lobe.\n"
+              "IMPRESSION: 4 mm left upper lobe nodule.")
+    assert _implausible(report) == []
+
+def test_skip_prescreen_narrows_a_step_with_checks_beyond_the_rules():
+    with RadCoT("mock", prescreen="skip", preprocess=False) as detector:
+        detector.model = model = _StepModel()
+        result = detector.detect_errors(FLIPPED)
+    assert model.steps == [1, 2, 3, 4, 5, 6]
+    assert result["skipped_steps"] == []
+    spans = {error["text_span"] for error in result["errors"]}
+    assert "right kidney is absent" in spans
+    assert "6 mm nodule in the right upper lobe." in spans
+
+def test_skip_prescreen_skips_a_fully_covered_step():
+    with RadCoT("mock", prescreen="skip", preprocess=False) as detector:
+        detector.rule_checker = RuleChecker(coverage={4: ["normal_impression"]})
+        detector.model = model = _StepModel()
+        result = detector.detect_errors(FLIPPED)
+    assert model.steps == [1, 2, 3, 5, 6]
+    assert result["skipped_steps"] == ["step_4"]
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from radcot.cli import main
+from radcot.runner import merge_results, read_records, run_shard, shard_path
+
+REPORTS = [
+    f"FINDINGS: A {size} mm nodule in the right upper lobe.\nIMPRESSION: Pulmonary nodule number {size}."
+    for size in range(1, 31)
+]
+
+def _write_corpus(path, lines=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines if lines is not None else [json.dumps(report) for report in REPORTS]:
+            f.write(line + "\n")
+    return str(path)
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def _options(failure_rate=0.0):
+    return {"model_name": "mock", "use_radcot": False, "model_config": {"failure_rate": failure_rate}}
+
+def test_unsharded_retries_leave_one_result_per_report(tmp_path):
+    corpus = _write_corpus(tmp_path / "corpus.jsonl")
+    output = str(tmp_path / "results.jsonl")
+    
+    first = run_shard(corpus, output, detector_options=_options(failure_rate=0.5), checkpoint_every=7)
+    assert first["errors"] > 0
+    assert len(_read(output)) == len(REPORTS)
+    
+    second = run_shard(corpus, output, detector_options=_options(), checkpoint_every=7)
+    assert second["resumed"] == first["completed"]
+    assert second["completed"] == first["errors"] and second["errors"] == 0
+    results = _read(output)
+    assert sorted(result["report_id"] for result in results) == list(range(len(REPORTS)))
+    assert all(result["status"] == "ok" for result in results)
+    
+    # The compacted file resumes cleanly: nothing is left to do
+    third = run_shard(corpus, output, detector_options=_options())
+    assert third == {"path": output, "completed": 0, "errors": 0, "resumed": len(REPORTS)}
+    assert len(_read(output)) == len(REPORTS)
+
+def test_resume_truncates_past_the_checkpoint(tmp_path):
+    corpus = _write_corpus(tmp_path / "corpus.jsonl")
+    output = str(tmp_path / "results.jsonl")
+    run_shard(corpus, output, detector_options=_options())
+    
+    # Simulate a crash: rewind the checkpoint and leave a torn line behind it
+    with open(f"{output}.checkpoint", encoding="utf-8") as f:
+        state = json.load(f)
+    with open(output, "rb") as f:
+        lines = f.readlines()
+    state["offset"] = sum(len(line) for line in lines[:10])
+    with open(f"{output}.checkpoint", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    with open(output, "ab") as f:
+        f.write(b'{"report_id": 99, "sta')
+    
+    summary = run_shard(corpus, output, detector_options=_options())
+    assert summary["resumed"] == 10 and summary["completed"] == len(REPORTS) - 10
+    assert sorted(result["report_id"] for result in _read(output)) == list(range(len(REPORTS)))
+
+def test_malformed_lines_are_recorded_and_skipped(tmp_path):
+    lines = [json.dumps(REPORTS[0]), "{not json", json.dumps({"REPORT_ID": "r2", "MODALITY": "CT"}),
+             json.dumps({"REPORT_ID": "r3", "REPORT_TEXT": REPORTS[3]})]
+    corpus = _write_corpus(tmp_path / "corpus.jsonl", lines)
+    output = str(tmp_path / "results.jsonl")
+    
+    summary = run_shard(corpus, output, detector_options=_options())
+    assert summary["completed"] == 2 and summary["errors"] == 2
+    results = {result["report_id"]: result for result in _read(output)}
+    assert results[1]["status"] == "error" and "invalid JSON" in results[1]["error"]
+    assert results["r2"]["status"] == "error" and "REPORT_TEXT" in results["r2"]["error"]
+    assert results[0]["status"] == results["r3"]["status"] == "ok"
+    
+    with pytest.raises(ValueError, match="invalid JSON"):
+        list(read_records(corpus))
+
+def test_sharded_results_merge_to_one_result_per_report(tmp_path):
+    corpus = _write_corpus(tmp_path / "corpus.jsonl")
+    output = str(tmp_path / "results.jsonl")
+    paths = [shard_path(output, shard, 3) for shard in range(3)]
+    for shard in range(3):
+        run_shard(corpus, output, shard, 3, detector_options=_options(failure_rate=0.5))
+        run_shard(corpus, output, shard, 3, detector_options=_options())
+    assert sum(len(_read(path)) for path in paths) > len(REPORTS)
+    
+    assert merge_results(paths, output) == {"reports": len(REPORTS), "errors": 0}
+    assert sorted(result["report_id"] for result in _read(output)) == list(range(len(REPORTS)))
+
+def test_merge_reports_missing_shards(tmp_path, capsys):
+    output = str(tmp_path / "results.jsonl")
+    with pytest.raises(ValueError, match="not found"):
+        merge_results([shard_path(output, shard, 2) for shard in range(2)], output)
+    assert main(["merge", output, "--num-shards", "2"]) == 2
+    assert "not found" in capsys.readouterr().err
+    assert not os.path.exists(output)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from sklearn.metrics import cohen_kappa_score
+
+from radcot.agreement import AgreementAnalyzer, cohen_kappa_matrix, fleiss_kappa
+from radcot.stats import bootstrap_ci, metrics_from_counts, paired_permutation_test
+
+def test_cohen_kappa_matrix_matches_sklearn():
+    rng = np.random.default_rng(0)
+    decisions = rng.random((200, 4)) < [0.2, 0.5, 0.5, 0.8]
+    matrix = cohen_kappa_matrix(decisions)
+    for a in range(4):
+        for b in range(4):
+            assert matrix[a, b] == pytest.approx(cohen_kappa_score(decisions[:, a], decisions[:, b]))
+
+def test_fleiss_kappa_known_values():
+    # Perfect agreement on both outcomes
+    assert fleiss_kappa(np.array([[1, 1, 1], [0, 0, 0]] * 5, dtype=bool)) == pytest.approx(1.0)
+    # Two raters: Fleiss' kappa reduces to Scott's pi
+    decisions = np.array([[1, 1], [1, 0], [0, 0], [0, 0], [1, 1], [0, 1]], dtype=bool)
+    observed = 4 / 6
+    p_yes = decisions.mean()
+    expected = p_yes ** 2 + (1 - p_yes) ** 2
+    assert fleiss_kappa(decisions) == pytest.approx((observed - expected) / (1 - expected))
+    assert np.isnan(fleiss_kappa(np.zeros((0, 3), dtype=bool)))
+
+def test_agreement_analyzer_counts_false_positives():
+    analyzer = AgreementAnalyzer(ground_truth=[{"location": "a", "type": "T1"}])
+    analyzer.add_system("x", [{"location": "a", "type": "T1"}, {"location": "b", "type": "T2"}])
+    analyzer.add_system("y", [{"location": "a", "type": "T1"}])
+    keys, decisions = analyzer.decision_matrix()
+    assert len(keys) == 2
+    assert decisions.sum(axis=0).tolist() == [2, 1]
+
+def test_agreement_analyzer_aligns_spans_within_the_window():
+    report = "FINDINGS: Nodule in the left lung.\nIt measures 6 mm.\nNo effusion.\nIMPRESSION: Right lung nodule."
+    reports = {"r1": report}
+    near = [{"text_span": "It measures 6 mm.", "error_type": "Numerical"}]
+    same = [{"text_span": "Nodule in the left lung.", "error_type": "Numerical"}]
+    far = [{"text_span": "Right lung nodule.", "error_type": "Numerical"}]
+    
+    analyzer = AgreementAnalyzer(ground_truth={"r1": same}, reports=reports)
+    analyzer.add_system("x", {"r1": same})
+    analyzer.add_system("y", {"r1": near})
+    analyzer.add_system("z", {"r1": far + same})
+    keys, decisions = analyzer.decision_matrix()
+    # One sentence apart is the same item; the impression sentence is another
+    assert len(keys) == 2
+    assert decisions.tolist() == [[True, True, True], [False, False, True]]
+    
+    exact = AgreementAnalyzer(reports=reports, window=0)
+    exact.add_system("x", {"r1": same})
+    exact.add_system("y", {"r1": near})
+    assert exact.decision_matrix()[1].tolist() == [[True, False], [False, True]]
+
+def test_metrics_from_counts():
+    metrics = metrics_from_counts(np.array([[3, 1, 2], [0, 0, 0]]))
+    assert metrics["precision"].tolist() == [0.75, 0.0]
+    assert metrics["recall"].tolist() == [0.6, 0.0]
+    assert metrics["f1"][0] == pytest.approx(2 * 0.75 * 0.6 / 1.35)
+
+def test_bootstrap_ci_brackets_the_estimate_and_is_reproducible():
+    rng = np.random.default_rng(1)
+    counts = rng.integers(0, 4, size=(300, 3))
+    result = bootstrap_ci(counts, n_resamples=2000, seed=7)
+    for metric in ("precision", "recall", "f1"):
+        assert result[metric]["lower"] <= result[metric]["estimate"] <= result[metric]["upper"]
+        assert result[metric]["upper"] - result[metric]["lower"] < 0.2
+    assert bootstrap_ci(counts, n_resamples=2000, seed=7) == result
+    assert bootstrap_ci(counts, n_resamples=2000, seed=7, n_jobs=2) == result
+
+def test_bootstrap_ci_of_identical_reports_is_degenerate():
+    result = bootstrap_ci(np.tile([2, 1, 1], (50, 1)), n_resamples=200, seed=0)
+    assert result["precision"]["lower"] == result["precision"]["upper"] == pytest.approx(2 / 3)
+
+def test_paired_permutation_test():
+    rng = np.random.default_rng(2)
+    counts = rng.integers(0, 4, size=(200, 3))
+    same = paired_permutation_test(counts, counts, n_permutations=500, seed=0)
+    assert same["difference"] == 0.0
+    assert same["p_value"] == 1.0
+    
+    better = counts.copy()
+    better[:, 0] += 3
+    better[:, 2] = 0
+    different = paired_permutation_test(better, counts, n_permutations=500, seed=0)
+    assert different["difference"] > 0
+    assert different["p_value"] < 0.01
+    with pytest.raises(ValueError):
+        paired_permutation_test(counts, counts[:10])